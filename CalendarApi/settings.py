@@ -54,6 +54,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'lessons_app.middleware.ProfilingMiddleware',
+    # counts the queries of the middleware below too
+    'lessons_app.middleware.QueryInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -154,11 +157,38 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+# 'default' is shared by all worker processes and is selected by the
+# CACHE_BACKEND and CACHE_LOCATION variables, e.g. CACHE_BACKEND=redis
+# CACHE_LOCATION=redis://127.0.0.1:6379. The default is a SQLite file of
+# the project, other backends need CACHE_LOCATION. 'local' is an LRU cache
+# of the process for values under versioned keys (lessons_app/caching.py)
+CACHE_BACKENDS = {
+    'sqlite': 'CalendarApi.sqlite_cache.SQLiteCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+}
+CACHE_BACKEND = env('CACHE_BACKEND', default='sqlite')
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
-        'LOCATION': os.path.join(BASE_DIR, 'django_cache'),
-    }
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': env(
+            'CACHE_LOCATION',
+            default=os.path.join(BASE_DIR, 'django_cache', 'cache.sqlite3')
+        ),
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lessons_app',
+        'OPTIONS': {
+            'MAX_ENTRIES': 200,
+        },
+    },
 }
 
 REST_FRAMEWORK = {
@@ -202,3 +232,31 @@ SIMPLE_JWT = {
 
 # Activate Django-Heroku.
 django_heroku.settings(locals())
+# the async capable WhiteNoise (see CalendarApi/staticfiles.py)
+MIDDLEWARE = [
+    'CalendarApi.staticfiles.WhiteNoiseMiddleware'
+    if path == 'whitenoise.middleware.WhiteNoiseMiddleware' else path
+    for path in MIDDLEWARE
+]
+
+# Profiles of single requests (see lessons_app/profiling.py)
+PROFILES_DIR = env('PROFILES_DIR',
+                   default=os.path.join(BASE_DIR, 'profiles'))
+
+# Bearer token of the Prometheus scraper, /metrics is closed without it
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+
+# One JSON line per request (see lessons_app/middleware.py)
+LOGGING['formatters']['message'] = {'format': '%(message)s'}
+LOGGING['handlers']['requests'] = {
+    'class': 'logging.StreamHandler',
+    'formatter': 'message',
+}
+LOGGING['loggers']['lessons_app.requests'] = {
+    'handlers': ['requests'],
+    'level': env('REQUEST_LOG_LEVEL', default='INFO'),
+    'propagate': False,
+}
+
+# The test runs use their own caches and don't log the requests
+TEST_RUNNER = 'CalendarApi.test_runner.TestRunner'
@@ -0,0 +1,186 @@
+""" SQLite cache backend.
+
+One database file is shared by all worker processes of the host. Unlike
+FileBasedCache a key is a row of an indexed table, so reading a key
+doesn't touch the directory, and culling is a single DELETE statement.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'CalendarApi.sqlite_cache.SQLiteCache',
+        'LOCATION': '/path/to/cache.sqlite3',
+    }
+}
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+
+ALIVE = '(expires IS NULL OR expires > ?)'
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        # a forked worker must not share the connection of the parent
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=10,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB, expires REAL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)'
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get_backend_timeout(self, timeout=DEFAULT_TIMEOUT):
+        """ Returns the expiry timestamp or None for keys without one """
+
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return time.time() + timeout
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time())
+            )
+            cursor = connection.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?)',
+                (key, self._dumps(value), self.get_backend_timeout(timeout))
+            )
+            added = cursor.rowcount == 1
+        if added:
+            self._maybe_cull()
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection.execute(
+            'SELECT value FROM cache WHERE key = ? AND ' + ALIVE,
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return default
+        return pickle.loads(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None \
+                and timeout <= 0:
+            self._connection.execute('DELETE FROM cache WHERE key = ?',
+                                     (key, ))
+            return
+        self._connection.execute(
+            'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+            (key, self._dumps(value), self.get_backend_timeout(timeout))
+        )
+        self._maybe_cull()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND ' + ALIVE,
+            (self.get_backend_timeout(timeout), key, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection.execute('DELETE FROM cache WHERE key = ?',
+                                          (key, ))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND ' + ALIVE,
+            (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def incr(self, key, delta=1, version=None):
+        """ Atomic across processes: the row is updated in one write
+        transaction """
+
+        key = self.make_and_validate_key(key, version=version)
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? AND ' + ALIVE,
+                (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            connection.execute('UPDATE cache SET value = ? WHERE key = ?',
+                               (self._dumps(value), key))
+        return value
+
+    def clear(self):
+        self._connection.execute('DELETE FROM cache')
+
+    def _dumps(self, value):
+        return sqlite3.Binary(pickle.dumps(value, self.pickle_protocol))
+
+    def _transaction(self):
+        return _Transaction(self._connection)
+
+    def _maybe_cull(self):
+        # the table is counted on every cull_frequency-th write only
+        self._local.writes = getattr(self._local, 'writes', 0) + 1
+        if self._local.writes % self._cull_frequency:
+            return
+        connection = self._connection
+        connection.execute('DELETE FROM cache WHERE expires <= ?',
+                           (time.time(), ))
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            # the keys closest to expiry go first
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency, )
+            )
+
+
+class _Transaction():
+    """ BEGIN IMMEDIATE takes the write lock of the database at once """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.connection.execute('COMMIT')
+        else:
+            self.connection.execute('ROLLBACK')
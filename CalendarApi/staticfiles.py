@@ -0,0 +1,22 @@
+""" Static files of the project served by WhiteNoise.
+
+django_heroku puts whitenoise.middleware.WhiteNoiseMiddleware first in
+MIDDLEWARE. It is sync only, so under ASGI Django would run the whole
+middleware chain in a thread and call the async views back through
+async_to_sync, every request holding a thread to its end. The
+middleware below finds and serves the files by the one of WhiteNoise
+and is async capable, only the lookup of a file runs in a thread """
+
+from django.utils.deprecation import MiddlewareMixin
+from whitenoise import middleware
+
+
+class WhiteNoiseMiddleware(MiddlewareMixin):
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.static_files = middleware.WhiteNoiseMiddleware(get_response)
+
+    def process_request(self, request):
+        return self.static_files.process_request(request)
+
@@ -0,0 +1,61 @@
+""" Test runner of the project.
+
+The requests aren't logged during the tests, the test client shows the
+queries of a response (QueryBudgetMixin of lessons_app/tests) and the
+tests of the log itself catch it by assertLogs.
+
+The caches are in the memory of the test process instead of the shared
+file of the project, and they are cleared after every test: rows of a
+test are flushed or rolled back without any signal, so the schedule
+cached from them would be seen by the next tests """
+
+import logging
+
+from django.core.cache import caches
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import iter_test_cases
+
+
+REQUESTS_LOGGER = 'lessons_app.requests'
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests',
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lessons_app',
+        'OPTIONS': {
+            'MAX_ENTRIES': 200,
+        },
+    },
+}
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+
+
+class TestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        logger = logging.getLogger(REQUESTS_LOGGER)
+        self.requests_level = logger.level
+        logger.setLevel(logging.CRITICAL)
+        self.test_caches = override_settings(CACHES=TEST_CACHES)
+        self.test_caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_caches.disable()
+        logging.getLogger(REQUESTS_LOGGER).setLevel(self.requests_level)
+        super().teardown_test_environment(**kwargs)
+
+    def build_suite(self, *args, **kwargs):
+        suite = super().build_suite(*args, **kwargs)
+        for test in iter_test_cases(suite):
+            test.addCleanup(clear_caches)
+        return suite
@@ -0,0 +1,58 @@
+""" gunicorn settings (read from the working directory by default).
+
+SERVER_INTERFACE=wsgi (default) serves CalendarApi.wsgi by threaded
+workers. SERVER_INTERFACE=asgi serves CalendarApi.asgi by uvicorn
+workers, where the async views (see lessons_app/asynchronous.py) wait
+for the database and the change feed without holding a thread.
+
+Under WSGI a long polling client of api/changes holds a thread for up
+to 25 seconds (MAX_WAIT of lessons_app/changes.py). WEB_THREADS is the
+amount of threads of a worker; keep WEB_CONCURRENCY * WEB_THREADS above
+the number of clients polling at once plus the other requests, or run
+the ASGI workers.
+
+    gunicorn
+    SERVER_INTERFACE=asgi gunicorn
+
+The amount of workers is taken from WEB_CONCURRENCY, the address from
+PORT (as gunicorn does by default).
+
+The workers keep their Prometheus metrics in PROMETHEUS_MULTIPROC_DIR
+(see lessons_app/metrics.py), a temporary directory by default. It is
+emptied when the server starts, so the counters start from zero """
+
+import os
+import shutil
+import tempfile
+
+
+interface = os.environ.get('SERVER_INTERFACE', 'wsgi')
+
+if interface == 'asgi':
+    wsgi_app = 'CalendarApi.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+elif interface == 'wsgi':
+    wsgi_app = 'CalendarApi.wsgi:application'
+    worker_class = 'gthread'
+    # long polling clients (api/changes) wait in threads, see above
+    threads = int(os.environ.get('WEB_THREADS', 8))
+else:
+    raise ValueError(f'Unknown SERVER_INTERFACE: {interface}')
+
+
+# set before the workers import prometheus_client
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(tempfile.gettempdir(), 'calendarapi-metrics')
+)
+
+
+def on_starting(server):
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LessonsAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'lessons_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,117 @@
+""" Async views on Django 4.0.
+
+Served by an ASGI worker (CalendarApi/asgi.py, see gunicorn.conf.py) an
+async view doesn't hold a thread while it waits, so a worker keeps many
+polling clients. That takes an async capable middleware chain too
+(see lessons_app/middleware.py and CalendarApi/staticfiles.py), a sync
+middleware would make Django run the chain in a thread and call the
+view back through async_to_sync.
+
+Django 4.0 has no async ORM and neither class-based views nor Django
+REST framework views can be async, so the mixins below make the view
+callable a coroutine function and run the blocking steps (sessions,
+authentication, queries, serialization) through sync_to_async. Under
+WSGI Django runs the same views in an event loop of the request """
+
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import classonlymethod
+from django.utils.http import http_date, quote_etag
+
+
+class AsyncViewMixin:
+    """ The view callable is a coroutine function, so Django 4.0 runs it
+    as an async view (the view of as_view() returns the coroutine of
+    dispatch()). Handlers that aren't async run in a thread """
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        @wraps(view)
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        return async_view
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = self.get_handler(request)
+        if asyncio.iscoroutinefunction(handler):
+            return await handler(request, *args, **kwargs)
+        return await sync_to_async(handler)(request, *args, **kwargs)
+
+    def get_handler(self, request):
+        if request.method.lower() in self.http_method_names:
+            return getattr(self, request.method.lower(),
+                           self.http_method_not_allowed)
+        return self.http_method_not_allowed
+
+
+class AsyncAPIViewMixin(AsyncViewMixin):
+    """ APIView.dispatch() with async handlers """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # authentication and permissions may read the database
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = self.get_handler(request)
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args,
+                                                        **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args,
+                                               **kwargs)
+        return self.response
+
+
+def async_condition(etag_func=None, last_modified_func=None):
+    """ django.views.decorators.http.condition for async handlers of
+    views. The ETag and Last-Modified functions run in a thread """
+
+    def decorator(handler):
+        @wraps(handler)
+        async def inner(self, request, *args, **kwargs):
+            etag = None
+            if etag_func:
+                etag = await sync_to_async(etag_func)(request, *args,
+                                                      **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+            last_modified = None
+            if last_modified_func:
+                moment = await sync_to_async(last_modified_func)(
+                    request, *args, **kwargs)
+                if moment:
+                    if not timezone.is_aware(moment):
+                        moment = timezone.make_aware(moment, timezone.utc)
+                    last_modified = int(moment.timestamp())
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await handler(self, request, *args, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = \
+                        http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+
+        return inner
+
+    return decorator
@@ -0,0 +1,192 @@
+""" Per-day availability index.
+
+Keeps the occupied intervals of a day (lessons and blocked time) as sorted
+lists of minutes, so every "is this slot free" question is answered with
+a binary search instead of a database query and a loop over the rows.
+Days are cached in the process and dropped when the schedule version
+changes (see signals.py) """
+
+import datetime
+import threading
+from bisect import bisect_right, bisect_left, insort
+
+from django.db import connection
+
+from CalendarApi.constraints import С_morning_time, C_evening_time
+from .models import Lesson, TimeBlock
+from .versioning import get_schedule_version
+
+
+LESSON_DURATION = 60  # minutes
+MAX_CACHED_DAYS = 400
+
+
+def to_minutes(time):
+    return time.hour * 60 + time.minute
+
+
+def to_time(minutes):
+    return datetime.time(minutes // 60, minutes % 60)
+
+
+class DaySchedule():
+    """ Occupied intervals of one day """
+
+    def __init__(self, date, lesson_times, blocks):
+        self.date = date
+        self.lessons = sorted(to_minutes(time) for time in lesson_times)
+        self.block_starts = []
+        self.block_ends = []
+
+        # adjacent and overlapping blocks are merged, so the blocks
+        # are disjoint and sorted by both the start and the end
+        for start, end in sorted(
+                (to_minutes(start), to_minutes(end)) for start, end in blocks):
+            if self.block_ends and start <= self.block_ends[-1]:
+                self.block_ends[-1] = max(self.block_ends[-1], end)
+            else:
+                self.block_starts.append(start)
+                self.block_ends.append(end)
+
+    @property
+    def lesson_count(self):
+        return len(self.lessons)
+
+    def add_lesson(self, time):
+        """ Takes the time by a lesson being created. Only for days read
+        under the lock (not cached ones) """
+
+        insort(self.lessons, to_minutes(time))
+
+    def lesson_conflict(self, time):
+        """ Returns the start of the lesson that takes the time or None """
+
+        minutes = to_minutes(time)
+        i = bisect_right(self.lessons, minutes) - 1
+        if i >= 0 and minutes < self.lessons[i] + LESSON_DURATION:
+            return to_time(self.lessons[i])
+        return None
+
+    def is_blocked(self, time):
+        minutes = to_minutes(time)
+        i = bisect_right(self.block_starts, minutes) - 1
+        if i >= 0 and minutes < self.block_ends[i]:
+            return True
+        # the block up to the end of business hours takes the last hour
+        return (time == C_evening_time and bool(self.block_ends)
+                and self.block_ends[-1] == to_minutes(C_evening_time))
+
+    def block_overlaps(self, start_time, end_time):
+        """ Checks if [start_time, end_time) overlaps any block """
+
+        start, end = to_minutes(start_time), to_minutes(end_time)
+        i = bisect_left(self.block_starts, end) - 1
+        return i >= 0 and self.block_ends[i] > start
+
+    def has_lesson_between(self, start_time, end_time):
+        """ Checks if any lesson starts in [start_time, end_time) """
+
+        start, end = to_minutes(start_time), to_minutes(end_time)
+        i = bisect_left(self.lessons, start)
+        return i < len(self.lessons) and self.lessons[i] < end
+
+    def free_starts(self, duration=LESSON_DURATION, earliest=None):
+        """ Returns every hour the lesson of duration (minutes) can start
+        at. The lesson must end before the last business hour is over """
+
+        starts = []
+        first = to_minutes(С_morning_time)
+        if earliest is not None:
+            # a started minute is over, then round up to the next hour
+            minutes = to_minutes(earliest)
+            if earliest.second or earliest.microsecond:
+                minutes += 1
+            first = max(first, minutes)
+            first += -first % LESSON_DURATION
+        last = to_minutes(C_evening_time) + LESSON_DURATION - duration
+        for start in range(first, last + 1, LESSON_DURATION):
+            end = start + duration
+            # a lesson overlaps if it starts in
+            # (start - LESSON_DURATION, end)
+            i = bisect_left(self.lessons, end) - 1
+            if i >= 0 and self.lessons[i] > start - LESSON_DURATION:
+                continue
+            i = bisect_left(self.block_starts, end) - 1
+            if i >= 0 and self.block_ends[i] > start:
+                continue
+            if self.is_blocked(to_time(start)):
+                continue
+            starts.append(to_time(start))
+        return starts
+
+
+_lock = threading.Lock()
+_days = {}
+_version = None
+
+
+def _load_days(date_from, date_to):
+    dates = [date_from + datetime.timedelta(days=i)
+             for i in range((date_to - date_from).days + 1)]
+    lesson_times = {date: [] for date in dates}
+    blocks = {date: [] for date in dates}
+    for date, time in Lesson.objects.filter(
+            date__gte=date_from, date__lte=date_to
+    ).values_list('date', 'time'):
+        lesson_times[date].append(time)
+    for date, start_time, end_time in TimeBlock.objects.filter(
+            date__gte=date_from, date__lte=date_to
+    ).values_list('date', 'start_time', 'end_time'):
+        blocks[date].append((start_time, end_time))
+    return {
+        date: DaySchedule(date, lesson_times[date], blocks[date])
+        for date in dates
+    }
+
+
+def get_days(date_from, date_to):
+    """ Returns {date: DaySchedule} for every date of the range.
+    Days missing in the cache are loaded with two queries in total """
+
+    global _version
+
+    # rows read inside a transaction may be rolled back without any
+    # signal, so they must not be seen by other requests
+    if connection.in_atomic_block:
+        return _load_days(date_from, date_to)
+
+    version = get_schedule_version()
+    with _lock:
+        if version != _version:
+            _days.clear()
+            _version = version
+        days = {}
+        date = date_from
+        while date <= date_to and date in _days:
+            days[date] = _days[date]
+            date += datetime.timedelta(days=1)
+    if date > date_to:
+        return days
+    days = _load_days(date_from, date_to)
+    with _lock:
+        if version == _version:
+            if len(_days) + len(days) > MAX_CACHED_DAYS:
+                _days.clear()
+            _days.update(days)
+    return days
+
+
+def get_day(date):
+    """ Returns DaySchedule of the date """
+
+    return get_days(date, date)[date]
+
+
+def invalidate():
+    """ Drops the days cached in this process """
+
+    global _version
+
+    with _lock:
+        _days.clear()
+        _version = None
@@ -0,0 +1,74 @@
+""" Atomic writes of the schedule.
+
+Validators check the slot before the lesson (block) is saved, so two
+concurrent requests may both pass them. Every write of a day is made
+holding the lock of the ScheduleDay row of that day and the checks are
+repeated under the lock. Writes of different days don't wait for each
+other """
+
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from .changes import record
+from .models import ScheduleDay, TimeBlock, ScheduleEvent
+
+
+@contextmanager
+def lock_day(date):
+    """ Opens a transaction holding the lock of the day.
+    availability.get_day() reads the database directly inside it """
+
+    with transaction.atomic():
+        ScheduleDay.objects.select_for_update().get_or_create(date=date)
+        yield
+
+
+@contextmanager
+def lock_days(dates):
+    """ Opens a transaction holding the locks of all the days. The rows
+    are locked in the order of dates, so writers of overlapping sets of
+    days don't deadlock """
+
+    dates = sorted(set(dates))
+    with transaction.atomic():
+        ScheduleDay.objects.bulk_create(
+            [ScheduleDay(date=date) for date in dates], ignore_conflicts=True
+        )
+        list(ScheduleDay.objects.select_for_update().filter(
+            date__in=dates
+        ).order_by('date'))
+        yield
+
+
+def coalesce_blocks(dates):
+    """ Merges overlapping and adjacent blocks of each day into one, so
+    a day keeps the minimal set of intervals. Must be called under the
+    locks of the days """
+
+    groups = []
+    for block in TimeBlock.objects.filter(date__in=dates).order_by(
+            'date', 'start_time'):
+        if groups and groups[-1][0].date == block.date \
+                and block.start_time <= groups[-1][0].end_time:
+            kept = groups[-1][0]
+            kept.end_time = max(kept.end_time, block.end_time)
+            groups[-1].append(block)
+        else:
+            groups.append([block])
+
+    merged = [block.pk for group in groups for block in group[1:]]
+    if merged:
+        # the deleted blocks send the signals
+        TimeBlock.objects.filter(pk__in=merged).delete()
+        extended = [group[0] for group in groups if len(group) > 1]
+        TimeBlock.objects.bulk_update(extended, ['end_time'])
+        record(ScheduleEvent.TIMEBLOCK, ScheduleEvent.UPDATED, extended)
+
+
+def revalidate(serializer):
+    """ Runs the validators of the serializer once more. Must be called
+    under the lock of the day, because the slot could be taken after
+    the serializer was validated """
+
+    serializer.run_validators(serializer.validated_data)
@@ -0,0 +1,134 @@
+""" Bulk booking of lessons and blocking of time.
+
+All the slots (days) are checked against the schedule of their dates
+read with two queries and inserted with one INSERT. Slots that break the
+rules are reported instead of failing the whole operation """
+
+import datetime
+from collections import namedtuple
+
+from django.utils.translation import gettext as _
+
+from .availability import get_days
+from .booking import lock_days, coalesce_blocks
+from .changes import record
+from .metrics import count_bookings
+from .models import Lesson, TimeBlock, ScheduleEvent
+from .pricing import get_rates, price
+from .rules import booking_errors, lesson_errors, broken
+from .signals import schedule_changed
+from .window import get_window
+
+
+MAX_BULK_LESSONS = 100
+MAX_BULK_DAYS = 366
+
+Rejected = namedtuple('Rejected', ('date', 'time', 'errors'))
+
+
+def weekly_slots(date, time, count):
+    """ The same time of the same weekday for count weeks """
+
+    return [(date + datetime.timedelta(weeks=i), time) for i in range(count)]
+
+
+def book_lessons(student_id, slots, check_booking=True):
+    """ Creates the lessons of the student for the free slots (date, time).
+    check_booking applies the rules of booking by students. A slot given
+    more than once is booked once and its repeats are rejected.
+    Returns (created lessons, list of Rejected) """
+
+    slots = sorted(slots)
+    if not slots:
+        return [], []
+    rates = get_rates(student_id)
+    lessons = []
+    rejected = []
+
+    with lock_days(date for date, _ in slots):
+        days = get_days(slots[0][0], slots[-1][0])
+        for i, (date, time) in enumerate(slots):
+            if i and slots[i - 1] == (date, time):
+                rejected.append(Rejected(date, time, [broken(
+                    'duplicate_slot', _("The slot {} {} is repeated").format(
+                        date, time))]))
+                continue
+            day = days[date]
+            errors = lesson_errors(day, time)
+            if check_booking:
+                errors = booking_errors(date, time) + errors
+            if errors:
+                rejected.append(Rejected(date, time, errors))
+                continue
+            lessons.append(Lesson(
+                student_id=student_id, date=date, time=time,
+                salary=price(rates, time, day.lesson_count).salary
+            ))
+            # the next slots of the day see this lesson
+            day.add_lesson(time)
+
+        # bulk_create sends no signals
+        Lesson.objects.bulk_create(lessons)
+        if lessons:
+            schedule_changed(Lesson)
+            record(ScheduleEvent.LESSON, ScheduleEvent.CREATED, lessons)
+            count_bookings(len(lessons), 'bulk')
+
+    return lessons, rejected
+
+
+def pattern_dates(date_from, date_to, weekdays=None):
+    """ Dates of the range falling on the weekdays (0 is Monday) """
+
+    return [
+        date_from + datetime.timedelta(days=i)
+        for i in range((date_to - date_from).days + 1)
+        if not weekdays
+        or (date_from + datetime.timedelta(days=i)).weekday() in weekdays
+    ]
+
+
+def block_time(dates, start_time, end_time):
+    """ Blocks [start_time, end_time) of the dates. Blocks of a date
+    overlapping or adjacent to the new one are merged with it into one
+    (see booking.coalesce_blocks), dates with lessons in the interval are
+    rejected. Returns (blocks containing the new ones, list of Rejected) """
+
+    dates = sorted(set(dates))
+    if not dates:
+        return [], []
+    today = get_window().start
+    created = []
+    rejected = []
+
+    with lock_days(dates):
+        lesson_dates = set(Lesson.objects.filter(
+            date__in=dates, time__gte=start_time, time__lt=end_time
+        ).values_list('date', flat=True))
+
+        for date in dates:
+            errors = []
+            if date < today:
+                errors.append(broken('past_date', _(
+                    "Date can't be earlier than today")))
+            if date in lesson_dates:
+                errors.append(broken('lesson_overlap', _(
+                    "Your block overlaps an existing lesson")))
+            if errors:
+                rejected.append(Rejected(date, start_time, errors))
+                continue
+            created.append(TimeBlock(date=date, start_time=start_time,
+                                     end_time=end_time))
+
+        TimeBlock.objects.bulk_create(created)
+        if created:
+            # bulk_create sends no signals
+            schedule_changed(TimeBlock)
+            record(ScheduleEvent.TIMEBLOCK, ScheduleEvent.CREATED, created)
+            coalesce_blocks([block.date for block in created])
+
+    # the new blocks could be merged into the existing ones
+    return list(TimeBlock.objects.filter(
+        date__in=[block.date for block in created],
+        start_time__lte=start_time, end_time__gte=end_time
+    )), rejected
@@ -0,0 +1,83 @@
+""" Two-tier cache of values built from the schedule.
+
+Keys contain the schedule version, so the value of a key never changes
+and can be kept in memory of the process ('local' cache) in front of the
+shared one. A missing value is built by one process only while others
+wait for it (single-flight), and a value close to its expiry is rebuilt
+early with a growing probability (XFetch), so an expired popular key
+doesn't send every worker to the database at once """
+
+import math
+import random
+import time
+
+from django.core.cache import caches
+
+from .metrics import CACHE
+
+
+LOCK_TIMEOUT = 10  # seconds one process may spend building a value
+WAIT_STEP = 0.05  # seconds between checks for a value built by another one
+
+
+def get_or_build(key, build, timeout, beta=1.0):
+    """ Returns the value of the key, calling build() if it is missing.
+    The key must change whenever the value would change """
+
+    local = caches['local']
+    shared = caches['default']
+
+    entry = local.get(key)
+    result = 'hit_local'
+    if entry is None:
+        entry = shared.get(key)
+        result = 'hit_shared'
+        if entry is not None:
+            _keep_locally(key, entry)
+    if entry is not None and not _expires_early(entry, beta):
+        CACHE.labels(result).inc()
+        return entry[0]
+    CACHE.labels('miss').inc()
+
+    lock_key = key + ':lock'
+    if shared.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            return _build(key, build, timeout)
+        finally:
+            shared.delete(lock_key)
+
+    # another process is building the value
+    if entry is not None:
+        return entry[0]
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline and shared.has_key(lock_key):
+        time.sleep(WAIT_STEP)
+        entry = shared.get(key)
+        if entry is not None:
+            _keep_locally(key, entry)
+            return entry[0]
+    return _build(key, build, timeout)
+
+
+def _expires_early(entry, beta):
+    """ XFetch: the closer the expiry and the longer the value takes to
+    build, the more likely it is rebuilt before it expires """
+
+    _, duration, expires = entry
+    return time.time() - duration * beta * math.log(
+        1 - random.random()) >= expires
+
+
+def _build(key, build, timeout):
+    start = time.monotonic()
+    value = build()
+    entry = (value, time.monotonic() - start, time.time() + timeout)
+    caches['default'].set(key, entry, timeout)
+    caches['local'].set(key, entry, timeout)
+    return value
+
+
+def _keep_locally(key, entry):
+    timeout = entry[2] - time.time()
+    if timeout > 0:
+        caches['local'].set(key, entry, timeout)
@@ -0,0 +1,141 @@
+""" Change feed of the schedule.
+
+Every change of a lesson or a time block is stored as a ScheduleEvent,
+and its id is the sequence number of the change. A client remembers the
+last number it has seen and asks for the events after it; if there are
+none, the request waits for them (long polling) watching the schedule
+version, which costs a cache read instead of a query. Under ASGI the
+view and the middleware chain are async, so a waiting request holds no
+thread. Under WSGI every waiting request holds a thread of its worker,
+so the threads of the workers have to outnumber the polling clients
+(WEB_THREADS, see gunicorn.conf.py).
+
+The database hands out ids before the commit, so a transaction holding
+a smaller id could commit after a greater one had been read, and its
+event would be skipped by the clients. So the events get their sequence
+numbers only once they are committed: a reader numbers the visible
+events without a number, in the order of their ids, holding the lock of
+the ChangeFeed row. Readers number one at a time and writers never wait
+for them, so the writes of different days still run in parallel (see
+booking.py) and an event committed late just gets a later number.
+
+Expired events are deleted by 'manage.py prune_changes' (run it daily),
+which keeps the last deleted number, so a client resuming from an older
+one reloads the schedule """
+
+import asyncio
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ScheduleEvent, ChangeFeed
+from .versioning import get_schedule_version, bump_schedule_version
+
+
+RETENTION = timedelta(days=7)
+MAX_EVENTS = 500  # per response
+MAX_WAIT = 25  # seconds, shorter than the timeouts of gunicorn and proxies
+POLL_STEP = 0.5  # seconds between checks of the schedule version
+
+
+def record(kind, action, objects):
+    """ Stores the events of the objects (lessons or time blocks) """
+
+    events = [
+        ScheduleEvent(kind=kind, action=action, object_id=obj.pk,
+                      date=obj.date)
+        for obj in objects
+    ]
+    if not events:
+        return
+    ScheduleEvent.objects.bulk_create(events)
+    # the version was bumped before the events were stored, so the
+    # waiting requests could miss them until their timeout
+    transaction.on_commit(bump_schedule_version)
+
+
+def get_feed(lock=False):
+    queryset = ChangeFeed.objects.select_for_update() if lock \
+        else ChangeFeed.objects
+    return queryset.get_or_create(pk=1)[0]
+
+
+def number_events():
+    """ Gives the next sequence numbers to the committed events without
+    them """
+
+    if not ScheduleEvent.objects.filter(sequence__isnull=True).exists():
+        return
+    with transaction.atomic():
+        feed = get_feed(lock=True)
+        table = connection.ops.quote_name(ScheduleEvent._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET sequence = numbered.sequence FROM ('
+                f'SELECT id, %s + row_number() OVER (ORDER BY id) AS sequence '
+                f'FROM {table} WHERE sequence IS NULL) AS numbered '
+                f'WHERE {table}.id = numbered.id',
+                [feed.last_sequence]
+            )
+            feed.last_sequence += cursor.rowcount
+        feed.save(update_fields=['last_sequence'])
+
+
+def last_sequence():
+    """ The number of the last change (0 if there are no events) """
+
+    number_events()
+    return get_feed().last_sequence
+
+
+def is_expired(since):
+    """ Whether the events following the number are deleted already,
+    so the client has to reload the schedule """
+
+    return since < get_feed().pruned_through
+
+
+def changes_since(since, limit=MAX_EVENTS):
+    number_events()
+    return list(ScheduleEvent.objects.filter(
+        sequence__gt=since).order_by('sequence')[:limit])
+
+
+def prune_events():
+    """ Deletes the events older than RETENTION. Returns their amount """
+
+    number_events()
+    with transaction.atomic():
+        feed = get_feed(lock=True)
+        through = ScheduleEvent.objects.filter(
+            created_at__lt=timezone.now() - RETENTION
+        ).aggregate(Max('sequence'))['sequence__max']
+        if through is None:
+            return 0
+        # the numbers stay contiguous, also of the events created late
+        deleted, _ = ScheduleEvent.objects.filter(
+            sequence__lte=through).delete()
+        feed.pruned_through = through
+        feed.save(update_fields=['pruned_through'])
+    return deleted
+
+
+async def wait_for_changes(since, timeout):
+    """ Returns the events following the number, waiting up to timeout
+    seconds for them. The list is empty if nothing has changed """
+
+    deadline = time.monotonic() + timeout
+    get_version = sync_to_async(get_schedule_version)
+    version = await get_version()
+    while True:
+        events = await sync_to_async(changes_since)(since)
+        if events or time.monotonic() >= deadline:
+            return events
+        # the version also changes once the change is committed
+        while time.monotonic() < deadline and await get_version() == version:
+            await asyncio.sleep(POLL_STEP)
+        version = await get_version()
@@ -0,0 +1,48 @@
+""" Streaming export of lessons.
+
+Rows are read from a server-side cursor in chunks and written to the
+response one by one, so the memory used by an export doesn't depend on
+the amount of lessons """
+
+import csv
+import json
+
+
+FIELDS = ('id', 'student', 'salary', 'time', 'date')
+CHUNK_SIZE = 2000  # rows fetched from the database at once
+
+
+def export_rows(queryset):
+    return queryset.order_by('date', 'time', 'id').values_list(
+        *FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+def to_ndjson(rows):
+    for pk, student, salary, time, date in rows:
+        yield json.dumps({
+            'id': pk,
+            'student': student,
+            'salary': salary,
+            'time': time.strftime(r'%H:%M:%S'),
+            'date': date.isoformat(),
+        }) + '\n'
+
+
+class Echo:
+    """ File-like object returning the written line to csv.writer """
+
+    def write(self, value):
+        return value
+
+
+def to_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+FORMATS = {
+    'ndjson': (to_ndjson, 'application/x-ndjson'),
+    'csv': (to_csv, 'text/csv'),
+}
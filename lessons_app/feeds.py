@@ -0,0 +1,161 @@
+""" iCalendar (ICS) feeds of the schedule.
+
+Calendar applications can't log in, so a feed is opened by a signed
+token carrying the user, the kind of the feed (own lessons of a student
+or the whole schedule for admin) and the feed key of the user. Every
+request checks by one query that the key is still the current one of
+the user and the user is still active and, for the admin feed, an
+admin, so a leaked url is revoked by a new key (see FeedTokenAPI). A
+poll of an unchanged feed is answered with 304 by the schedule version
+(and the details version of the users for the admin feed) after that
+check (see CalendarFeed view) """
+
+import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from .availability import LESSON_DURATION
+from .models import Lesson, TimeBlock, FeedKey, new_feed_key
+from .window import get_window
+
+
+TOKEN_SALT = 'lessons_app.feeds'
+TOKEN_MAX_AGE = datetime.timedelta(days=365)
+STUDENT_FEED = 'student'
+ADMIN_FEED = 'admin'
+HISTORY_DAYS = 90  # past days kept in the calendars
+
+
+def make_token(user):
+    """ Returns the feed token of the user, None before a token is issued
+    to the user """
+
+    key = FeedKey.objects.filter(user=user).values_list(
+        'key', flat=True).first()
+    return dump_token(user, key) if key else None
+
+
+def issue_token(user):
+    """ Returns a token of a new feed key, the feed tokens of the user
+    made before stop working """
+
+    key = new_feed_key()
+    FeedKey.objects.update_or_create(user=user, defaults={'key': key})
+    return dump_token(user, key)
+
+
+def dump_token(user, key):
+    # the same predicate as the admin panel (AdminAccessMixin)
+    feed = ADMIN_FEED if user.is_superuser else STUDENT_FEED
+    return signing.dumps({'user': user.pk, 'feed': feed, 'key': key},
+                         salt=TOKEN_SALT)
+
+
+def load_token(token):
+    """ Returns (user id, feed) or None for an invalid, expired or revoked
+    token """
+
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if not data.get('key'):
+        return None
+    users = User.objects.filter(pk=data['user'], is_active=True,
+                                feed_key__key=data['key'])
+    if data['feed'] == ADMIN_FEED:
+        users = users.filter(is_superuser=True)
+    if not users.exists():
+        return None
+    return data['user'], data['feed']
+
+
+def escape(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+
+def fold(line):
+    """ Lines longer than 75 octets continue after CRLF and a space """
+
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while encoded:
+        size = 75 if not parts else 74
+        # don't split a multibyte character
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        parts.append(encoded[:size].decode())
+        encoded = encoded[size:]
+    return '\r\n '.join(parts)
+
+
+def to_utc(moment):
+    """ Local time of TIME_ZONE in the iCalendar UTC format """
+
+    return timezone.make_aware(moment).astimezone(
+        datetime.timezone.utc).strftime(r'%Y%m%dT%H%M%SZ')
+
+
+def event(uid, start, end, summary, stamp):
+    return [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART:{to_utc(start)}',
+        f'DTEND:{to_utc(end)}',
+        f'SUMMARY:{escape(summary)}',
+        'END:VEVENT',
+    ]
+
+
+def lesson_event(uid, date, time, summary, stamp):
+    start = datetime.datetime.combine(date, time)
+    return event(uid, start,
+                 start + datetime.timedelta(minutes=LESSON_DURATION),
+                 summary, stamp)
+
+
+def render_feed(user_id, feed, host):
+    """ Returns the ICS text of the feed """
+
+    since = get_window().start - datetime.timedelta(days=HISTORY_DAYS)
+    stamp = timezone.now().strftime(r'%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//CalendarAPI//Lessons//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape(_("Lessons"))}',
+        f'X-WR-TIMEZONE:{settings.TIME_ZONE}',
+    ]
+
+    lessons = Lesson.objects.filter(date__gte=since)
+    if feed == ADMIN_FEED:
+        for pk, date, time, name, alias in lessons.values_list(
+                'id', 'date', 'time', 'student__first_name',
+                'student__details__alias'):
+            lines += lesson_event(f'lesson-{pk}@{host}', date, time,
+                                  alias or name, stamp)
+        for pk, date, start_time, end_time in TimeBlock.objects.filter(
+                date__gte=since
+        ).values_list('id', 'date', 'start_time', 'end_time'):
+            lines += event(f'block-{pk}@{host}',
+                           datetime.datetime.combine(date, start_time),
+                           datetime.datetime.combine(date, end_time),
+                           _('Blocked time'), stamp)
+    else:
+        for pk, date, time in lessons.filter(
+                student_id=user_id).values_list('id', 'date', 'time'):
+            lines += lesson_event(f'lesson-{pk}@{host}', date, time,
+                                  _('Lesson'), stamp)
+
+    lines.append('END:VCALENDAR')
+    return ''.join(fold(line) + '\r\n' for line in lines)
@@ -0,0 +1,53 @@
+""" Server-side filters of lesson lists """
+
+from datetime import datetime
+
+from django.utils.translation import gettext as _
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+class LessonFilter(BaseFilterBackend):
+    """ Query parameters: date_from, date_to (YYYY-MM-DD), student (id),
+    salary_min, salary_max. Every filter is a condition of one query on
+    the lesson table (date and student use its indexes) """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        date_from = self.get_date(params, 'date_from')
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        date_to = self.get_date(params, 'date_to')
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        student = self.get_number(params, 'student')
+        if student is not None:
+            queryset = queryset.filter(student_id=student)
+        salary_min = self.get_number(params, 'salary_min')
+        if salary_min is not None:
+            queryset = queryset.filter(salary__gte=salary_min)
+        salary_max = self.get_number(params, 'salary_max')
+        if salary_max is not None:
+            queryset = queryset.filter(salary__lte=salary_max)
+        return queryset
+
+    def get_date(self, params, param):
+        value = params.get(param)
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, r'%Y-%m-%d').date()
+        except ValueError:
+            raise ValidationError(
+                {param: _("Date must be in 'YYYY-MM-DD' format")}
+            )
+
+    def get_number(self, params, param):
+        value = params.get(param)
+        if not value:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({param: _("Must be a number")})
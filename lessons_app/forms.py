@@ -6,10 +6,21 @@ from django.contrib.auth.models import User
 from django.contrib.auth.forms import AuthenticationForm
 from django.utils.translation import gettext as _
 
-from .models import Lesson, TimeBlock
-from CalendarApi.constraints import (
-    С_morning_time, C_evening_time,  C_timedelta,  C_datedelta
-)
+from .availability import get_day
+from .bulk import MAX_BULK_DAYS
+from .profiling import CPROFILE, SAMPLE
+from .rules import booking_errors, lesson_errors, timeblock_errors
+from .window import get_window
+from CalendarApi.constraints import С_morning_time, C_evening_time
+
+
+def report(request, errors):
+    """ Shows the broken rules to the user. Returns True if there are
+    none """
+
+    for error in errors:
+        messages.error(request, error)
+    return not errors
 
 
 class RegisterUserForm(forms.Form):
@@ -179,67 +190,12 @@ class AddLessonForm(forms.Form):
             r"%Y-%m-%d"
         ).date()
 
-        dt_now = datetime.datetime.now()
-
-        # sign up is impossible for past date or today + 8 days
-        if datetime.datetime.combine(date, time) < dt_now:
-            messages.error(
-                request,
-                _("The date {} has already arrived").format(date)
-            )
-            return False
-        elif date > (dt_now + C_datedelta).date():
-            messages.error(
-                request,
-                _("Please don't book a lesson earlier then {} "
-                  "days in advace").format(C_datedelta.days)
-            )
+        errors = booking_errors(date, time) + lesson_errors(get_day(date),
+                                                            time)
+        if not report(request, errors):
             return False
 
-        # sign up is impossible for next 3 hours
-        if datetime.datetime.combine(date, time) < dt_now + C_timedelta:
-            messages.error(
-                request,
-                _("Please, sign up for a lesson {} hours before to "
-                  "start").format(C_timedelta)
-            )
-            return False
-
-        # constraint of working hours (8-23)
-        if time < С_morning_time:
-            messages.error(request, _("The time {} is too early").format(time))
-            return False
-        elif time > C_evening_time:
-            messages.error(request, _("The time {} is too late").format(time))
-            return False
-
-        # free time check
-        queryset = Lesson.objects.filter(date=date).values_list('time')
-        times = [item[0] for item in queryset]
-        for t1 in times:
-            t2 = datetime.time(t1.hour+1, t1.minute, t1.second)
-            if t1 <= time < t2:
-                messages.error(
-                    request,
-                    _("Some lesson is already scheduled for {} that "
-                      "day").format(t1)
-                )
-                return False
-
-        # check blocked time overlap
-        blocked_times = TimeBlock.objects.filter(date=date).values(
-            'start_time', 'end_time')
-        for blocked_time in blocked_times:
-            if (blocked_time['start_time'] <= time < blocked_time['end_time']
-                    or time == blocked_time['end_time'] == datetime.time(23)):
-                messages.error(
-                    request,
-                    _("This time is blocked")
-                )
-                return False
-
-        # super consist variable because it is used by AddLessonAdminForm class
-        return super(forms.Form, self).is_valid()
+        return super().is_valid()
 
 
 class AddLessonAdminForm(forms.Form):
@@ -290,27 +246,15 @@ class AddLessonAdminForm(forms.Form):
             r"%Y-%m-%d"
         ).date()
 
+        errors = []
         if form['student'].value() == '':
-            messages.error(
-                request,
-                _("Please, select a student")
-            )
+            errors.append(_("Please, select a student"))
+        errors += booking_errors(date, time) + lesson_errors(get_day(date),
+                                                             time)
+        if not report(request, errors):
             return False
 
-        # check blocked time overlap
-        blocked_times = TimeBlock.objects.filter(date=date).values(
-            'start_time', 'end_time')
-        for blocked_time in blocked_times:
-            if (blocked_time['start_time'] <= time < blocked_time['end_time']
-                    or time == blocked_time['end_time'] == datetime.time(23)):
-                messages.error(
-                    request,
-                    _("This time is blocked")
-                )
-                return False
-
-        # uses created validator from AddLessonForm class
-        return AddLessonForm.is_valid(self, request, form)
+        return super().is_valid()
 
 
 class TimeBlockerAPForm(forms.Form):
@@ -350,65 +294,101 @@ class TimeBlockerAPForm(forms.Form):
         start_time = datetime.datetime.strptime(start_time, r'%H').time()
         end_time = datetime.datetime.strptime(end_time, r'%H').time()
 
-        # check of times
-        if start_time > end_time:
-            messages.error(
-                request,
-                _("'Start time' must be earlier than 'End time'")
-            )
-            return False
-        elif start_time == end_time:
-            messages.error(
-                request,
-                _("'Start time' and 'End time' can't be equal")
-            )
+        errors = timeblock_errors(get_day(date), start_time, end_time,
+                                  get_window().start)
+        if not report(request, errors):
             return False
 
-        # checking if block overlap
-        blocked_times = TimeBlock.objects.filter(date=date).values(
-            'start_time', 'end_time')
-        for blocked_time in blocked_times:
-            condition_1 = (blocked_time['start_time'] <= start_time
-                           < blocked_time['end_time'])
-            condition_2 = (blocked_time['start_time'] < end_time
-                           < blocked_time['end_time'])
-            condition_3 = (start_time < blocked_time['end_time']
-                           and end_time > blocked_time['start_time'])
-            if condition_1 or condition_2 or condition_3:
-                messages.error(
-                    request,
-                    _("The new block overlaps the existing one")
-                )
-                return False
+        return super().is_valid()
 
-        # check for future date (date > today)
-        today = datetime.date.today()
-        if date < today:
-            messages.error(
-                request,
-                _("Date can't be earlier than today")
-            )
-            return False
 
-        # check for date in the current period (8 day)
-        if date > today + C_datedelta:
-            messages.error(
-                request,
-                _("You are creating the block too early")
-            )
-            return False
+class BulkTimeBlockerAPForm(forms.Form):
+    """ Form for blocking many days in the admin panel """
 
-        # check for non-existence of lessons
-        lessons = Lesson.objects.filter(date=date).values('time')
-        for lesson in lessons:
-            if start_time <= lesson['time'] < end_time:
-                messages.error(
-                    request,
-                    _("Your block overlaps an existing lesson")
-                )
-                return False
+    date_from = forms.DateField(
+        label=_('From'),
+        widget=forms.DateInput(attrs={
+            'class': 'form-control',
+            'type': 'date'
+        })
+    )
+    date_to = forms.DateField(
+        label=_('To'),
+        widget=forms.DateInput(attrs={
+            'class': 'form-control',
+            'type': 'date'
+        })
+    )
+    weekdays = forms.TypedMultipleChoiceField(
+        label=_('Only on weekdays'),
+        choices=[
+            (0, _('Monday')), (1, _('Tuesday')), (2, _('Wednesday')),
+            (3, _('Thursday')), (4, _('Friday')), (5, _('Saturday')),
+            (6, _('Sunday'))
+        ],
+        coerce=int,
+        widget=forms.CheckboxSelectMultiple,
+        required=False
+    )
+    start_time = forms.IntegerField(
+        label=_('Start time'),
+        min_value=0,
+        max_value=23,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'value': С_morning_time.hour
+        })
+    )
+    end_time = forms.IntegerField(
+        label=_('End time'),
+        min_value=0,
+        max_value=23,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'value': C_evening_time.hour
+        })
+    )
 
-        return super().is_valid()
+    def is_valid(self, request) -> bool:
+        if not super().is_valid():
+            return report(request, [
+                f'{self.fields[name].label}: {error}'
+                for name, errors in self.errors.items() for error in errors
+            ])
+
+        errors = []
+        if self.cleaned_data['start_time'] >= self.cleaned_data['end_time']:
+            errors.append(_("'Start time' must be earlier than 'End time'"))
+        days = (self.cleaned_data['date_to']
+                - self.cleaned_data['date_from']).days + 1
+        if not 0 < days <= MAX_BULK_DAYS:
+            errors.append(_("The range must contain from 1 to {} "
+                            "days").format(MAX_BULK_DAYS))
+        return report(request, errors)
+
+
+class ProfileLinkAPForm(forms.Form):
+    """ Form for getting a link to profile a request in the admin panel """
+
+    path = forms.CharField(
+        label=_('Page or API path'),
+        initial='/',
+        widget=forms.TextInput(attrs={'class': 'form-control'})
+    )
+    mode = forms.ChoiceField(
+        label=_('Profiler'),
+        choices=[
+            (CPROFILE, _('cProfile (every call)')),
+            (SAMPLE, _('Sampling (flame graph)')),
+        ],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    def clean_path(self):
+        path = self.cleaned_data['path']
+        if not path.startswith('/') or path.startswith('//'):
+            raise forms.ValidationError(_("The path must start with '/'"))
+        return path
 
 
 class StudentUpdateForm(forms.Form):
@@ -0,0 +1,205 @@
+""" Micro-benchmarks of the hot paths against the local database.
+
+    python manage.py seed_calendar --lessons 100000
+    python manage.py benchmark --output baseline.json
+    ... changes ...
+    python manage.py benchmark --baseline baseline.json
+
+Every case is a call of the validators, the pricing, the homepage
+schedule or the serializers (these at several amounts of rows). A case
+is called in a loop long enough to time (--min-time) and the loop is
+repeated (--repeat); the median time of a call is compared with the
+baseline. The caches are warm after the first call, as in a running
+server. A case slower than the baseline by more than --threshold fails
+the command, so it can guard a deploy. The times depend on the machine
+and the data, so the baseline has to be made on the same ones """
+
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timedelta
+from datetime import time as day_time
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.exceptions import ValidationError
+
+from lessons_app.models import Lesson, TimeBlock
+from lessons_app.pricing import quote
+from lessons_app.serializers import LessonSerializer, UserSerializer
+from lessons_app.validators import (
+    UserValidator, AdminValidator, TimeBlockValidator
+)
+from lessons_app.views import LessonView, get_weekdays
+from lessons_app.window import get_window
+
+
+SIZES = (10, 100, 1000)
+
+
+def validate(validator, attrs):
+    """ Both outcomes of a validation are timed """
+
+    try:
+        validator(attrs)
+    except ValidationError:
+        pass
+
+
+def measure(function, repeat, min_time):
+    """ Returns (calls per loop, seconds per call of every loop) """
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return number, times
+
+
+class Command(BaseCommand):
+    help = 'Times the validators, the pricing, the homepage schedule and ' \
+           'the serializers and compares them with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=','.join(map(str, SIZES)),
+                            help='rows serialized at once, comma-separated')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--min-time', type=float, default=0.2,
+                            help='seconds of one loop of a case')
+        parser.add_argument('--case', action='append', dest='cases',
+                            help='run the cases containing the text, may '
+                                 'be repeated')
+        parser.add_argument('--output', help='JSON file of the results')
+        parser.add_argument('--baseline',
+                            help='JSON file of earlier results to compare')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='allowed slowdown, 0.2 is 20%%')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options['sizes'].split(',')})
+        except ValueError:
+            raise CommandError('--sizes must be comma-separated numbers')
+        if options['repeat'] < 1 or any(size < 1 for size in sizes):
+            raise CommandError('--repeat and --sizes must be positive')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+
+        results = {}
+        for name, function in self.get_cases(sizes):
+            if options['cases'] and not any(
+                    text in name for text in options['cases']):
+                continue
+            function()  # fills the caches
+            number, times = measure(function, options['repeat'],
+                                    options['min_time'])
+            results[name] = {
+                'number': number,
+                'min_us': round(min(times) * 1e6, 2),
+                'median_us': round(statistics.median(times) * 1e6, 2),
+            }
+            self.stdout.write('{:<40} {:>12.1f} us'.format(
+                name, results[name]['median_us']))
+
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'data': self.get_data_size(),
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=4)
+        if baseline is not None:
+            self.compare(report, baseline, options['threshold'])
+
+    def get_data_size(self):
+        return {
+            'lessons': Lesson.objects.count(),
+            'timeblocks': TimeBlock.objects.count(),
+            'users': User.objects.count(),
+        }
+
+    def get_cases(self, sizes):
+        """ (name, function) of every case """
+
+        student = User.objects.filter(is_staff=False).order_by('pk').first()
+        if student is None:
+            raise CommandError('There are no students, seed the database '
+                               'first (manage.py seed_calendar)')
+        date = get_window().start + timedelta(days=2)
+        time = day_time(12)
+
+        cases = [
+            ('validators.UserValidator', lambda: validate(
+                UserValidator(), {'date': date, 'time': time})),
+            ('validators.AdminValidator', lambda: validate(
+                AdminValidator(),
+                {'date': date, 'time': time, 'student': student})),
+            ('validators.TimeBlockValidator', lambda: validate(
+                TimeBlockValidator(),
+                {'date': date, 'start_time': day_time(10),
+                 'end_time': day_time(11)})),
+            # the salary of LessonsViewSet.perform_create()
+            ('pricing.quote', lambda: quote(student.pk, date, time)),
+            ('views.get_weekdays', get_weekdays),
+            ('views.LessonView.get_queryset',
+             lambda: LessonView().get_queryset()),
+        ]
+
+        lessons = list(Lesson.objects.order_by('-date', '-time')[:sizes[-1]])
+        users = list(User.objects.select_related('details').filter(
+            details__isnull=False).order_by('pk')[:sizes[-1]])
+        for size in sizes:
+            if size <= len(lessons):
+                cases.append((
+                    f'serializers.LessonSerializer[{size}]',
+                    lambda rows=lessons[:size]: LessonSerializer(
+                        rows, many=True).data
+                ))
+            if size <= len(users):
+                cases.append((
+                    f'serializers.UserSerializer[{size}]',
+                    lambda rows=users[:size]: UserSerializer(
+                        rows, many=True).data
+                ))
+        return cases
+
+    def compare(self, report, baseline, threshold):
+        if report['data'] != baseline.get('data'):
+            self.stderr.write('The data differs from the baseline: {} '
+                              'now, {} then'.format(report['data'],
+                                                    baseline.get('data')))
+        self.stdout.write('\n{:<40} {:>12} {:>12} {:>8}'.format(
+            'case', 'baseline, us', 'now, us', 'change'))
+        regressions = []
+        for name, result in report['results'].items():
+            before = baseline['results'].get(name)
+            if before is None:
+                continue
+            change = result['median_us'] / before['median_us'] - 1
+            self.stdout.write('{:<40} {:>12.1f} {:>12.1f} {:>+7.0%}'.format(
+                name, before['median_us'], result['median_us'], change))
+            if change > threshold:
+                regressions.append(name)
+        if regressions:
+            raise CommandError('Slower than the baseline by more than '
+                               '{:.0%}: {}'.format(threshold,
+                                                   ', '.join(regressions)))
@@ -0,0 +1,139 @@
+""" Polling load on running servers.
+
+Every client polls the read endpoints in turn over a keep-alive
+connection, revalidating the responses with their ETags like a browser
+or an app does. Running the same load against the WSGI and the ASGI
+server (see gunicorn.conf.py) compares them:
+
+    gunicorn --bind 127.0.0.1:8000
+    SERVER_INTERFACE=asgi gunicorn --bind 127.0.0.1:8001
+    python manage.py loadtest http://127.0.0.1:8000 http://127.0.0.1:8001
+
+The clients are threads of one process, so the rates above several
+thousand requests per second measure the client rather than the
+server """
+
+import http.client
+import math
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+PATHS = ('/', '/api/get-relevant-lessons', '/api/get-timeblocks',
+         '/api/free-slots')
+
+
+def percentile(values, share):
+    """ Nearest-rank percentile of sorted values """
+
+    if not values:
+        return 0
+    return values[max(math.ceil(share * len(values)) - 1, 0)]
+
+
+class Client(threading.Thread):
+    def __init__(self, url, paths, deadline, revalidate):
+        super().__init__(daemon=True)
+        self.url = url
+        self.paths = paths
+        self.deadline = deadline
+        self.revalidate = revalidate
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+
+    def run(self):
+        etags = {}
+        connection = None
+        i = 0
+        while time.monotonic() < self.deadline:
+            path = self.paths[i % len(self.paths)]
+            i += 1
+            headers = {}
+            if self.revalidate and path in etags:
+                headers['If-None-Match'] = etags[path]
+            if connection is None:
+                connection = http.client.HTTPConnection(
+                    self.url.hostname, self.url.port, timeout=30)
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                connection.close()
+                connection = None
+                continue
+            self.latencies.append(time.perf_counter() - start)
+            self.statuses[response.status] = \
+                self.statuses.get(response.status, 0) + 1
+            if response.getheader('ETag'):
+                etags[path] = response.getheader('ETag')
+        if connection is not None:
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Polls the read endpoints of the servers and reports req/s ' \
+           'and latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', metavar='url',
+                            help='e.g. http://127.0.0.1:8000')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='endpoint to poll, may be repeated '
+                                 '(the homepage and the read API by '
+                                 'default)')
+        parser.add_argument('--clients', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=10,
+                            help='seconds per server')
+        parser.add_argument('--no-revalidate', action='store_false',
+                            dest='revalidate',
+                            help="don't send If-None-Match")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or PATHS
+        self.stdout.write('{:<28} {:>9} {:>9} {:>9} {:>9} {:>7} {:>7}'.format(
+            'server', 'requests', 'req/s', 'p50, ms', 'p99, ms', '304, %',
+            'errors'
+        ))
+        for url in options['urls']:
+            result = self.load(url, paths, options)
+            self.stdout.write(
+                '{url:<28} {requests:>9} {rate:>9.1f} {p50:>9.1f} '
+                '{p99:>9.1f} {not_modified:>7.1f} {errors:>7}'.format(
+                    url=url, **result)
+            )
+
+    def load(self, url, paths, options):
+        parts = urlsplit(url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise CommandError(f'Unsupported url: {url}')
+
+        start = time.monotonic()
+        deadline = start + options['duration']
+        clients = [
+            Client(parts, paths, deadline, options['revalidate'])
+            for _ in range(options['clients'])
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - start
+
+        latencies = sorted(
+            latency for client in clients for latency in client.latencies)
+        not_modified = sum(client.statuses.get(304, 0) for client in clients)
+        return {
+            'requests': len(latencies),
+            'rate': len(latencies) / elapsed,
+            'p50': percentile(latencies, 0.5) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'not_modified': 100 * not_modified / max(len(latencies), 1),
+            'errors': sum(client.errors for client in clients),
+        }
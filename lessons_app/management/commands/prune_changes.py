@@ -0,0 +1,16 @@
+""" Deletes the events of the change feed older than a week.
+
+Run it daily, e.g. by Heroku Scheduler or cron:
+
+    python manage.py prune_changes """
+
+from django.core.management.base import BaseCommand
+
+from lessons_app.changes import prune_events
+
+
+class Command(BaseCommand):
+    help = 'Deletes the expired events of the change feed'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{prune_events()} events deleted')
@@ -0,0 +1,273 @@
+""" Synthetic schedule for scale testing.
+
+    python manage.py seed_calendar --students 2000 --lessons 1000000
+
+Students (seed_1, seed_2, ... with one password) are created with their
+details, then the days going back from the end of the booking window
+are filled with lessons until there are enough of them, so a larger
+amount means a longer history. The schedule is valid: lessons of a day
+don't overlap, blocks don't cover lessons and the salaries follow the
+pricing rules. Most lessons are in the evening, some days are full,
+some have a block, and a few students take most of the lessons.
+
+Days already having lessons or blocks are skipped, so running the
+command again adds older history. The lessons and the blocks are loaded
+by COPY on PostgreSQL (by bulk_create elsewhere) in batches. They aren't
+written to the change feed, the schedule caches are invalidated once """
+
+import csv
+import datetime
+import io
+import random
+import time as clock
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from lessons_app.models import Lesson, TimeBlock, UserDetail
+from lessons_app.pricing import price
+from lessons_app.signals import schedule_changed
+from lessons_app.window import get_window
+from CalendarApi.constraints import (
+    С_morning_time, C_evening_time, C_salary_common, C_salary_high
+)
+
+
+HOURS = tuple(range(С_morning_time.hour, C_evening_time.hour + 1))
+# relative demand of the hours, the most after school and work
+HOUR_WEIGHTS = dict(zip(HOURS, (1, 2, 3, 3, 3, 3, 4, 5, 6, 8, 9, 9, 8, 6,
+                                3, 1)))
+# share of the average amount of lessons, from Monday
+WEEKDAY_WEIGHTS = (1, 1.1, 1, 1.1, 0.9, 0.8, 0.5)
+BLOCK_HOURS = (2, 4)  # shortest and longest block
+MAX_BOOKING_DAYS = 7  # how early a lesson is booked
+
+
+class Command(BaseCommand):
+    help = 'Creates students and a history of lessons and blocks for ' \
+           'scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=100)
+        parser.add_argument('--lessons', type=int, default=10000)
+        parser.add_argument('--per-day', type=float, default=6,
+                            help='average lessons of a day')
+        parser.add_argument('--full-days', type=float, default=0.05,
+                            help='share of fully booked days')
+        parser.add_argument('--blocked-days', type=float, default=0.1,
+                            help='share of days with a block')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--seed', type=int,
+                            help='of the random generator, for the same '
+                                 'data every time')
+        parser.add_argument('--prefix', default='seed_',
+                            help='of the usernames')
+        parser.add_argument('--password', default='seed_pass',
+                            help='of every student')
+        parser.add_argument('--no-copy', action='store_false', dest='copy',
+                            help='use bulk_create on PostgreSQL too')
+        parser.add_argument('--clear', action='store_true',
+                            help='delete the students of the prefix and '
+                                 'their lessons first')
+
+    def handle(self, *args, **options):
+        if options['students'] < 1 or options['lessons'] < 0:
+            raise CommandError('There must be students and no negative '
+                               'amount of lessons')
+        if not 0 < options['per_day'] <= len(HOURS):
+            raise CommandError(f'--per-day must be in (0, {len(HOURS)}]')
+        if options['full_days'] + options['blocked_days'] > 1:
+            raise CommandError('--full-days and --blocked-days are shares '
+                               'of days, their sum must not exceed 1')
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.use_copy = options['copy'] and connection.vendor == 'postgresql'
+
+        start = clock.monotonic()
+        with transaction.atomic():
+            if options['clear']:
+                self.clear(options['prefix'])
+            students = self.create_students(options['students'])
+            lessons, blocks, first, last = self.create_schedule(
+                students, options['lessons'])
+            if self.use_copy:
+                with connection.cursor() as cursor:
+                    for model in (Lesson, TimeBlock, User, UserDetail):
+                        cursor.execute('ANALYZE {}'.format(
+                            connection.ops.quote_name(model._meta.db_table)))
+        # bulk_create and COPY send no signals
+        schedule_changed(Lesson)
+
+        self.stdout.write(
+            '{} students, {} lessons and {} blocks from {} to {} in {:.1f} '
+            's'.format(len(students), lessons, blocks, first, last,
+                       clock.monotonic() - start)
+        )
+
+    def clear(self, prefix):
+        # deleting the lessons by the ORM would send a signal for every one
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM {} WHERE student_id IN (SELECT id FROM {} '
+                "WHERE username LIKE %s ESCAPE '\\' AND NOT is_staff)".format(
+                    connection.ops.quote_name(Lesson._meta.db_table),
+                    connection.ops.quote_name(User._meta.db_table)),
+                [prefix.replace('_', r'\_').replace('%', r'\%') + '%']
+            )
+        User.objects.filter(username__startswith=prefix,
+                            is_staff=False).delete()
+
+    def create_students(self, amount):
+        prefix = self.options['prefix']
+        numbers = [
+            username[len(prefix):] for username in User.objects.filter(
+                username__startswith=prefix).values_list('username',
+                                                         flat=True)
+        ]
+        first = max((int(number) for number in numbers if number.isdigit()),
+                    default=0) + 1
+        password = make_password(self.options['password'])
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}{i}', first_name=f'Student {i}',
+                 password=password)
+            for i in range(first, first + amount)
+        ], batch_size=self.options['batch_size'])
+        UserDetail.objects.bulk_create([
+            UserDetail(user=user,
+                       phone='89{:09d}'.format(self.rng.randrange(10 ** 9)),
+                       telegram=f'@{user.username}')
+            for user in users
+        ], batch_size=self.options['batch_size'])
+        return [user.pk for user in users]
+
+    def create_schedule(self, students, amount):
+        """ Returns the amounts of lessons and blocks, the first and the
+        last date """
+
+        # a few students take most of the lessons
+        weights = list(accumulate(
+            1 / (rank + 1) ** 0.8 for rank in range(len(students))))
+        self.rng.shuffle(students)
+        busy = set()
+        for model in (Lesson, TimeBlock):
+            busy.update(model.objects.order_by().values_list(
+                'date', flat=True).distinct())
+
+        lessons = []
+        blocks = []
+        lesson_count = block_count = 0
+        date = first = last = get_window().end
+        while lesson_count + len(lessons) < amount:
+            if date not in busy:
+                first = date
+                hours, block = self.plan_day(date)
+                hours = hours[:amount - lesson_count - len(lessons)]
+                lessons += self.day_lessons(
+                    date, hours,
+                    self.rng.choices(students, cum_weights=weights,
+                                     k=len(hours)))
+                if block is not None:
+                    blocks.append((date, datetime.time(block[0]),
+                                   datetime.time(block[1])))
+            if len(lessons) >= self.options['batch_size']:
+                lesson_count += self.insert(
+                    Lesson, ('date', 'time', 'student_id', 'salary',
+                             'created_at'), lessons)
+                lessons = []
+            date -= datetime.timedelta(days=1)
+        lesson_count += self.insert(
+            Lesson, ('date', 'time', 'student_id', 'salary', 'created_at'),
+            lessons)
+        block_count = self.insert(TimeBlock,
+                                  ('date', 'start_time', 'end_time'), blocks)
+        return lesson_count, block_count, first, last
+
+    def plan_day(self, date):
+        """ Returns the hours of the lessons of the day in the order they
+        were booked and the (start, end) hours of its block or None """
+
+        share = self.rng.random()
+        if share < self.options['full_days']:
+            hours = list(HOURS)
+            self.rng.shuffle(hours)
+            return hours, None
+
+        block = None
+        free = HOURS
+        if share < self.options['full_days'] + self.options['blocked_days']:
+            length = self.rng.randint(*BLOCK_HOURS)
+            # the block ends before the last business hour, that one is
+            # blocked too by a block up to its start (see availability.py)
+            start = self.rng.randrange(HOURS[0], HOURS[-1] - length)
+            block = (start, start + length)
+            free = [hour for hour in HOURS
+                    if not start <= hour < start + length]
+
+        mean = self.options['per_day'] * WEEKDAY_WEIGHTS[date.weekday()]
+        count = min(max(round(self.rng.gauss(mean, mean / 3)), 0), len(free))
+        # weighted sampling without replacement (Efraimidis-Spirakis)
+        hours = sorted(
+            free, key=lambda hour: self.rng.random() ** (
+                1 / HOUR_WEIGHTS[hour]),
+            reverse=True
+        )
+        return hours[:count], block
+
+    def day_lessons(self, date, hours, students):
+        now = timezone.now()
+        rates = (C_salary_common, C_salary_high)
+        # once a day, make_aware() takes longer than the rest of a row
+        midnight = timezone.make_aware(
+            datetime.datetime.combine(date, datetime.time()))
+        rows = []
+        for booked, (hour, student) in enumerate(zip(hours, students)):
+            time = datetime.time(hour)
+            created_at = min(now, midnight + datetime.timedelta(
+                hours=hour, seconds=-self.rng.uniform(
+                    3 * 3600, MAX_BOOKING_DAYS * 86400)))
+            rows.append((date, time, student,
+                         price(rates, time, booked).salary, created_at))
+        return rows
+
+    def insert(self, model, fields, rows):
+        if not rows:
+            return 0
+        if self.use_copy:
+            file = io.StringIO()
+            csv.writer(file).writerows(rows)
+            file.seek(0)
+            columns = ', '.join(
+                connection.ops.quote_name(model._meta.get_field(field).column)
+                for field in fields
+            )
+            with connection.cursor() as cursor:
+                cursor.copy_expert('COPY {} ({}) FROM STDIN WITH (FORMAT '
+                                   'csv)'.format(connection.ops.quote_name(
+                                       model._meta.db_table), columns), file)
+        else:
+            objects = [model(**dict(zip(fields, row))) for row in rows]
+            model.objects.bulk_create(objects,
+                                      batch_size=self.options['batch_size'])
+            if 'created_at' in fields:
+                # bulk_create sets it to now (auto_now_add)
+                column = fields.index('created_at')
+                self.restore_created_at(model, objects,
+                                        [row[column] for row in rows])
+        return len(rows)
+
+    def restore_created_at(self, model, objects, values):
+        for obj, value in zip(objects, values):
+            obj.created_at = value
+        if objects[0].pk is None:
+            # the backend doesn't return the ids (SQLite), the new rows
+            # have the greatest ones in the order of the objects
+            ids = model.objects.order_by('-pk').values_list(
+                'pk', flat=True)[:len(objects)]
+            for obj, pk in zip(objects, reversed(ids)):
+                obj.pk = pk
+        model.objects.bulk_update(objects, ['created_at'],
+                                  batch_size=self.options['batch_size'])
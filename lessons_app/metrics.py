@@ -0,0 +1,77 @@
+""" Prometheus metrics of the requests, the booking and the caches.
+
+Every gunicorn worker counts in its own process. With the environment
+variable PROMETHEUS_MULTIPROC_DIR set (gunicorn.conf.py sets it before
+the workers start) the values are kept in memory-mapped files of the
+directory, and /metrics sums the files of all the workers, so any
+worker answering the scrape reports the whole server. Without it (e.g.
+runserver) the metrics are of the one process.
+
+The latency histograms are labelled with the URL pattern of the view
+rather than the path, so the number of series stays fixed """
+
+import os
+
+from django.db import transaction
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest,
+    multiprocess
+)
+
+
+MULTIPROCESS_DIR = 'PROMETHEUS_MULTIPROC_DIR'
+UNMATCHED = 'unmatched'  # route label of requests of unknown paths
+
+REQUEST_DURATION = Histogram(
+    'lessons_request_duration_seconds', 'Time of handling a request',
+    ['route', 'method'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+)
+REQUESTS = Counter(
+    'lessons_requests', 'Handled requests', ['route', 'method', 'status']
+)
+DB_DURATION = Histogram(
+    'lessons_request_db_duration_seconds',
+    'Time of the SQL queries of a request', ['route'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+)
+DB_QUERIES = Counter(
+    'lessons_db_queries', 'SQL queries of the requests', ['route']
+)
+REJECTIONS = Counter(
+    'lessons_rejections', 'Lessons and time blocks rejected by the rules '
+    'of the schedule', ['reason']
+)
+BOOKINGS = Counter(
+    'lessons_bookings', 'Booked lessons', ['mode']
+)
+CACHE = Counter(
+    'lessons_schedule_cache', 'Lookups of values built from the schedule '
+    '(hit_local, hit_shared or miss)', ['result']
+)
+
+
+def observe_request(route, method, status, duration, queries, db_duration):
+    route = route if route is not None else UNMATCHED
+    REQUEST_DURATION.labels(route, method).observe(duration)
+    REQUESTS.labels(route, method, str(status)).inc()
+    DB_DURATION.labels(route).observe(db_duration)
+    DB_QUERIES.labels(route).inc(queries)
+
+
+def count_bookings(amount, mode):
+    """ Counts the lessons once they are committed """
+
+    if amount:
+        transaction.on_commit(lambda: BOOKINGS.labels(mode).inc(amount))
+
+
+def render_metrics():
+    """ Returns the metrics of the server in the text format """
+
+    if os.environ.get(MULTIPROCESS_DIR):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
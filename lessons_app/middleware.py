@@ -0,0 +1,183 @@
+""" Query count and latency of requests, and profiling of requests
+(see profiling.py).
+
+Every query of a request is timed by a wrapper of the database
+connection, so it works without DEBUG. The totals are sent in the
+Server-Timing header (browsers show it in the network panel) and logged
+as one JSON line with the slowest statements. A request issuing more
+queries than the budget of its endpoint (query_budgets.json) is logged
+as a warning. The same numbers go to the Prometheus metrics (see
+metrics.py). Queries run while a streaming response is sent come after
+the middleware and aren't counted """
+
+import asyncio
+import heapq
+import json
+import logging
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection
+from django.utils.deprecation import MiddlewareMixin
+
+from .metrics import observe_request
+from .profiling import QUERY_PARAM, HEADER, load_token, profile_request
+
+
+logger = logging.getLogger('lessons_app.requests')
+
+BUDGETS_FILE = Path(__file__).with_name('query_budgets.json')
+SLOWEST_AMOUNT = 3
+SQL_LENGTH = 300  # characters of a statement in the log
+
+
+class QueryRecorder:
+    """ execute_wrapper() counting and timing the queries """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+        self._slowest = []  # heap of (duration, number, sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            item = (duration, self.count, sql)
+            if len(self._slowest) < SLOWEST_AMOUNT:
+                heapq.heappush(self._slowest, item)
+            else:
+                heapq.heappushpop(self._slowest, item)
+
+    @property
+    def slowest(self):
+        return [
+            {'ms': round(duration * 1000, 2), 'sql': sql[:SQL_LENGTH]}
+            for duration, _, sql in sorted(self._slowest, reverse=True)
+        ]
+
+
+def add_wrapper(wrapper):
+    """ connection.execute_wrapper() split for an async caller, called
+    in the thread running the queries """
+
+    connection.execute_wrappers.append(wrapper)
+
+
+def remove_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+@lru_cache(maxsize=None)
+def load_budgets():
+    with open(BUDGETS_FILE, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def get_budget(route, method):
+    """ The most queries a request of the method to the URL pattern
+    (as it is written in urls.py) may issue, None if it has no budget """
+
+    return load_budgets().get(route, {}).get(method)
+
+
+class QueryInstrumentationMiddleware(MiddlewareMixin):
+    """ Times the request and counts its queries.
+
+    Under ASGI the middleware stays async (MiddlewareMixin switches to
+    __acall__) so the chain isn't run in a thread. The queries of an
+    ASGI request run in its own thread (thread sensitive sync_to_async),
+    the wrapper is added to the connection of that thread """
+
+    sync_capable = True
+    async_capable = True
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        return self.record(request, response, recorder,
+                           time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        await sync_to_async(add_wrapper)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(remove_wrapper)(recorder)
+        return self.record(request, response, recorder,
+                           time.perf_counter() - start)
+
+    def record(self, request, response, recorder, duration):
+        response['Server-Timing'] = \
+            'db;dur={:.1f};desc="{} queries", total;dur={:.1f}'.format(
+                recorder.duration * 1000, recorder.count, duration * 1000)
+        # for the tests (see tests/helpers.py)
+        response.query_count = recorder.count
+
+        match = request.resolver_match
+        route = match.route if match else None
+        observe_request(route, request.method, response.status_code,
+                        duration, recorder.count, recorder.duration)
+        budget = get_budget(route, request.method)
+        over_budget = budget is not None and recorder.count > budget
+        logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'route': route,
+                'status': response.status_code,
+                'ms': round(duration * 1000, 1),
+                'queries': recorder.count,
+                'db_ms': round(recorder.duration * 1000, 1),
+                'budget': budget,
+                'slowest': recorder.slowest,
+            })
+        )
+        return response
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """ Profiles the requests carrying a valid profiling token.
+
+    The profilers watch one thread: under ASGI a request with a token is
+    profiled in a thread, the async rest of the chain runs from it
+    (async_to_sync) and its sync parts in that same thread. The other
+    requests go on without leaving the event loop """
+
+    sync_capable = True
+    async_capable = True
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.profile(request, self.get_response)
+
+    async def __acall__(self, request):
+        if not get_token(request):
+            return await self.get_response(request)
+        return await sync_to_async(self.profile)(
+            request, async_to_sync(self.get_response))
+
+    def profile(self, request, get_response):
+        token = get_token(request)
+        mode = load_token(token) if token else None
+        if mode is None:
+            return get_response(request)
+        return profile_request(get_response, request, mode)
+
+
+def get_token(request):
+    return request.GET.get(QUERY_PARAM) or request.META.get(HEADER)
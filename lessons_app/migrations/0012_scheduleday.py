@@ -0,0 +1,25 @@
+# Generated by Django 4.0.3 on 2026-10-18 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons_app', '0011_alter_timeblock_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+            ],
+            options={
+                'verbose_name': 'Schedule day',
+                'verbose_name_plural': 'Schedule days',
+                'ordering': ('date',),
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.0.3 on 2026-10-18 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons_app', '0012_scheduleday'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['date', 'time'], name='lesson_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['student', 'date'], name='lesson_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeblock',
+            index=models.Index(fields=['date', 'start_time'], include=('end_time',), name='timeblock_date_start_idx'),
+        ),
+    ]
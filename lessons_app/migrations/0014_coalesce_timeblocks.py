@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def coalesce_timeblocks(apps, schema_editor):
+    """ Merges overlapping and adjacent blocks of each day into one """
+
+    TimeBlock = apps.get_model('lessons_app', 'TimeBlock')
+    kept = None
+    merged = []
+    changed = []
+    for block in TimeBlock.objects.order_by('date', 'start_time'):
+        if kept is not None and kept.date == block.date \
+                and block.start_time <= kept.end_time:
+            if block.end_time > kept.end_time:
+                kept.end_time = block.end_time
+                if kept not in changed:
+                    changed.append(kept)
+            merged.append(block.pk)
+        else:
+            kept = block
+    TimeBlock.objects.filter(pk__in=merged).delete()
+    TimeBlock.objects.bulk_update(changed, ['end_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons_app', '0013_lesson_timeblock_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(coalesce_timeblocks, migrations.RunPython.noop),
+    ]
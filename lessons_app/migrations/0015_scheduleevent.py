@@ -0,0 +1,29 @@
+# Generated by Django 4.0.3 on 2026-10-18 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons_app', '0014_coalesce_timeblocks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('lesson', 'Урок'), ('timeblock', 'Time block')], max_length=10)),
+                ('action', models.CharField(choices=[('created', 'Создан'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Schedule event',
+                'verbose_name_plural': 'Schedule events',
+                'ordering': ('id',),
+            },
+        ),
+    ]
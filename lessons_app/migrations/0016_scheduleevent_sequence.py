@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+def number_events(apps, schema_editor):
+    """ The existing events are numbered in the order of their ids """
+
+    ScheduleEvent = apps.get_model('lessons_app', 'ScheduleEvent')
+    ChangeFeed = apps.get_model('lessons_app', 'ChangeFeed')
+    sequence = 0
+    for event in ScheduleEvent.objects.order_by('id'):
+        sequence += 1
+        event.sequence = sequence
+        event.save(update_fields=['sequence'])
+    ChangeFeed.objects.create(pk=1, last_sequence=sequence)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons_app', '0015_scheduleevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_sequence', models.BigIntegerField(default=0)),
+                ('pruned_through', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Change feed',
+                'verbose_name_plural': 'Change feed',
+            },
+        ),
+        migrations.AddField(
+            model_name='scheduleevent',
+            name='sequence',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleevent',
+            index=models.Index(condition=models.Q(('sequence__isnull', True)), fields=['id'], name='event_unnumbered_idx'),
+        ),
+        migrations.RunPython(number_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.3 on 2026-10-18 06:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import lessons_app.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('lessons_app', '0016_scheduleevent_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(default=lessons_app.models.new_feed_key, max_length=32)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='feed_key', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Feed key',
+                'verbose_name_plural': 'Feed keys',
+            },
+        ),
+    ]
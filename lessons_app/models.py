@@ -1,3 +1,5 @@
+import secrets
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
@@ -19,6 +21,12 @@ class Lesson(models.Model):
         verbose_name = _('Lesson')
         verbose_name_plural = _('Lessons')
         ordering = ('date', 'time')
+        indexes = [
+            models.Index(fields=['date', 'time'],
+                         name='lesson_date_time_idx'),
+            models.Index(fields=['student', 'date'],
+                         name='lesson_student_date_idx'),
+        ]
 
     def __str__(self):
         return _('The Lesson class: id = {}').format(self.pk)
@@ -62,3 +70,85 @@ class TimeBlock(models.Model):
         verbose_name = _('TimeBlock')
         verbose_name_plural = _('Timeblocks')
         ordering = ('date', 'start_time')
+        indexes = [
+            # end_time is included to read the blocks of a day from the
+            # index only
+            models.Index(fields=['date', 'start_time'], include=['end_time'],
+                         name='timeblock_date_start_idx'),
+        ]
+
+
+class ScheduleDay(models.Model):
+    """ Row of a day locked by every write of the day schedule
+    (see booking.py) """
+
+    date = models.DateField(unique=True)
+
+    class Meta:
+        verbose_name = _('Schedule day')
+        verbose_name_plural = _('Schedule days')
+        ordering = ('date', )
+
+
+class ScheduleEvent(models.Model):
+    """ Change of a lesson or a time block. The sequence is the number
+    the clients of the change feed resume from, it is given once the
+    event is committed (see changes.py) """
+
+    LESSON = 'lesson'
+    TIMEBLOCK = 'timeblock'
+    KINDS = ((LESSON, _('Lesson')), (TIMEBLOCK, _('Time block')))
+
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTIONS = (
+        (CREATED, _('Created')),
+        (UPDATED, _('Updated')),
+        (DELETED, _('Deleted')),
+    )
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    object_id = models.BigIntegerField()
+    date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    sequence = models.BigIntegerField(null=True, blank=True, unique=True)
+
+    class Meta:
+        verbose_name = _('Schedule event')
+        verbose_name_plural = _('Schedule events')
+        ordering = ('id', )
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(
+                sequence__isnull=True), name='event_unnumbered_idx'),
+        ]
+
+
+class ChangeFeed(models.Model):
+    """ The one row of the numbering of the change feed: the last
+    given number and the last number of the deleted (expired) events """
+
+    last_sequence = models.BigIntegerField(default=0)
+    pruned_through = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('Change feed')
+        verbose_name_plural = _('Change feed')
+
+
+def new_feed_key():
+    return secrets.token_hex(16)
+
+
+class FeedKey(models.Model):
+    """ Secret of the ICS feed tokens of a user (see feeds.py), a new one
+    revokes the feed urls given before """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                related_name='feed_key')
+    key = models.CharField(max_length=32, default=new_feed_key)
+
+    class Meta:
+        verbose_name = _('Feed key')
+        verbose_name_plural = _('Feed keys')
@@ -0,0 +1,107 @@
+""" Keyset (cursor) pagination.
+
+A page is the rows that follow the last row of the previous page in the
+order of `ordering`, so the database reads an index range instead of
+skipping OFFSET rows, and inserting rows between page fetches doesn't
+shift the pages. The last field of `ordering` must be unique """
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.utils.translation import gettext as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    ordering = ('id', )
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        # one more row tells whether there is the next page
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.encode_cursor(self.last))
+
+    def after(self, position):
+        """ Lexicographic (f1, f2, ...) > (v1, v2, ...) """
+
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            step = Q(**{f'{field}__gt': position[i]})
+            for previous, value in zip(self.ordering[:i], position):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+    def encode_cursor(self, instance):
+        position = [
+            self.model._meta.get_field(field).value_to_string(instance)
+            for field in self.ordering
+        ]
+        return base64.urlsafe_b64encode(
+            json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(position) != len(self.ordering):
+                raise ValueError
+            return [
+                self.model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, DjangoValidationError):
+            raise NotFound(_('Invalid cursor'))
+
+
+class LessonPagination(KeysetPagination):
+    ordering = ('date', 'time', 'id')
+
+
+class UserPagination(KeysetPagination):
+    ordering = ('id', )
@@ -0,0 +1,78 @@
+""" Lesson prices.
+
+A lesson costs the high rate of the student in the early morning, in the
+late evening and when the day is full, and the usual rate otherwise. The
+load of a day is counted by the availability index, and the rates of the
+students are cached until their details change (see signals.py) """
+
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from CalendarApi.constraints import (
+    С_morning_time, С_morning_time_markup, C_evening_time_markup,
+    C_evening_time, C_salary_common, C_salary_high, C_lesson_threshold
+)
+from .availability import get_day
+from .models import UserDetail
+
+
+RATES_KEY = 'lessons_app:rates:{}'
+RATES_TIMEOUT = 86400
+
+Quote = namedtuple('Quote', ('salary', 'is_high'))
+
+
+def is_high_time(time):
+    """ Early morning and late evening """
+
+    return (С_morning_time <= time < С_morning_time_markup
+            or C_evening_time_markup < time <= C_evening_time)
+
+
+def is_full(lesson_count):
+    return lesson_count >= C_lesson_threshold - 1
+
+
+def get_rates(student_id):
+    """ Returns (usual, high) rates of the student. Students without
+    their own rates (and anonymous users) pay the common ones """
+
+    if student_id is None:
+        return C_salary_common, C_salary_high
+    key = RATES_KEY.format(student_id)
+    rates = cache.get(key)
+    if rates is None:
+        usual, high = UserDetail.objects.filter(
+            user_id=student_id
+        ).values_list('usual_cost', 'high_cost').first() or (None, None)
+        rates = (usual or C_salary_common, high or C_salary_high)
+        # rates read by a transaction may be rolled back
+        if not connection.in_atomic_block:
+            cache.set(key, rates, RATES_TIMEOUT)
+    return rates
+
+
+def forget_rates(student_id):
+    key = RATES_KEY.format(student_id)
+    cache.delete(key)
+    # the old rates could be cached again before the change is committed
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def price(rates, time, lesson_count):
+    """ Returns the Quote of the lesson at the time of a day with
+    lesson_count lessons for (usual, high) rates """
+
+    usual, high = rates
+    if is_high_time(time) or is_full(lesson_count):
+        return Quote(high, True)
+    return Quote(usual, False)
+
+
+def quote(student_id, date, time):
+    """ Returns the Quote of the lesson. Under the lock of the day (see
+    booking.py) the lessons of the day are counted from the database """
+
+    return price(get_rates(student_id), time, get_day(date).lesson_count)
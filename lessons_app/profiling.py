@@ -0,0 +1,207 @@
+""" Profiling of single requests.
+
+Staff get a signed token in the admin panel (Profiles) and add it to a
+request as the 'profile' query parameter or the X-Profile header.
+ProfilingMiddleware runs that request under cProfile (a pstats file) or
+under a sampling profiler (collapsed stacks for flame graph tools such
+as speedscope or flamegraph.pl) and stores the result in PROFILES_DIR.
+Tokens expire in an hour, so a leaked link can't be used to load the
+server with profiling later, and work only while their user is active
+staff """
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+
+
+TOKEN_SALT = 'lessons_app.profiling'
+TOKEN_MAX_AGE = 60 * 60  # seconds
+QUERY_PARAM = 'profile'
+HEADER = 'HTTP_X_PROFILE'
+
+CPROFILE = 'cprofile'
+SAMPLE = 'sample'
+EXTENSIONS = {CPROFILE: 'prof', SAMPLE: 'collapsed'}
+SAMPLE_INTERVAL = 0.001  # seconds
+KEEP_PROFILES = 50
+
+NAME = re.compile(
+    r'^(?P<created>\d{8}T\d{12})_(?P<ms>\d+)ms_(?P<method>[A-Z]+)_'
+    r'(?P<path>[\w+-]+)\.(?P<extension>prof|collapsed)$'
+)
+
+Profile = namedtuple('Profile', ('name', 'created', 'method', 'path',
+                                 'mode', 'ms', 'size'))
+
+
+def make_token(user, mode):
+    return signing.dumps({'user': user.pk, 'mode': mode}, salt=TOKEN_SALT)
+
+
+def load_token(token):
+    """ Returns the profiling mode of the valid token, otherwise None """
+
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT,
+                                max_age=TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    mode = payload.get('mode')
+    if mode not in EXTENSIONS:
+        return None
+    if not User.objects.filter(pk=payload.get('user'), is_active=True,
+                               is_staff=True).exists():
+        return None
+    return mode
+
+
+def profile_request(get_response, request, mode):
+    """ Returns the response of the request run under the profiler.
+    The name of the stored profile is in the X-Profile header """
+
+    start = time.perf_counter()
+    if mode == CPROFILE:
+        profiler = cProfile.Profile()
+        response = profiler.runcall(get_response, request)
+        dump = profiler.dump_stats
+    else:
+        sampler = Sampler(threading.get_ident())
+        sampler.start()
+        try:
+            response = get_response(request)
+        finally:
+            sampler.stop()
+        dump = sampler.dump
+    duration = time.perf_counter() - start
+
+    response['X-Profile'] = save(request, mode, duration, dump)
+    return response
+
+
+class Sampler(threading.Thread):
+    """ Counts the stacks of the thread every SAMPLE_INTERVAL """
+
+    def __init__(self, thread_id):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+def collapse(frame):
+    """ The stack as 'outer;...;inner' frames """
+
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append('{} ({}:{})'.format(
+            code.co_name, os.path.basename(code.co_filename),
+            code.co_firstlineno
+        ))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def profiles_dir():
+    return Path(settings.PROFILES_DIR)
+
+
+def save(request, mode, duration, dump):
+    directory = profiles_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    # '/' of the path is kept as '+'
+    path = re.sub(r'[^\w+]+', '-',
+                  request.path.strip('/').replace('/', '+')) or 'index'
+    name = '{}_{}ms_{}_{}.{}'.format(
+        datetime.now().strftime(r'%Y%m%dT%H%M%S%f'), round(duration * 1000),
+        request.method, path[:100], EXTENSIONS[mode]
+    )
+    dump(directory / name)
+
+    for profile in list_profiles()[KEEP_PROFILES:]:
+        (directory / profile.name).unlink(missing_ok=True)
+    return name
+
+
+def list_profiles():
+    """ Stored profiles, the latest first """
+
+    directory = profiles_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for entry in os.scandir(directory):
+        match = NAME.match(entry.name)
+        if match is None:
+            continue
+        profiles.append(Profile(
+            name=entry.name,
+            created=datetime.strptime(match['created'], r'%Y%m%dT%H%M%S%f'),
+            method=match['method'],
+            path='/' + match['path'].replace('+', '/'),
+            mode=CPROFILE if match['extension'] == 'prof' else SAMPLE,
+            ms=int(match['ms']),
+            size=entry.stat().st_size,
+        ))
+    return sorted(profiles, key=lambda profile: profile.name, reverse=True)
+
+
+def get_profile_path(name):
+    """ Path of the stored profile, None for unknown names """
+
+    if NAME.match(name) is None:
+        return None
+    path = profiles_dir() / name
+    return path if path.is_file() else None
+
+
+def summarize(path, limit=40):
+    """ Text report of the profile: the functions taking the most time """
+
+    if path.suffix == '.prof':
+        stream = io.StringIO()
+        stats = pstats.Stats(str(path), stream=stream)
+        stats.sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
+
+    # samples where the function is on the top of the stack
+    own = Counter()
+    total = 0
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            stack, count = line.rstrip('\n').rsplit(' ', 1)
+            own[stack.rsplit(';', 1)[-1]] += int(count)
+            total += int(count)
+    lines = [f'{total} samples, {SAMPLE_INTERVAL * 1000:g} ms apart', '']
+    lines += [
+        f'{count:>8} {100 * count / total:6.1f}%  {function}'
+        for function, count in own.most_common(limit)
+    ]
+    return '\n'.join(lines)
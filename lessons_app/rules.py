@@ -0,0 +1,113 @@
+""" Rules of the schedule shared by the serializer validators and the
+forms. Every function returns the list of broken rules (messages), so a
+client gets all the problems of the data at once. The functions keep no
+state, so one validator object is safely shared by all requests. The
+broken rules are counted by reason in the metrics """
+
+import datetime
+
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from .metrics import REJECTIONS
+from .window import get_window
+from CalendarApi.constraints import (
+    С_morning_time, C_evening_time, C_timedelta, C_datedelta,
+)
+
+
+def broken(reason, message):
+    """ The message of a broken rule, counted as the reason """
+
+    REJECTIONS.labels(reason).inc()
+    return message
+
+
+def booking_errors(date, time, now=None):
+    """ Rules of booking a lesson by a student """
+
+    if now is None:
+        now = timezone.localtime()
+        today, last = get_window()
+    else:
+        today, last = now.date(), (now + C_datedelta).date()
+    errors = []
+
+    # sign up is impossible for past date or today + 8 days
+    if date < today:
+        errors.append(broken('past_date', _(
+            "The date {} has already arrived").format(date)))
+    elif date > last:
+        errors.append(broken('too_far', _(
+            "Please don't book a lesson earlier then {} days in "
+            "advace").format(C_datedelta.days)))
+    # sign up is impossible for next 3 hours
+    elif datetime.datetime.combine(date, time, now.tzinfo) \
+            < now + C_timedelta:
+        errors.append(broken('too_soon', _(
+            "Please, sign up for a lesson {} hours before to "
+            "start").format(C_timedelta)))
+
+    # constraint of working hours (8-23)
+    if time < С_morning_time:
+        errors.append(broken('too_early', _(
+            "The time {} is too early").format(time)))
+    elif time > C_evening_time:
+        errors.append(broken('too_late', _(
+            "The time {} is too late").format(time)))
+
+    return errors
+
+
+def lesson_errors(day, time):
+    """ The time must be free in the DaySchedule """
+
+    errors = []
+
+    # free time check
+    lesson_time = day.lesson_conflict(time)
+    if lesson_time is not None:
+        errors.append(broken('lesson_overlap', _(
+            "Some lesson is already scheduled for {} "
+            "that day").format(lesson_time)))
+
+    # check blocked time overlap
+    if day.is_blocked(time):
+        errors.append(broken('blocked_time', _("This time is blocked")))
+
+    return errors
+
+
+def timeblock_errors(day, start_time, end_time, today):
+    """ Rules of blocking [start_time, end_time) of the DaySchedule """
+
+    # check of times, other rules make no sense for a wrong interval
+    if start_time > end_time:
+        return [broken('wrong_interval', _(
+            "'Start time' must be earlier than 'End time'"))]
+    elif start_time == end_time:
+        return [broken('wrong_interval', _(
+            "'Start time' and 'End time' can't be equal"))]
+
+    errors = []
+
+    # checking if block overlap
+    if day.block_overlaps(start_time, end_time):
+        errors.append(broken('block_overlap', _(
+            "The new block overlaps the existing one")))
+
+    # check for future date (date > today)
+    if day.date < today:
+        errors.append(broken('past_date', _(
+            "Date can't be earlier than today")))
+    # check for date in the current period (8 day)
+    elif day.date > today + C_datedelta:
+        errors.append(broken('too_far', _(
+            "You are creating the block too early")))
+
+    # check for non-existence of lessons
+    if day.has_lesson_between(start_time, end_time):
+        errors.append(broken('lesson_overlap', _(
+            "Your block overlaps an existing lesson")))
+
+    return errors
@@ -1,12 +1,19 @@
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
 from rest_framework.relations import PrimaryKeyRelatedField
 
 from django.contrib.auth.models import User
+from django.utils.translation import gettext as _
 
-from .models import Lesson, UserDetail, TimeBlock
+from .bulk import (
+    MAX_BULK_LESSONS, MAX_BULK_DAYS, weekly_slots, pattern_dates
+)
+from .metrics import count_bookings
+from .models import Lesson, UserDetail, TimeBlock, ScheduleEvent
 from .validators import (
     AdminValidator, UserValidator, RegistrationValidator, TimeBlockValidator
 )
+from CalendarApi.constraints import С_morning_time, C_evening_time
 
 
 class RegistrationSerializer(serializers.Serializer):
@@ -57,7 +64,40 @@ class UserSerializer(serializers.ModelSerializer):
             )
 
 
-class LessonSerializer(serializers.ModelSerializer):
+class SelectableFieldsMixin:
+    """ Returns only the fields listed in the "fields" query parameter
+    of GET requests (fields=id,date,time) """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return fields
+        selected = request.query_params.get('fields')
+        if not selected:
+            return fields
+        selected = set(selected.split(','))
+        unknown = selected - set(fields)
+        if unknown:
+            raise ValidationError(
+                {'fields': _("Unknown fields: {}").format(
+                    ', '.join(sorted(unknown)))}
+            )
+        return {name: field for name, field in fields.items()
+                if name in selected}
+
+
+class CountedBookingMixin:
+    """ Counts the created lessons in the metrics (see metrics.py) """
+
+    def create(self, validated_data):
+        lesson = super().create(validated_data)
+        count_bookings(1, 'single')
+        return lesson
+
+
+class LessonSerializer(CountedBookingMixin, SelectableFieldsMixin,
+                       serializers.ModelSerializer):
     """ ViewSet of lesson (allow any (GET) or Authorized only (OTHER)) """
 
     student = PrimaryKeyRelatedField(read_only=True)
@@ -67,21 +107,65 @@ class LessonSerializer(serializers.ModelSerializer):
         model = Lesson
         fields = ('id', 'student', 'salary', 'time', 'date')
         validators = [
-            UserValidator(queryset=Lesson.objects.all())
+            UserValidator()
         ]
 
 
-class LessonAdminSerializer(serializers.ModelSerializer):
+class LessonAdminSerializer(CountedBookingMixin, SelectableFieldsMixin,
+                            serializers.ModelSerializer):
     """ Admin viewset of lesson (admin only) """
 
     class Meta:
         model = Lesson
         fields = ('id', 'student', 'salary', 'time', 'date')
         validators = [
-            AdminValidator(queryset=Lesson.objects.all())
+            AdminValidator()
         ]
 
 
+class SlotSerializer(serializers.Serializer):
+    """ Date and time of a lesson """
+
+    date = serializers.DateField()
+    time = serializers.TimeField()
+
+
+class WeeklySlotSerializer(SlotSerializer):
+    """ The same time of the same weekday from the date for count weeks """
+
+    count = serializers.IntegerField(min_value=1, max_value=MAX_BULK_LESSONS)
+
+
+class BulkLessonSerializer(serializers.Serializer):
+    """ Lessons booked at once: a list of slots or a weekly rule """
+
+    slots = SlotSerializer(many=True, required=False)
+    weekly = WeeklySlotSerializer(required=False)
+
+    def validate(self, attrs):
+        if ('slots' in attrs) == ('weekly' in attrs):
+            raise ValidationError(_("Provide either slots or weekly"))
+        if 'weekly' in attrs:
+            weekly = attrs.pop('weekly')
+            attrs['slots'] = weekly_slots(weekly['date'], weekly['time'],
+                                          weekly['count'])
+        else:
+            attrs['slots'] = [(slot['date'], slot['time'])
+                              for slot in attrs['slots']]
+        if not 0 < len(attrs['slots']) <= MAX_BULK_LESSONS:
+            raise ValidationError(
+                _("From 1 to {} lessons can be booked at once").format(
+                    MAX_BULK_LESSONS)
+            )
+        return attrs
+
+
+class BulkLessonAdminSerializer(BulkLessonSerializer):
+    """ Lessons booked at once for the student by admin """
+
+    student = PrimaryKeyRelatedField(queryset=User.objects.all())
+
+
 class TimeBlockSerializer(serializers.ModelSerializer):
     """ Getting timeblock list """
 
@@ -97,10 +181,50 @@ class TimeBlockAdminSerializer(serializers.ModelSerializer):
         model = TimeBlock
         fields = ('id', 'date', 'start_time', 'end_time')
         validators = [
-            TimeBlockValidator(queryset=model.objects.all())
+            TimeBlockValidator()
         ]
 
 
+class BulkTimeBlockSerializer(serializers.Serializer):
+    """ Blocks of the same time of days of the range falling on the
+    weekdays (all days if weekdays are empty). The whole business day
+    is blocked if the times are omitted """
+
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        required=False
+    )
+    start_time = serializers.TimeField(default=С_morning_time)
+    end_time = serializers.TimeField(default=C_evening_time)
+
+    def validate(self, attrs):
+        if attrs['start_time'] >= attrs['end_time']:
+            raise ValidationError(
+                _("'Start time' must be earlier than 'End time'")
+            )
+        days = (attrs['date_to'] - attrs['date_from']).days + 1
+        if not 0 < days <= MAX_BULK_DAYS:
+            raise ValidationError(
+                _("The range must contain from 1 to {} days").format(
+                    MAX_BULK_DAYS)
+            )
+        attrs['dates'] = pattern_dates(attrs['date_from'], attrs['date_to'],
+                                       attrs.get('weekdays'))
+        return attrs
+
+
+class ScheduleEventSerializer(serializers.ModelSerializer):
+    """ Event of the change feed, its id is the sequence number """
+
+    id = serializers.IntegerField(source='sequence', read_only=True)
+
+    class Meta:
+        model = ScheduleEvent
+        fields = ('id', 'kind', 'action', 'object_id', 'date')
+
+
 class StudentAdminSerializer(serializers.Serializer):
     """ Admin viewset of students (admin only) """
 
@@ -0,0 +1,68 @@
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import availability
+from .changes import record
+from .models import Lesson, TimeBlock, UserDetail, ScheduleEvent
+from .pricing import forget_rates
+from .versioning import bump_details_version, bump_schedule_version
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_save, sender=TimeBlock)
+@receiver(post_delete, sender=TimeBlock)
+def schedule_changed(sender, **kwargs):
+    """ Invalidates everything built from the schedule. Other processes
+    may cache the old schedule until the change is committed, so it is
+    invalidated once more after the commit """
+
+    invalidate_schedule()
+    if connection.in_atomic_block:
+        transaction.on_commit(invalidate_schedule)
+
+
+def invalidate_schedule():
+    availability.invalidate()
+    bump_schedule_version()
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_save, sender=TimeBlock)
+@receiver(post_delete, sender=TimeBlock)
+def record_change(sender, instance, signal, created=False, **kwargs):
+    """ Stores the event of the change feed (see changes.py) """
+
+    if signal is post_delete:
+        action = ScheduleEvent.DELETED
+    elif created:
+        action = ScheduleEvent.CREATED
+    else:
+        action = ScheduleEvent.UPDATED
+    kind = ScheduleEvent.LESSON if sender is Lesson \
+        else ScheduleEvent.TIMEBLOCK
+    record(kind, action, [instance])
+
+
+@receiver(post_save, sender=UserDetail)
+@receiver(post_delete, sender=UserDetail)
+def rates_changed(sender, instance, **kwargs):
+    forget_rates(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserDetail)
+@receiver(post_delete, sender=UserDetail)
+def details_changed(sender, update_fields=None, **kwargs):
+    """ Invalidates the pages showing the users (after the commit too,
+    see schedule_changed). A login only updates last_login """
+
+    if update_fields == {'last_login'}:
+        return
+    bump_details_version()
+    if connection.in_atomic_block:
+        transaction.on_commit(bump_details_version)
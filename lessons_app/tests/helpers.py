@@ -0,0 +1,17 @@
+from lessons_app.middleware import get_budget
+
+
+class QueryBudgetMixin:
+    """ Checks responses of the test client against the query budgets of
+    their endpoints (see lessons_app/query_budgets.json) """
+
+    def assertWithinBudget(self, response):
+        method = response.request['REQUEST_METHOD']
+        route = response.resolver_match.route
+        budget = get_budget(route, method)
+        self.assertIsNotNone(budget, f'{method} {route} has no budget')
+        self.assertLessEqual(
+            response.query_count, budget,
+            f'{method} {route} issued {response.query_count} queries, '
+            f'the budget is {budget}'
+        )
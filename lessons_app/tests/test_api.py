@@ -0,0 +1,273 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from rest_framework.test import APIClient
+
+from lessons_app import window
+from lessons_app.models import Lesson, UserDetail, TimeBlock
+from CalendarApi.constraints import (
+    С_morning_time, C_evening_time, C_salary_common, C_datedelta
+)
+
+
+class TestFreeSlotsAPI(TestCase):
+    """ Testing the free-slot lookup of the booking window """
+
+    path = '/api/free-slots'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.date = date.today() + timedelta(days=2)
+        student = User.objects.create_user(username='student')
+        UserDetail.objects.create(user=student)
+        Lesson.objects.create(student=student, date=cls.date,
+                              time=time(12), salary=C_salary_common)
+        TimeBlock.objects.create(date=cls.date, start_time=time(15),
+                                 end_time=time(18))
+
+    def get_slots(self, **params):
+        response = self.client.get(self.path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_whole_window(self):
+        slots = self.get_slots()
+        self.assertEqual(len(slots), C_datedelta.days + 1)
+        last_day = (date.today() + C_datedelta).isoformat()
+        self.assertEqual(
+            slots[last_day],
+            [f'{hour:02}:00' for hour in range(С_morning_time.hour,
+                                               C_evening_time.hour + 1)]
+        )
+
+    def test_taken_and_blocked_time(self):
+        slots = self.get_slots(**{'from': self.date, 'to': self.date})
+        day = slots[self.date.isoformat()]
+        self.assertNotIn('12:00', day)
+        self.assertNotIn('15:00', day)
+        self.assertNotIn('17:00', day)
+        self.assertIn('11:00', day)
+        self.assertIn('13:00', day)
+        self.assertIn('18:00', day)
+
+    def test_duration(self):
+        slots = self.get_slots(**{'from': self.date, 'to': self.date,
+                                  'duration': 120})
+        day = slots[self.date.isoformat()]
+        self.assertNotIn('11:00', day)
+        self.assertIn('13:00', day)
+        self.assertNotIn('14:00', day)
+        self.assertNotIn('23:00', day)
+        self.assertIn('22:00', day)
+
+    def test_earliest_start(self):
+        # 10:00:30 in Moscow, lessons are booked 3 hours in advance
+        now = datetime.combine(date.today(), time(7, 0, 30),
+                               tzinfo=ZoneInfo('UTC'))
+        window._expires = None
+        self.addCleanup(setattr, window, '_expires', None)
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            slots = self.get_slots(**{'to': now.date()})
+        day = slots[now.date().isoformat()]
+        self.assertEqual(day[0], '14:00')
+
+    def test_two_queries(self):
+        with self.assertNumQueries(2):
+            self.get_slots()
+
+    def test_bad_parameters(self):
+        response = self.client.get(self.path, {'from': 'tomorrow'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.path, {'duration': 0})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestKeysetPagination(TestCase):
+    """ Testing cursor pagination of lessons and users for admin """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.student = User.objects.create_user(username='student')
+        day = date.today() + timedelta(days=1)
+        Lesson.objects.bulk_create([
+            Lesson(student=cls.student, date=day + timedelta(days=i % 5),
+                   time=time(8 + i // 5), salary=C_salary_common)
+            for i in range(25)
+        ])
+        User.objects.bulk_create([
+            User(username=f'user{i}') for i in range(10)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get_all_pages(self, url, insert=None):
+        results = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            results.extend(response.data['results'])
+            url = response.data['next']
+            if insert and url:
+                insert()
+        return results
+
+    def test_lessons(self):
+        lessons = self.get_all_pages('/api/all-lessons/?page_size=10')
+        self.assertEqual(
+            [lesson['id'] for lesson in lessons],
+            list(Lesson.objects.order_by('date', 'time', 'id').values_list(
+                'id', flat=True))
+        )
+
+    def test_inserts_between_pages(self):
+        def insert():
+            # before the cursor: neither duplicates nor skips rows
+            Lesson.objects.create(student=self.student, date=date.today(),
+                                  time=time(8), salary=C_salary_common)
+
+        ids = [lesson['id'] for lesson in self.get_all_pages(
+            '/api/all-lessons/?page_size=7', insert=insert)]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(len(ids), 25)
+
+    def test_users(self):
+        users = self.get_all_pages('/api/get-users?page_size=4')
+        self.assertEqual([int(user['id']) for user in users],
+                         list(User.objects.order_by('id').values_list(
+                             'id', flat=True)))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/all-lessons/?cursor=abc')
+        self.assertEqual(response.status_code, 404)
+
+
+class TestLessonsExport(TestCase):
+    """ Testing the streaming export of lessons """
+
+    path = '/api/export-lessons'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.students = [User.objects.create_user(username=f'student{i}')
+                        for i in range(2)]
+        cls.day = date.today() - timedelta(days=30)
+        Lesson.objects.bulk_create([
+            Lesson(student=cls.students[i % 2],
+                   date=cls.day + timedelta(days=i), time=time(10),
+                   salary=C_salary_common)
+            for i in range(10)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.client.get(self.path, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[0], {
+            'id': rows[0]['id'], 'student': self.students[0].pk,
+            'salary': C_salary_common, 'time': '10:00:00',
+            'date': self.day.isoformat(),
+        })
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(self.export(output='csv'))))
+        self.assertEqual(rows[0], ['id', 'student', 'salary', 'time', 'date'])
+        self.assertEqual(len(rows), 11)
+
+    def test_filters(self):
+        lines = self.export(
+            student=self.students[1].pk,
+            date_from=(self.day + timedelta(days=2)).isoformat(),
+            date_to=(self.day + timedelta(days=7)).isoformat(),
+        ).splitlines()
+        self.assertEqual(
+            [json.loads(line)['date'] for line in lines],
+            [(self.day + timedelta(days=i)).isoformat() for i in (3, 5, 7)]
+        )
+
+    def test_invalid_parameters(self):
+        for params in ({'output': 'xml'}, {'date_from': '01.01.2022'},
+                       {'student': 'me'}):
+            response = self.client.get(self.path, params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(self.path).status_code, 403)
+
+
+class TestLessonFilters(TestCase):
+    """ Testing the query parameters of the lesson lists """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.students = [User.objects.create_user(username=f'student{i}')
+                        for i in range(2)]
+        cls.day = date.today() + timedelta(days=1)
+        Lesson.objects.bulk_create([
+            Lesson(student=cls.students[i % 2],
+                   date=cls.day + timedelta(days=i), time=time(10),
+                   salary=1000 + 100 * i)
+            for i in range(6)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get_dates(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        if isinstance(data, dict):
+            data = data['results']
+        return [lesson['date'] for lesson in data]
+
+    def test_filters(self):
+        params = {
+            'student': self.students[0].pk,
+            'date_from': (self.day + timedelta(days=1)).isoformat(),
+            'date_to': (self.day + timedelta(days=5)).isoformat(),
+            'salary_max': 1300,
+        }
+        expected = [(self.day + timedelta(days=2)).isoformat()]
+        for path in ('/api/get-relevant-lessons', '/api/all-lessons/',
+                     '/api/all-relevant-lessons/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.get_dates(path, **params), expected)
+        self.assertEqual(
+            len(self.get_dates('/api/all-lessons/', salary_min=1300)), 3
+        )
+
+    def test_fields(self):
+        response = self.client.get('/api/get-relevant-lessons',
+                                   {'fields': 'id,date,time'})
+        self.assertEqual(set(response.data[0]), {'id', 'date', 'time'})
+        response = self.client.get('/api/all-lessons/', {'fields': 'date'})
+        self.assertEqual(set(response.data['results'][0]), {'date'})
+
+    def test_invalid_parameters(self):
+        for params in ({'fields': 'id,password'}, {'salary_min': 'a lot'},
+                       {'date_to': 'tomorrow'}):
+            response = self.client.get('/api/all-relevant-lessons/', params)
+            self.assertEqual(response.status_code, 400)
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import sys
+from datetime import date, time, timedelta
+from io import StringIO
+
+from asgiref.sync import AsyncToSync
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.test import (
+    AsyncClient, LiveServerTestCase, SimpleTestCase, TransactionTestCase,
+    override_settings
+)
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+from django.urls import resolve
+from rest_framework_simplejwt.tokens import AccessToken
+
+from lessons_app.management.commands.loadtest import percentile
+from lessons_app.models import Lesson, TimeBlock
+from CalendarApi.constraints import C_salary_common
+
+POLLS = 10
+
+
+class TestAsyncViews(TestCase):
+    """ Testing the async views under ASGI """
+
+    paths = ('/', '/api/get-relevant-lessons', '/api/get-timeblocks',
+             '/api/free-slots', '/api/changes')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username='student')
+        cls.date = date.today() + timedelta(days=2)
+        Lesson.objects.create(student=cls.student, date=cls.date,
+                              time=time(12), salary=C_salary_common)
+        TimeBlock.objects.create(date=cls.date, start_time=time(15),
+                                 end_time=time(18))
+
+    def if_none_match(self, response):
+        # the async client of Django 4.0 takes the names of the headers
+        return {'if-none-match': response['ETag']}
+
+    def test_views_are_async(self):
+        for path in self.paths:
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(path).func),
+                            path)
+
+    async def test_relevant_lessons(self):
+        client = AsyncClient()
+        response = await client.get('/api/get-relevant-lessons')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        response = await client.get('/api/get-relevant-lessons',
+                                    **self.if_none_match(response))
+        self.assertEqual(response.status_code, 304)
+
+    async def test_timeblocks_and_free_slots(self):
+        client = AsyncClient()
+        response = await client.get('/api/get-timeblocks')
+        self.assertEqual(len(response.json()), 1)
+        response = await client.get('/api/free-slots', {
+            'from': self.date.isoformat(), 'to': self.date.isoformat()
+        })
+        starts = response.json()[self.date.isoformat()]
+        self.assertNotIn('12:00', starts)
+        self.assertNotIn('15:00', starts)
+        self.assertIn('19:00', starts)
+
+    async def test_homepage(self):
+        client = AsyncClient()
+        response = await client.get('/')
+        self.assertEqual(response.status_code, 200)
+        response = await client.get('/', **self.if_none_match(response))
+        self.assertEqual(response.status_code, 304)
+
+    async def test_errors(self):
+        client = AsyncClient()
+        response = await client.get('/api/free-slots', {'duration': 'x'})
+        self.assertEqual(response.status_code, 400)
+        response = await client.get('/api/changes')
+        self.assertIn(response.status_code, (401, 403))
+        response = await client.post('/api/get-relevant-lessons')
+        self.assertEqual(response.status_code, 405)
+        response = await client.options('/')
+        self.assertEqual(response.status_code, 200)
+
+
+class TestAsgiThreads(TransactionTestCase):
+    """ Under ASGI the middleware chain and the async views run in the
+    event loop, so a waiting request holds no thread """
+
+    def test_middleware_isnt_adapted(self):
+        # Django logs every middleware it has to run in the other mode
+        with override_settings(DEBUG=True), \
+                self.assertNoLogs('django.request', logging.DEBUG):
+            ASGIHandler()
+
+    def test_long_polls(self):
+        user = User.objects.create_user(username='student')
+        token = AccessToken.for_user(user)
+        application = ASGIHandler()
+        blocked = []
+
+        async def poll():
+            scope = {
+                'type': 'http', 'method': 'GET', 'path': '/api/changes',
+                'query_string': b'since=0&timeout=1',
+                'headers': [(b'authorization', f'JWT {token}'.encode())],
+            }
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                messages.append(message)
+
+            await application(scope, receive, send)
+            return messages[0]['status']
+
+        async def watch():
+            await asyncio.sleep(0.5)
+            waiting = AsyncToSync.__call__.__code__
+            for frame in sys._current_frames().values():
+                while frame:
+                    if frame.f_code is waiting:
+                        blocked.append(frame)
+                    frame = frame.f_back
+
+        async def main():
+            *statuses, _ = await asyncio.gather(
+                *(poll() for _ in range(POLLS)), watch())
+            return statuses
+
+        self.assertEqual(asyncio.run(main()), [200] * POLLS)
+        self.assertEqual(blocked, [])
+
+
+class TestLoadTest(LiveServerTestCase):
+    """ Testing the polling load command """
+
+    def test_report(self):
+        out = StringIO()
+        call_command('loadtest', self.live_server_url, '--clients', '2',
+                     '--duration', '0.5', '--path', '/api/get-timeblocks',
+                     stdout=out)
+        header, row = out.getvalue().splitlines()
+        self.assertIn('p99', header)
+        url, requests, *_, errors = row.split()
+        self.assertEqual(url, self.live_server_url)
+        self.assertGreater(int(requests), 0)
+        self.assertEqual(errors, '0')
+
+
+class TestPercentile(SimpleTestCase):
+
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.99), 7)
+        self.assertEqual(percentile([], 0.99), 0)
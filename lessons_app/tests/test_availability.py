@@ -0,0 +1,82 @@
+from datetime import date, time, timedelta
+
+from django.test import SimpleTestCase, TransactionTestCase
+from django.contrib.auth.models import User
+
+from lessons_app.availability import DaySchedule, get_day
+from lessons_app.models import Lesson, TimeBlock
+from CalendarApi.constraints import C_salary_common
+
+
+class TestDaySchedule(SimpleTestCase):
+    """ Testing the lookups of the per-day index """
+
+    day = DaySchedule(
+        date.today(),
+        [time(12), time(15, 30), time(23)],
+        [(time(8), time(10)), (time(10), time(11)), (time(18), time(20))]
+    )
+
+    def test_lesson_conflict(self):
+        self.assertEqual(self.day.lesson_conflict(time(12)), time(12))
+        self.assertEqual(self.day.lesson_conflict(time(12, 59)), time(12))
+        self.assertIsNone(self.day.lesson_conflict(time(13)))
+        self.assertIsNone(self.day.lesson_conflict(time(11)))
+        self.assertEqual(self.day.lesson_conflict(time(16)), time(15, 30))
+        self.assertEqual(self.day.lesson_conflict(time(23, 30)), time(23))
+
+    def test_is_blocked(self):
+        self.assertTrue(self.day.is_blocked(time(8)))
+        self.assertTrue(self.day.is_blocked(time(10, 30)))
+        self.assertFalse(self.day.is_blocked(time(11)))
+        self.assertTrue(self.day.is_blocked(time(19)))
+        self.assertFalse(self.day.is_blocked(time(20)))
+
+    def test_block_until_end_of_day(self):
+        day = DaySchedule(date.today(), [], [(time(20), time(23))])
+        self.assertTrue(day.is_blocked(time(23)))
+
+    def test_adjacent_blocks_are_merged(self):
+        self.assertEqual(self.day.block_starts, [8 * 60, 18 * 60])
+        self.assertEqual(self.day.block_ends, [11 * 60, 20 * 60])
+
+    def test_block_overlaps(self):
+        self.assertTrue(self.day.block_overlaps(time(7), time(9)))
+        self.assertTrue(self.day.block_overlaps(time(19), time(21)))
+        self.assertTrue(self.day.block_overlaps(time(17), time(21)))
+        self.assertFalse(self.day.block_overlaps(time(11), time(18)))
+        self.assertFalse(self.day.block_overlaps(time(20), time(23)))
+
+    def test_has_lesson_between(self):
+        self.assertTrue(self.day.has_lesson_between(time(11), time(13)))
+        self.assertFalse(self.day.has_lesson_between(time(13), time(15)))
+        self.assertTrue(self.day.has_lesson_between(time(15), time(16)))
+        self.assertFalse(self.day.has_lesson_between(time(12, 30), time(15)))
+
+
+class TestAvailabilityCache(TransactionTestCase):
+    """ Testing the per-process cache of days and its invalidation """
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='student')
+        self.date = date.today() + timedelta(days=1)
+
+    def test_day_is_cached(self):
+        get_day(self.date)
+        with self.assertNumQueries(0):
+            get_day(self.date)
+
+    def test_cache_is_invalidated_by_lesson(self):
+        self.assertIsNone(get_day(self.date).lesson_conflict(time(12)))
+        lesson = Lesson.objects.create(student=self.student, date=self.date,
+                                       time=time(12), salary=C_salary_common)
+        self.assertEqual(get_day(self.date).lesson_conflict(time(12)),
+                         time(12))
+        lesson.delete()
+        self.assertIsNone(get_day(self.date).lesson_conflict(time(12)))
+
+    def test_cache_is_invalidated_by_timeblock(self):
+        self.assertFalse(get_day(self.date).is_blocked(time(12)))
+        TimeBlock.objects.create(date=self.date, start_time=time(8),
+                                 end_time=time(23))
+        self.assertTrue(get_day(self.date).is_blocked(time(12)))
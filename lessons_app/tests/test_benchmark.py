@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+from datetime import date, time, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from lessons_app.models import Lesson, UserDetail
+from CalendarApi.constraints import C_salary_common
+
+
+class TestBenchmark(TestCase):
+    """ Testing the benchmark command """
+
+    @classmethod
+    def setUpTestData(cls):
+        student = User.objects.create_user(username='student')
+        UserDetail.objects.create(user=student)
+        for hour in (10, 12):
+            Lesson.objects.create(student=student,
+                                  date=date.today() + timedelta(days=2),
+                                  time=time(hour), salary=C_salary_common)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = os.path.join(directory.name, 'results.json')
+        self.baseline = os.path.join(directory.name, 'baseline.json')
+
+    def benchmark(self, *args):
+        call_command('benchmark', '--sizes', '1,2', '--repeat', '2',
+                     '--min-time', '0.001', *args, stdout=StringIO(),
+                     stderr=StringIO())
+
+    def write_baseline(self, median_us):
+        with open(self.output, encoding='utf-8') as file:
+            report = json.load(file)
+        for result in report['results'].values():
+            result['median_us'] = median_us
+        with open(self.baseline, 'w', encoding='utf-8') as file:
+            json.dump(report, file)
+
+    def test_results(self):
+        self.benchmark('--output', self.output)
+        with open(self.output, encoding='utf-8') as file:
+            report = json.load(file)
+        self.assertEqual(report['data'],
+                         {'lessons': 2, 'timeblocks': 0, 'users': 1})
+        self.assertIn('validators.UserValidator', report['results'])
+        self.assertIn('pricing.quote', report['results'])
+        # one user only, so there is no list of two users
+        self.assertIn('serializers.LessonSerializer[2]', report['results'])
+        self.assertIn('serializers.UserSerializer[1]', report['results'])
+        self.assertNotIn('serializers.UserSerializer[2]', report['results'])
+        for result in report['results'].values():
+            self.assertGreater(result['number'], 0)
+            self.assertLessEqual(result['min_us'], result['median_us'])
+
+    def test_baseline(self):
+        self.benchmark('--output', self.output, '--case', 'get_weekdays')
+        self.write_baseline(10 ** 9)
+        self.benchmark('--baseline', self.baseline, '--case', 'get_weekdays')
+        self.write_baseline(0.001)
+        with self.assertRaises(CommandError):
+            self.benchmark('--baseline', self.baseline,
+                           '--case', 'get_weekdays')
+
+    def test_no_students(self):
+        User.objects.all().delete()
+        with self.assertRaises(CommandError):
+            self.benchmark()
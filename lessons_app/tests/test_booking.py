@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+from threading import Barrier, Thread
+
+from django.db import connection
+from django.test import TransactionTestCase
+from django.contrib.auth.models import User
+
+from rest_framework.test import APIClient
+
+from lessons_app.models import Lesson, UserDetail
+
+
+class TestConcurrentBooking(TransactionTestCase):
+    """ Parallel requests for the same time must create one lesson """
+
+    path = '/api/set-my-lessons/'
+    workers = 8
+
+    def setUp(self):
+        self.students = []
+        for i in range(self.workers):
+            student = User.objects.create_user(username=f'student{i}')
+            UserDetail.objects.create(user=student)
+            self.students.append(student)
+
+    def book_in_parallel(self, data):
+        barrier = Barrier(self.workers)
+        statuses = []
+
+        def book(student):
+            client = APIClient()
+            client.force_authenticate(student)
+            try:
+                barrier.wait()
+                response = client.post(self.path, data, format='json')
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [Thread(target=book, args=(student, ))
+                   for student in self.students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_only_one_booking_wins(self):
+        data = {
+            'date': (date.today() + timedelta(days=1)).isoformat(),
+            'time': '12:00'
+        }
+        for _ in range(3):
+            Lesson.objects.all().delete()
+            statuses = self.book_in_parallel(data)
+            self.assertEqual(statuses.count(201), 1)
+            self.assertEqual(statuses.count(400), self.workers - 1)
+            self.assertEqual(Lesson.objects.count(), 1)
@@ -0,0 +1,227 @@
+import json
+import logging
+import shutil
+import tempfile
+from datetime import date, time, timedelta
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import override_settings
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from lessons_app import urls
+from lessons_app.feeds import issue_token
+from lessons_app.middleware import load_budgets
+from lessons_app.models import Lesson, TimeBlock, UserDetail
+from lessons_app.tests.helpers import QueryBudgetMixin
+from CalendarApi.constraints import C_salary_common
+
+PROFILE = '20220101T000000000000_5ms_GET_index.collapsed'
+
+
+class TestQueryBudgets(QueryBudgetMixin, TestCase):
+    """ Every endpoint keeps the number of its queries in the budget """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', is_staff=True,
+                                             is_superuser=True)
+        cls.student = User.objects.create_user(username='student')
+        cls.other = User.objects.create_user(username='other')
+        for user in (cls.admin, cls.student, cls.other):
+            UserDetail.objects.create(user=user, phone='89000000000')
+        cls.date = date.today() + timedelta(days=2)
+        cls.lessons = [
+            Lesson.objects.create(student=cls.student, date=cls.date,
+                                  time=time(hour), salary=C_salary_common)
+            for hour in (10, 12, 14, 16)
+        ]
+        cls.blocks = [
+            TimeBlock.objects.create(date=cls.date + timedelta(days=i),
+                                     start_time=time(8), end_time=time(9))
+            for i in (1, 2)
+        ]
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(PROFILES_DIR=directory,
+                                     METRICS_TOKEN='metrics')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        Path(directory, PROFILE).write_text('main (app.py:1) 1\n')
+
+    def cases(self):
+        """ (user, method, path, data) of a request to every endpoint, the
+        pages also logged in """
+
+        day = self.date.isoformat()
+        later = (self.date + timedelta(days=3)).isoformat()
+        lesson, student_lesson, admin_lesson, deleted = \
+            [lesson.pk for lesson in self.lessons]
+        block, deleted_block = [block.pk for block in self.blocks]
+        block_day = self.blocks[0].date.isoformat()
+        student, admin = self.student, self.admin
+        return [
+            (None, 'GET', '/', None),
+            (student, 'GET', '/', None),
+            (admin, 'GET', '/', None),
+            (student, 'GET', '/my-lessons', None),
+            (None, 'GET', '/register', None),
+            (student, 'GET', '/register', None),
+            (None, 'POST', '/register', {
+                'username': 'new', 'password': 'new_pass',
+                'first_name': 'New', 'phone': '', 'telegram': '@new'}),
+            (None, 'GET', '/login', None),
+            (student, 'GET', '/login', None),
+            (student, 'POST', '/logout', None),
+            (student, 'GET', '/add-lesson', None),
+            (student, 'POST', '/add-lesson', {'date': later, 'time': 12}),
+            (student, 'POST', f'/delete-lesson/{deleted}/', None),
+            (None, 'GET', '/info', None),
+            (student, 'GET', '/info', None),
+            (None, 'GET', f'/calendar/{issue_token(student)}.ics', None),
+            (None, 'GET', '/metrics', None),
+            (admin, 'GET', '/admin-panel/settings', None),
+            (admin, 'GET', '/admin-panel/add-lesson', None),
+            (admin, 'GET', '/admin-panel/block-time', None),
+            (admin, 'GET', '/admin-panel/block-days', None),
+            (admin, 'GET', '/admin-panel/students', None),
+            (admin, 'GET', f'/admin-panel/students/{student.pk}', None),
+            (admin, 'GET', '/admin-panel/profiles', None),
+            (admin, 'POST', '/admin-panel/profiles',
+             {'path': '/', 'mode': 'sample'}),
+            (admin, 'GET', f'/admin-panel/profiles/{PROFILE}', None),
+            (None, 'POST', '/api/registration', {
+                'username': 'api', 'password': 'api_pass',
+                'first_name': 'Api', 'phone': '89000000001',
+                'telegram': '@api'}),
+            (admin, 'GET', '/api/get-users', None),
+            (None, 'GET', '/api/get-relevant-lessons', None),
+            (None, 'GET', '/api/free-slots', None),
+            (student, 'GET', '/api/quote', {'date': later, 'time': '12:00'}),
+            (student, 'GET', '/api/calendar-feed', None),
+            (student, 'POST', '/api/calendar-feed', None),
+            (student, 'GET', '/api/changes', None),
+            (admin, 'GET', '/api/export-lessons', None),
+            (admin, 'DELETE', f'/api/delete-user/{self.other.pk}/', None),
+            (None, 'GET', '/api/get-timeblocks', None),
+            (student, 'GET', '/api/set-my-lessons/', None),
+            (student, 'POST', '/api/set-my-lessons/',
+             {'date': later, 'time': '14:00'}),
+            (student, 'POST', '/api/set-my-lessons/bulk/',
+             {'weekly': {'date': later, 'time': '16:00', 'count': 2}}),
+            (student, 'GET', f'/api/set-my-lessons/{student_lesson}/', None),
+            (student, 'PATCH', f'/api/set-my-lessons/{student_lesson}/',
+             {'date': day, 'time': '13:00'}),
+            (student, 'DELETE', f'/api/set-my-lessons/{student_lesson}/',
+             None),
+            (admin, 'GET', '/api/all-lessons/', None),
+            (admin, 'POST', '/api/all-lessons/', {
+                'student': student.pk, 'date': later, 'time': '18:00',
+                'salary': C_salary_common}),
+            (admin, 'POST', '/api/all-lessons/bulk/', {
+                'student': student.pk,
+                'slots': [{'date': later, 'time': '20:00'}]}),
+            (admin, 'GET', f'/api/all-lessons/{admin_lesson}/', None),
+            (admin, 'PATCH', f'/api/all-lessons/{admin_lesson}/',
+             {'student': student.pk, 'date': day, 'time': '17:00'}),
+            (admin, 'DELETE', f'/api/all-lessons/{admin_lesson}/', None),
+            (admin, 'GET', '/api/all-relevant-lessons/', None),
+            (admin, 'GET', f'/api/all-relevant-lessons/{lesson}/', None),
+            (admin, 'GET', '/api/admin/admin-panel/timeblock/', None),
+            (admin, 'POST', '/api/admin/admin-panel/timeblock/', {
+                'date': day, 'start_time': '20:00', 'end_time': '21:00'}),
+            (admin, 'POST', '/api/admin/admin-panel/timeblock/bulk/', {
+                'date_from': later, 'date_to': later,
+                'start_time': '22:00', 'end_time': '23:00'}),
+            (admin, 'GET', f'/api/admin/admin-panel/timeblock/{block}/',
+             None),
+            (admin, 'PATCH', f'/api/admin/admin-panel/timeblock/{block}/',
+             {'date': block_day, 'start_time': '10:00',
+              'end_time': '11:00'}),
+            (admin, 'DELETE',
+             f'/api/admin/admin-panel/timeblock/{deleted_block}/', None),
+            (admin, 'GET', '/api/admin/admin-panel/students/', None),
+            (admin, 'GET',
+             f'/api/admin/admin-panel/students/{student.pk}/', None),
+            (admin, 'PATCH',
+             f'/api/admin/admin-panel/students/{student.pk}/',
+             {'first_name': 'Ann'}),
+        ]
+
+    def request(self, user, method, path, data):
+        client = APIClient()
+        if user and path.startswith('/api/'):
+            token = AccessToken.for_user(user)
+            client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+        elif user:
+            client.force_login(user)
+        elif path == '/metrics':
+            client.credentials(HTTP_AUTHORIZATION='Bearer metrics')
+        if method == 'GET':
+            return client.get(path, data)
+        # forms of the pages, JSON of the API
+        format = 'json' if path.startswith('/api/') else 'multipart'
+        return getattr(client, method.lower())(path, data, format=format)
+
+    def test_endpoints_have_budgets(self):
+        budgets = load_budgets()
+        for pattern in urls.urlpatterns:
+            route = str(pattern.pattern)
+            # the format suffix variants of the API routes, and the API
+            # root shadowed by the homepage
+            if '(?P<format>' in route or pattern.name == 'api-root':
+                continue
+            self.assertIn(route, budgets)
+
+    def test_endpoints_keep_budgets(self):
+        requested = set()
+        for user, method, path, data in self.cases():
+            with self.subTest(method=method, path=path):
+                self.client.logout()
+                response = self.request(user, method, path, data)
+                self.assertLess(response.status_code, 400)
+                self.assertWithinBudget(response)
+                requested.add((response.resolver_match.route, method))
+        for route, methods in load_budgets().items():
+            for method in methods:
+                self.assertIn((route, method), requested)
+
+    def test_server_timing_and_log(self):
+        with self.assertLogs('lessons_app.requests', logging.INFO) as logs:
+            response = self.client.get('/api/get-relevant-lessons')
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="\d+ queries", '
+                         r'total;dur=[\d.]+$')
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['route'], 'api/get-relevant-lessons')
+        self.assertEqual(record['queries'], response.query_count)
+        self.assertLessEqual(len(record['slowest']), 3)
+
+    def test_over_budget_is_warned(self):
+        with mock.patch('lessons_app.middleware.get_budget',
+                        return_value=0), \
+                self.assertLogs('lessons_app.requests',
+                                logging.WARNING) as logs:
+            self.client.get('/api/get-relevant-lessons')
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['budget'], 0)
+        self.assertGreater(record['queries'], 0)
+
+    async def test_async_requests_are_counted(self):
+        # the queries of the sync views run in a thread under ASGI
+        for client in (self.client, self.async_client):
+            await sync_to_async(client.force_login)(self.student)
+        for path in ('/api/get-relevant-lessons', '/my-lessons'):
+            with self.subTest(path=path):
+                response = await self.async_client.get(path)
+                sync_response = await sync_to_async(self.client.get)(path)
+                self.assertGreater(response.query_count, 0)
+                self.assertEqual(response.query_count,
+                                 sync_response.query_count)
@@ -0,0 +1,232 @@
+from datetime import date, time, timedelta
+
+from django.test import TransactionTestCase
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from lessons_app.availability import get_day
+from lessons_app.bulk import book_lessons
+from lessons_app.models import Lesson, TimeBlock, UserDetail
+from CalendarApi.constraints import (
+    C_salary_common, C_salary_high, C_lesson_threshold
+)
+
+
+class TestBulkBooking(TestCase):
+    """ Testing booking of many lessons at once """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.student = User.objects.create_user(username='student')
+        UserDetail.objects.create(user=cls.student)
+        cls.date = date.today() + timedelta(days=2)
+        Lesson.objects.create(student=cls.student,
+                              date=cls.date + timedelta(weeks=1),
+                              time=time(12), salary=C_salary_common)
+        TimeBlock.objects.create(date=cls.date + timedelta(weeks=2),
+                                 start_time=time(8), end_time=time(23))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_weekly(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/all-lessons/bulk/', {
+            'student': self.student.pk,
+            'weekly': {'date': self.date, 'time': '12:00', 'count': 5},
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [lesson['date'] for lesson in response.data['created']],
+            [(self.date + timedelta(weeks=i)).isoformat() for i in (0, 3, 4)]
+        )
+        self.assertEqual(
+            [slot['date'] for slot in response.data['rejected']],
+            [(self.date + timedelta(weeks=i)).isoformat() for i in (1, 2)]
+        )
+        self.assertEqual(Lesson.objects.count(), 4)
+
+    def test_queries_dont_depend_on_slots(self):
+        def book(count, hour):
+            # 8 to book and 1 to store the events
+            with self.assertNumQueries(9):
+                book_lessons(self.student.pk, [
+                    (self.date + timedelta(weeks=3 + i), time(hour))
+                    for i in range(count)
+                ], check_booking=False)
+
+        book(1, 12)
+        book(50, 14)
+
+    def test_slots_of_one_day(self):
+        slots = [(self.date, time(hour)) for hour in range(11, 18)]
+        # the duplicate and the overlapping slot are rejected
+        slots += [(self.date, time(12)), (self.date, time(12, 30))]
+        duplicates = REGISTRY.get_sample_value(
+            'lessons_rejections_total', {'reason': 'duplicate_slot'}) or 0
+        lessons, rejected = book_lessons(self.student.pk, slots)
+        self.assertEqual(len(lessons), 7)
+        self.assertEqual(
+            [(slot.date, slot.time, len(slot.errors)) for slot in rejected],
+            [(self.date, time(12), 1), (self.date, time(12, 30), 1)]
+        )
+        self.assertEqual(REGISTRY.get_sample_value(
+            'lessons_rejections_total', {'reason': 'duplicate_slot'}),
+            duplicates + 1)
+        # the lessons over the threshold are priced with the high rate
+        self.assertEqual(
+            [lesson.salary for lesson in lessons],
+            [C_salary_common] * (C_lesson_threshold - 1)
+            + [C_salary_high] * (8 - C_lesson_threshold)
+        )
+
+    def test_student(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.post('/api/set-my-lessons/bulk/', {
+            'slots': [{'date': self.date, 'time': '15:00'},
+                      {'date': self.date, 'time': '07:00'},
+                      {'date': date.today() + timedelta(days=30),
+                       'time': '15:00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'][0]['student'],
+                         self.student.pk)
+        self.assertEqual(len(response.data['rejected']), 2)
+
+    def test_nothing_created(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.post('/api/set-my-lessons/bulk/', {
+            'slots': [{'date': self.date - timedelta(days=5),
+                       'time': '15:00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], [])
+
+    def test_invalid_data(self):
+        self.client.force_authenticate(self.admin)
+        weekly = {'date': self.date, 'time': '12:00', 'count': 2}
+        for data in ({'student': self.student.pk},
+                     {'student': self.student.pk, 'weekly': weekly,
+                      'slots': [{'date': self.date, 'time': '15:00'}]},
+                     {'weekly': weekly},
+                     {'student': self.student.pk,
+                      'weekly': dict(weekly, count=1000)}):
+            response = self.client.post('/api/all-lessons/bulk/', data,
+                                        format='json')
+            self.assertEqual(response.status_code, 400)
+
+
+class TestBulkBookingCache(TransactionTestCase):
+    """ Testing bulk booking invalidates the schedule """
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='student')
+        self.date = date.today() + timedelta(days=2)
+
+    def test_invalidation(self):
+        self.assertEqual(get_day(self.date).lesson_count, 0)
+        book_lessons(self.student.pk, [(self.date, time(12)),
+                                       (self.date, time(14))])
+        self.assertEqual(get_day(self.date).lesson_count, 2)
+
+
+class TestBulkTimeBlocks(TestCase):
+    """ Testing blocking of many days at once """
+
+    path = '/api/admin/admin-panel/timeblock/bulk/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin',
+                                                  password='admin')
+        student = User.objects.create_user(username='student')
+        # Monday in two weeks
+        cls.monday = date.today() + timedelta(days=14 - date.today().weekday())
+        Lesson.objects.create(student=student,
+                              date=cls.monday + timedelta(days=2),
+                              time=time(12), salary=C_salary_common)
+        TimeBlock.objects.create(date=cls.monday, start_time=time(8),
+                                 end_time=time(10))
+        TimeBlock.objects.create(date=cls.monday, start_time=time(20),
+                                 end_time=time(21))
+        TimeBlock.objects.create(date=cls.monday + timedelta(days=1),
+                                 start_time=time(15), end_time=time(16))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def blocks(self, date):
+        return list(TimeBlock.objects.filter(date=date).values_list(
+            'start_time', 'end_time'))
+
+    def test_week(self):
+        response = self.client.post(self.path, {
+            'date_from': self.monday,
+            'date_to': self.monday + timedelta(days=6),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 6)
+        self.assertEqual(
+            [(day['date'], len(day['errors']))
+             for day in response.data['rejected']],
+            [((self.monday + timedelta(days=2)).isoformat(), 1)]
+        )
+        # the existing blocks are merged into the whole day
+        self.assertEqual(self.blocks(self.monday), [(time(8), time(23))])
+        self.assertEqual(self.blocks(self.monday + timedelta(days=1)),
+                         [(time(8), time(23))])
+
+    def test_merge_adjacent(self):
+        response = self.client.post(self.path, {
+            'date_from': self.monday,
+            'date_to': self.monday + timedelta(days=13),
+            'weekdays': [0],
+            'start_time': '10:00',
+            'end_time': '12:00',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.blocks(self.monday),
+                         [(time(8), time(12)), (time(20), time(21))])
+        self.assertEqual(self.blocks(self.monday + timedelta(weeks=1)),
+                         [(time(10), time(12))])
+
+    def test_queries_dont_depend_on_days(self):
+        # savepoint, days, locks, lessons, insert, events, blocks to
+        # merge, savepoint, result
+        with self.assertNumQueries(9):
+            self.client.post(self.path, {
+                'date_from': self.monday + timedelta(weeks=1),
+                'date_to': self.monday + timedelta(weeks=20),
+            }, format='json')
+
+    def test_invalid_data(self):
+        for data in ({'date_from': self.monday, 'date_to': self.monday,
+                      'start_time': '12:00', 'end_time': '10:00'},
+                     {'date_from': self.monday,
+                      'date_to': self.monday - timedelta(days=1)},
+                     {'date_from': self.monday, 'date_to': self.monday,
+                      'weekdays': [7]}):
+            response = self.client.post(self.path, data, format='json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_admin_form(self):
+        self.client.login(username='admin', password='admin')
+        response = self.client.post('/admin-panel/block-days', {
+            'date_from': self.monday,
+            'date_to': self.monday + timedelta(days=6),
+            'weekdays': [2, 3],
+            'start_time': 8,
+            'end_time': 23,
+        }, follow=True)
+        self.assertRedirects(response, '/admin-panel/block-days')
+        self.assertEqual(
+            [message.tags for message in response.context['messages']],
+            ['success', 'error']
+        )
+        self.assertEqual(self.blocks(self.monday + timedelta(days=3)),
+                         [(time(8), time(23))])
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import time
+from threading import Barrier, Thread
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from CalendarApi.sqlite_cache import SQLiteCache
+from lessons_app.caching import get_or_build
+
+
+class TestSQLiteCache(SimpleTestCase):
+    """ Testing the SQLite cache backend """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path, {'OPTIONS': {'MAX_ENTRIES': 10}})
+
+    def test_set_get_delete(self):
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertTrue(self.cache.has_key('key'))
+        self.assertTrue(self.cache.delete('key'))
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expiry(self):
+        self.cache.set('key', 1, timeout=0.1)
+        time.sleep(0.2)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 2))
+        self.assertFalse(self.cache.add('key', 3))
+        self.assertEqual(self.cache.get('key'), 2)
+
+    def test_incr(self):
+        with self.assertRaises(ValueError):
+            self.cache.incr('counter')
+        self.cache.set('counter', 1, timeout=None)
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.cache.incr('counter', 10), 12)
+
+    def test_incr_is_atomic_across_connections(self):
+        self.cache.set('counter', 0, timeout=None)
+
+        def increment():
+            cache = SQLiteCache(self.path, {})
+            for _ in range(50):
+                cache.incr('counter')
+
+        threads = [Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_cull(self):
+        for i in range(30):
+            self.cache.set(f'key{i}', i)
+        self.cache.set('counter', 0, timeout=None)
+        amount = sum(self.cache.has_key(f'key{i}') for i in range(30))
+        self.assertLessEqual(amount, 20)
+        self.assertTrue(self.cache.has_key('counter'))
+
+
+class TestGetOrBuild(SimpleTestCase):
+    """ Testing the two-tier cache with stampede protection """
+
+    def setUp(self):
+        self.key = f'lessons_app:test:{time.time_ns()}'
+
+    def test_value_is_built_once(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return 'value'
+
+        self.assertEqual(get_or_build(self.key, build, 60), 'value')
+        self.assertEqual(get_or_build(self.key, build, 60), 'value')
+        caches['local'].clear()
+        self.assertEqual(get_or_build(self.key, build, 60), 'value')
+        self.assertEqual(len(calls), 1)
+
+    def test_single_flight(self):
+        workers = 8
+        barrier = Barrier(workers)
+        calls = []
+        results = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.3)
+            return 'value'
+
+        def get():
+            barrier.wait()
+            results.append(get_or_build(self.key, build, 60))
+
+        threads = [Thread(target=get) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * workers)
+        self.assertEqual(len(calls), 1)
+
+    def test_early_rebuild(self):
+        values = iter(['old', 'new'])
+        get_or_build(self.key, lambda: next(values), 60)
+        # building took "an hour", so the minute left is too short
+        entry = caches['default'].get(self.key)
+        caches['default'].set(self.key, (entry[0], 3600, entry[2]), 60)
+        caches['local'].clear()
+        # a draw below 1 - e^(-1/60) would still keep the value
+        with mock.patch('lessons_app.caching.random.random',
+                        return_value=0.5):
+            self.assertEqual(
+                get_or_build(self.key, lambda: next(values), 60), 'new')
@@ -0,0 +1,208 @@
+import time as clock
+from datetime import date, time, timedelta
+from io import StringIO
+from threading import Event, Thread
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from django.test import TransactionTestCase
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from rest_framework.test import APIClient
+
+from lessons_app.bulk import block_time
+from lessons_app.changes import (
+    RETENTION, changes_since, is_expired, last_sequence, prune_events,
+    wait_for_changes
+)
+from lessons_app.models import Lesson, TimeBlock, ScheduleEvent
+from CalendarApi.constraints import C_salary_common
+
+
+class TestChangeFeed(TestCase):
+    """ Testing the events of the change feed """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username='student')
+        cls.date = date.today() + timedelta(days=2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def actions(self, since=0):
+        return list(ScheduleEvent.objects.filter(id__gt=since).values_list(
+            'kind', 'action', 'date'))
+
+    def test_events_of_changes(self):
+        lesson = Lesson.objects.create(student=self.student, date=self.date,
+                                       time=time(12), salary=C_salary_common)
+        lesson.time = time(13)
+        lesson.save()
+        lesson.delete()
+        self.assertEqual(self.actions(), [
+            ('lesson', 'created', self.date),
+            ('lesson', 'updated', self.date),
+            ('lesson', 'deleted', self.date),
+        ])
+
+    def test_events_of_bulk_blocking(self):
+        TimeBlock.objects.create(date=self.date, start_time=time(8),
+                                 end_time=time(10))
+        since = ScheduleEvent.objects.last().pk
+        block_time([self.date], time(10), time(12))
+        # the new block is merged into the existing one
+        self.assertEqual(self.actions(since), [
+            ('timeblock', 'created', self.date),
+            ('timeblock', 'deleted', self.date),
+            ('timeblock', 'updated', self.date),
+        ])
+
+    def test_api(self):
+        response = self.client.get('/api/changes')
+        self.assertEqual(response.status_code, 200)
+        last = response.data['last']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        lesson = Lesson.objects.create(student=self.student, date=self.date,
+                                       time=time(12), salary=C_salary_common)
+        response = self.client.get('/api/changes', {'since': last})
+        self.assertEqual(response.status_code, 200)
+        event = response.data['events'][0]
+        self.assertEqual(
+            (event['kind'], event['action'], event['object_id']),
+            ('lesson', 'created', lesson.pk)
+        )
+        self.assertEqual(response.data['last'], event['id'])
+
+        # nothing has changed since then
+        response = self.client.get('/api/changes',
+                                   {'since': event['id'], 'timeout': 0})
+        self.assertEqual(response.data,
+                         {'last': event['id'], 'events': []})
+
+    def test_expired_changes(self):
+        for hour in (12, 14, 16):
+            Lesson.objects.create(student=self.student, date=self.date,
+                                  time=time(hour), salary=C_salary_common)
+        last_sequence()
+        seen, expired, kept = ScheduleEvent.objects.all()
+        ScheduleEvent.objects.filter(pk__lte=expired.pk).update(
+            created_at=timezone.now() - RETENTION - timedelta(hours=1))
+        self.assertEqual(prune_events(), 2)
+
+        response = self.client.get('/api/changes',
+                                   {'since': seen.sequence, 'timeout': 0})
+        self.assertEqual(response.status_code, 410)
+        response = self.client.get('/api/changes',
+                                   {'since': expired.sequence, 'timeout': 0})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event['object_id'] for event in
+                          response.data['events']], [kept.object_id])
+
+    def test_gaps_are_not_expired(self):
+        last = last_sequence()
+        # the id of the rolled back event is never used
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            Lesson.objects.create(student=self.student, date=self.date,
+                                  time=time(12), salary=C_salary_common)
+            raise DatabaseError
+        Lesson.objects.create(student=self.student, date=self.date,
+                              time=time(14), salary=C_salary_common)
+        response = self.client.get('/api/changes',
+                                   {'since': last, 'timeout': 0})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['events'][0]['id'], last + 1)
+
+    def test_prune_command(self):
+        Lesson.objects.create(student=self.student, date=self.date,
+                              time=time(12), salary=C_salary_common)
+        out = StringIO()
+        call_command('prune_changes', stdout=out)
+        self.assertEqual(ScheduleEvent.objects.count(), 1)
+        ScheduleEvent.objects.update(
+            created_at=timezone.now() - RETENTION - timedelta(hours=1))
+        call_command('prune_changes', stdout=out)
+        self.assertFalse(ScheduleEvent.objects.exists())
+        self.assertTrue(is_expired(0))
+
+    def test_invalid_parameters(self):
+        for params in ({'since': 'x'}, {'since': -1},
+                       {'since': 0, 'timeout': 'x'}):
+            response = self.client.get('/api/changes', params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_anonymous(self):
+        response = APIClient().get('/api/changes')
+        self.assertIn(response.status_code, (401, 403))
+
+
+class TestLongPolling(TransactionTestCase):
+    """ Testing the waiting for a change made by another connection """
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='student')
+        self.date = date.today() + timedelta(days=2)
+
+    def test_wait_is_woken_by_change(self):
+        def book():
+            clock.sleep(1)
+            Lesson.objects.create(student=self.student, date=self.date,
+                                  time=time(12), salary=C_salary_common)
+            connection.close()
+
+        thread = Thread(target=book)
+        start = clock.monotonic()
+        thread.start()
+        events = async_to_sync(wait_for_changes)(0, 10)
+        thread.join()
+        self.assertEqual(len(events), 1)
+        self.assertLess(clock.monotonic() - start, 5)
+
+    def test_late_commit_is_not_skipped(self):
+        """ A writer of another day doesn't wait for an open transaction,
+        and the event committed later gets a later number """
+
+        booked, commit = Event(), Event()
+
+        def book_slowly():
+            with transaction.atomic():
+                Lesson.objects.create(student=self.student, date=self.date,
+                                      time=time(12), salary=C_salary_common)
+                booked.set()
+                commit.wait(10)
+            connection.close()
+
+        def book_other_day():
+            Lesson.objects.create(student=self.student,
+                                  date=self.date + timedelta(days=1),
+                                  time=time(12), salary=C_salary_common)
+            connection.close()
+
+        slow = Thread(target=book_slowly)
+        slow.start()
+        booked.wait(10)
+        try:
+            other = Thread(target=book_other_day)
+            other.start()
+            other.join(5)
+            self.assertFalse(other.is_alive())
+            # the event of the open transaction isn't seen nor skipped
+            events = changes_since(0)
+            self.assertEqual([event.date for event in events],
+                             [self.date + timedelta(days=1)])
+        finally:
+            commit.set()
+            slow.join()
+        events = changes_since(events[-1].sequence)
+        self.assertEqual([event.date for event in events], [self.date])
+        self.assertEqual(events[0].sequence, 2)
+
+    def test_wait_times_out(self):
+        start = clock.monotonic()
+        self.assertEqual(async_to_sync(wait_for_changes)(0, 1), [])
+        self.assertGreaterEqual(clock.monotonic() - start, 1)
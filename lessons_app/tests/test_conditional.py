@@ -0,0 +1,92 @@
+from datetime import date, time, timedelta
+
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from lessons_app.models import Lesson, TimeBlock, UserDetail
+from CalendarApi.constraints import C_salary_common
+
+
+class TestConditionalRequests(TestCase):
+    """ Testing 304 answers of the schedule reads """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.credentials = {'username': 'student', 'password': 'password'}
+        cls.student = User.objects.create_user(**cls.credentials)
+        UserDetail.objects.create(user=cls.student)
+        cls.date = date.today() + timedelta(days=1)
+
+    def create_lesson(self):
+        Lesson.objects.create(student=self.student, date=self.date,
+                              time=time(12), salary=C_salary_common)
+
+    def assertNotModified(self, path, **headers):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(response.status_code, 304)
+        return etag
+
+    def test_api(self):
+        for path in ('/api/get-relevant-lessons', '/api/get-timeblocks'):
+            with self.subTest(path=path):
+                etag = self.assertNotModified(path)
+                TimeBlock.objects.create(date=self.date, start_time=time(8),
+                                         end_time=time(9))
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_last_modified(self):
+        path = '/api/get-relevant-lessons'
+        last_modified = self.client.get(path)['Last-Modified']
+        response = self.client.get(path, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_homepage(self):
+        etag = self.assertNotModified('/')
+        self.create_lesson()
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_homepage_of_other_user(self):
+        etag = self.client.get('/')['ETag']
+        self.client.login(**self.credentials)
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotModified('/')
+
+    def test_homepage_with_messages(self):
+        self.client.login(**self.credentials)
+        etag = self.client.get('/')['ETag']
+        # the error is shown on the next page, the schedule is the same
+        self.client.post('/add-lesson', {'time': 3, 'date': self.date})
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['messages']), 1)
+
+    def test_homepage_of_staff(self):
+        admin = User.objects.create_user(username='admin', is_staff=True,
+                                         is_superuser=True)
+        self.create_lesson()
+        self.client.force_login(admin)
+        etag = self.assertNotModified('/')
+        # a login of a student doesn't change the page
+        self.client.login(**self.credentials)
+        self.client.force_login(admin)
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # the page of staff shows the details of the students
+        response = self.client.post(
+            f'/admin-panel/students/{self.student.pk}',
+            {'pk': self.student.pk, 'first_name': 'Ann', 'alias': 'Ann',
+             'usual_cost': 1000, 'high_cost': 1500, 'phone': '89000000000',
+             'is_active': True},
+            follow=True)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Ann')
@@ -0,0 +1,161 @@
+import time as time_module
+from datetime import date, time, timedelta
+from unittest import mock
+
+from django.test import TransactionTestCase
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from rest_framework.test import APIClient
+
+from lessons_app.feeds import TOKEN_MAX_AGE, issue_token, fold
+from lessons_app.models import FeedKey, Lesson, TimeBlock, UserDetail
+from CalendarApi.constraints import C_salary_common
+
+
+class TestCalendarFeed(TestCase):
+    """ Testing the ICS feeds """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', is_staff=True,
+                                             is_superuser=True)
+        cls.student = User.objects.create_user(username='student',
+                                               first_name='Ann')
+        UserDetail.objects.create(user=cls.student, alias='Ann, group A')
+        other = User.objects.create_user(username='other')
+        cls.date = date.today() + timedelta(days=2)
+        Lesson.objects.create(student=cls.student, date=cls.date,
+                              time=time(23), salary=C_salary_common)
+        Lesson.objects.create(student=other, date=cls.date, time=time(12),
+                              salary=C_salary_common)
+        TimeBlock.objects.create(date=cls.date, start_time=time(15),
+                                 end_time=time(18))
+
+    def get_feed(self, user, **headers):
+        return self.client.get(f'/calendar/{issue_token(user)}.ics',
+                               **headers)
+
+    def test_student_feed(self):
+        response = self.get_feed(self.student)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'],
+                         'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        # 23:00 in Moscow is 20:00 UTC, the lesson ends the next day
+        day = self.date.strftime(r'%Y%m%d')
+        self.assertIn(f'DTSTART:{day}T200000Z\r\n', body)
+        self.assertIn(f'DTEND:{day}T210000Z\r\n', body)
+
+    def test_admin_feed(self):
+        body = self.get_feed(self.admin).content.decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 3)
+        self.assertIn('SUMMARY:Ann\\, group A\r\n', body)
+
+    def test_invalid_token(self):
+        response = self.client.get('/calendar/forged.ics')
+        self.assertEqual(response.status_code, 404)
+        token = issue_token(self.student)
+        response = self.client.get(f'/calendar/{token[:-1]}x.ics')
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed_url(self):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        # a safe request issues nothing
+        self.assertIsNone(client.get('/api/calendar-feed').data['url'])
+        self.assertFalse(FeedKey.objects.filter(user=self.student).exists())
+        url = client.post('/api/calendar-feed').data['url']
+        self.assertTrue(url.startswith('http://testserver/calendar/'))
+        self.assertEqual(client.get('/api/calendar-feed').data['url'], url)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_new_url_revokes_old(self):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        old = client.post('/api/calendar-feed').data['url']
+        new = client.post('/api/calendar-feed').data['url']
+        self.assertNotEqual(new, old)
+        self.assertEqual(self.client.get(old).status_code, 404)
+        self.assertEqual(self.client.get(new).status_code, 200)
+
+    def test_expired_token(self):
+        token = issue_token(self.student)
+        later = time_module.time() + TOKEN_MAX_AGE.total_seconds() + 60
+        with mock.patch('django.core.signing.time.time', return_value=later):
+            response = self.client.get(f'/calendar/{token}.ics')
+        self.assertEqual(response.status_code, 404)
+
+    def test_role_is_checked_every_request(self):
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        # only superusers get the admin panel and the admin feed
+        body = self.get_feed(staff).content.decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 0)
+
+        token = issue_token(self.admin)
+        self.admin.is_superuser = False
+        self.admin.save()
+        response = self.client.get(f'/calendar/{token}.ics')
+        self.assertEqual(response.status_code, 404)
+
+    def test_inactive_user(self):
+        token = issue_token(self.student)
+        self.student.is_active = False
+        self.student.save()
+        response = self.client.get(f'/calendar/{token}.ics')
+        self.assertEqual(response.status_code, 404)
+
+    def test_fold(self):
+        line = 'SUMMARY:' + 'ы' * 100
+        folded = fold(line)
+        self.assertTrue(all(len(part.encode()) <= 75
+                            for part in folded.split('\r\n')))
+        self.assertEqual(folded.replace('\r\n ', ''), line)
+
+
+class TestCalendarFeedConditionalGet(TransactionTestCase):
+    """ Testing unchanged feeds are answered with 304 """
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='student')
+        self.path = f'/calendar/{issue_token(self.student)}.ics'
+
+    def test_not_modified(self):
+        response = self.client.get(self.path)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+        # the token is checked only
+        with self.assertNumQueries(1):
+            response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.path,
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        Lesson.objects.create(student=self.student,
+                              date=date.today() + timedelta(days=1),
+                              time=time(12), salary=C_salary_common)
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_admin_feed_follows_students(self):
+        admin = User.objects.create_user(username='admin', is_superuser=True)
+        Lesson.objects.create(student=self.student,
+                              date=date.today() + timedelta(days=1),
+                              time=time(12), salary=C_salary_common)
+        path = f'/calendar/{issue_token(admin)}.ics'
+        response = self.client.get(path)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+        # the last change has to be in a later second than the response
+        with mock.patch('lessons_app.versioning.time.time',
+                        return_value=time_module.time() + 1):
+            UserDetail.objects.create(user=self.student, alias='Ann')
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('SUMMARY:Ann', response.content.decode())
+        response = self.client.get(path,
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,98 @@
+""" These tests verify the planner uses the indexes of the hot queries
+on a large table """
+
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from lessons_app.models import Lesson, TimeBlock
+from CalendarApi.constraints import C_datedelta
+
+
+class TestIndexUsage(TestCase):
+    """ EXPLAIN of the hot queries on the table of 1M lessons """
+
+    lessons_amount = 1_000_000
+    timeblocks_amount = 50_000
+    students_amount = 200
+    days = 3650  # history
+
+    @classmethod
+    def setUpTestData(cls):
+        students = User.objects.bulk_create([
+            User(username=f'student{i}') for i in range(cls.students_amount)
+        ])
+        cls.student_ids = [student.pk for student in students]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO lessons_app_lesson
+                    (student_id, created_at, salary, time, date)
+                SELECT (%(students)s::bigint[])[1 + i %% %(amount)s],
+                       now(), 1000,
+                       make_time(8 + (i / %(days)s) %% 16, 0, 0),
+                       current_date + %(ahead)s - i %% %(days)s
+                FROM generate_series(0, %(lessons)s - 1) AS i
+                """,
+                {'students': cls.student_ids,
+                 'amount': cls.students_amount,
+                 'days': cls.days,
+                 'ahead': C_datedelta.days,
+                 'lessons': cls.lessons_amount}
+            )
+            cursor.execute(
+                """
+                INSERT INTO lessons_app_timeblock (date, start_time, end_time)
+                SELECT current_date + %(ahead)s - i %% %(days)s,
+                       make_time(8 + i / %(days)s %% 7, 0, 0),
+                       make_time(9 + i / %(days)s %% 7, 0, 0)
+                FROM generate_series(0, %(timeblocks)s - 1) AS i
+                """,
+                {'days': cls.days,
+                 'ahead': C_datedelta.days,
+                 'timeblocks': cls.timeblocks_amount}
+            )
+            cursor.execute('ANALYZE lessons_app_lesson')
+            cursor.execute('ANALYZE lessons_app_timeblock')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        self.assertNotIn('Seq Scan', plan)
+
+    def test_relevant_lessons(self):
+        today = date.today()
+        self.assertUsesIndex(
+            Lesson.objects.filter(date__gte=today),
+            'lesson_date_time_idx'
+        )
+        self.assertUsesIndex(
+            Lesson.objects.filter(date__gte=today,
+                                  date__lte=today + C_datedelta),
+            'lesson_date_time_idx'
+        )
+
+    def test_lessons_of_day(self):
+        self.assertUsesIndex(
+            Lesson.objects.filter(
+                date=date.today() + timedelta(days=1)
+            ).values_list('time'),
+            'lesson_date_time_idx'
+        )
+
+    def test_lessons_of_student(self):
+        self.assertUsesIndex(
+            Lesson.objects.filter(student_id=self.student_ids[0],
+                                  date__gte=date.today()),
+            'lesson_student_date_idx'
+        )
+
+    def test_timeblocks_of_day(self):
+        self.assertUsesIndex(
+            TimeBlock.objects.filter(
+                date=date.today() + timedelta(days=1)
+            ).values_list('start_time', 'end_time'),
+            'timeblock_date_start_idx'
+        )
@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, time, timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from lessons_app.caching import get_or_build
+from lessons_app.metrics import MULTIPROCESS_DIR, render_metrics
+from lessons_app.models import Lesson, UserDetail
+from lessons_app.rules import booking_errors
+from CalendarApi.constraints import C_salary_common
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(METRICS_TOKEN='secret')
+class TestMetrics(TestCase):
+    """ Testing the Prometheus metrics """
+
+    def test_endpoint_needs_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics',
+                                   HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+        with override_settings(METRICS_TOKEN=''):
+            response = self.client.get('/metrics',
+                                       HTTP_AUTHORIZATION='Bearer ')
+            self.assertEqual(response.status_code, 403)
+
+    def test_requests(self):
+        labels = {'route': 'api/get-relevant-lessons', 'method': 'GET'}
+        count = sample('lessons_request_duration_seconds_count', **labels)
+        self.client.get('/api/get-relevant-lessons')
+        self.assertEqual(
+            sample('lessons_request_duration_seconds_count', **labels),
+            count + 1)
+
+        response = self.client.get('/metrics',
+                                   HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('lessons_requests_total{method="GET",'
+                      'route="api/get-relevant-lessons",status="200"}',
+                      response.content.decode())
+
+    def test_rejections(self):
+        before = sample('lessons_rejections_total', reason='too_early')
+        booking_errors(date.today() + timedelta(days=2), time(5))
+        self.assertEqual(sample('lessons_rejections_total',
+                                reason='too_early'), before + 1)
+
+    def test_bookings_are_counted_on_commit(self):
+        student = User.objects.create_user(username='student')
+        client = APIClient()
+        client.force_authenticate(student)
+        before = sample('lessons_bookings_total', mode='single')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/set-my-lessons/', {
+                'date': date.today() + timedelta(days=2), 'time': '12:00'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sample('lessons_bookings_total', mode='single'),
+                         before + 1)
+
+        # changes of the schedule aren't bookings by themselves
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.create(student=student,
+                                  date=date.today() + timedelta(days=3),
+                                  time=time(12), salary=C_salary_common)
+        self.assertEqual(sample('lessons_bookings_total', mode='single'),
+                         before + 1)
+
+    def test_booking_pages_are_counted(self):
+        student = User.objects.create_user(username='student')
+        UserDetail.objects.create(user=student)
+        self.client.force_login(student)
+        before = sample('lessons_bookings_total', mode='single')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/add-lesson', {
+                'date': (date.today() + timedelta(days=2)).isoformat(),
+                'time': 12})
+        self.assertTrue(Lesson.objects.filter(student=student).exists())
+        self.assertEqual(sample('lessons_bookings_total', mode='single'),
+                         before + 1)
+
+    def test_cache(self):
+        key = 'lessons_app:test_metrics:{}'.format(os.getpid())
+        miss = sample('lessons_schedule_cache_total', result='miss')
+        hit = sample('lessons_schedule_cache_total', result='hit_local')
+        get_or_build(key, lambda: 1, 60)
+        get_or_build(key, lambda: 1, 60)
+        self.assertEqual(sample('lessons_schedule_cache_total',
+                                result='miss'), miss + 1)
+        self.assertEqual(sample('lessons_schedule_cache_total',
+                                result='hit_local'), hit + 1)
+
+    def test_workers_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, **{MULTIPROCESS_DIR: directory})
+            for _ in range(2):
+                subprocess.run([
+                    sys.executable, '-c',
+                    'from lessons_app.metrics import BOOKINGS; '
+                    'BOOKINGS.labels("bulk").inc(3)'
+                ], env=env, cwd=settings.BASE_DIR, check=True)
+            with mock.patch.dict(os.environ, {MULTIPROCESS_DIR: directory}):
+                metrics = render_metrics().decode()
+        self.assertIn('lessons_bookings_total{mode="bulk"} 6.0', metrics)
@@ -60,6 +60,10 @@ class TestPagesLoadsByAnonymousUser(TestCase):
         response = self.client.get('/admin-panel/block-time')
         self.assertRedirects(response, '/')
 
+    def test_block_days_page_for_admin(self):
+        response = self.client.get('/admin-panel/block-days')
+        self.assertRedirects(response, '/')
+
     def test_students_page_for_admin(self):
         response = self.client.get('/admin-panel/students')
         self.assertRedirects(response, '/')
@@ -143,6 +147,10 @@ class TestPagesLoadsByAuthenticatedUser(TestCase):
         response = self.client.get('/admin-panel/block-time')
         self.assertRedirects(response, '/')
 
+    def test_block_days_page_for_admin(self):
+        response = self.client.get('/admin-panel/block-days')
+        self.assertRedirects(response, '/')
+
     def test_students_page_for_admin(self):
         response = self.client.get('/admin-panel/students')
         self.assertRedirects(response, '/')
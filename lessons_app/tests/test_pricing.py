@@ -0,0 +1,126 @@
+from datetime import date, time, timedelta
+
+from django.test import TransactionTestCase
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from rest_framework.test import APIClient
+
+from lessons_app.models import Lesson, UserDetail
+from lessons_app.pricing import quote
+from CalendarApi.constraints import (
+    C_salary_common, C_salary_high, C_lesson_threshold
+)
+
+
+class TestQuote(TestCase):
+    """ Testing the price rules """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.date = date.today() + timedelta(days=2)
+        cls.student = User.objects.create_user(username='student')
+        UserDetail.objects.create(user=cls.student, usual_cost=1500,
+                                  high_cost=2000)
+        cls.other = User.objects.create_user(username='other')
+        UserDetail.objects.create(user=cls.other, usual_cost=None,
+                                  high_cost=None)
+
+    def test_rates_of_student(self):
+        self.assertEqual(quote(self.student.pk, self.date, time(12)),
+                         (1500, False))
+        self.assertEqual(quote(self.student.pk, self.date, time(8)),
+                         (2000, True))
+        self.assertEqual(quote(self.student.pk, self.date, time(23)),
+                         (2000, True))
+
+    def test_common_rates(self):
+        self.assertEqual(quote(self.other.pk, self.date, time(12)),
+                         (C_salary_common, False))
+        self.assertEqual(quote(None, self.date, time(9)),
+                         (C_salary_high, True))
+
+    def test_full_day(self):
+        Lesson.objects.bulk_create([
+            Lesson(student=self.other, date=self.date, time=time(11 + i),
+                   salary=C_salary_common)
+            for i in range(C_lesson_threshold - 1)
+        ])
+        self.assertEqual(quote(self.student.pk, self.date, time(18)),
+                         (2000, True))
+        self.assertEqual(quote(self.student.pk, self.date + timedelta(1),
+                               time(18)), (1500, False))
+
+
+class TestRatesCache(TransactionTestCase):
+    """ Testing the cached rates and their invalidation """
+
+    def setUp(self):
+        self.date = date.today() + timedelta(days=2)
+        self.student = User.objects.create_user(username='student')
+        self.details = UserDetail.objects.create(user=self.student,
+                                                 usual_cost=1500)
+
+    def test_rates_are_cached(self):
+        quote(self.student.pk, self.date, time(12))
+        with self.assertNumQueries(0):
+            # the day is cached by the availability index
+            self.assertEqual(quote(self.student.pk, self.date, time(12)),
+                             (1500, False))
+
+    def test_change_of_details(self):
+        quote(self.student.pk, self.date, time(12))
+        self.details.usual_cost = 1700
+        self.details.save()
+        self.assertEqual(quote(self.student.pk, self.date, time(12)),
+                         (1700, False))
+
+
+class TestQuoteAPI(TestCase):
+    """ Testing the quote endpoint """
+
+    path = '/api/quote'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.date = (date.today() + timedelta(days=2)).isoformat()
+        cls.student = User.objects.create_user(username='student')
+        UserDetail.objects.create(user=cls.student, usual_cost=1500)
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_anonymous(self):
+        response = self.client.get(self.path, {'date': self.date,
+                                               'time': '12:00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'date': self.date, 'time': '12:00',
+            'salary': C_salary_common, 'is_high': False,
+        })
+
+    def test_student(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get(self.path, {'date': self.date,
+                                               'time': '12:00'})
+        self.assertEqual(response.data['salary'], 1500)
+        # only admins may ask for other students
+        response = self.client.get(self.path, {'date': self.date,
+                                               'time': '12:00',
+                                               'student': self.admin.pk})
+        self.assertEqual(response.data['salary'], 1500)
+
+    def test_admin(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.path, {'date': self.date,
+                                               'time': '12:00',
+                                               'student': self.student.pk})
+        self.assertEqual(response.data['salary'], 1500)
+
+    def test_invalid_parameters(self):
+        for params in ({'date': self.date}, {'time': '12:00'},
+                       {'date': 'today', 'time': '12:00'},
+                       {'date': self.date, 'time': 'noon'}):
+            response = self.client.get(self.path, params)
+            self.assertEqual(response.status_code, 400)
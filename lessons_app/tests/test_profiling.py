@@ -0,0 +1,119 @@
+import pstats
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+
+from django.test import override_settings
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from lessons_app.profiling import (
+    CPROFILE, SAMPLE, make_token, load_token, list_profiles
+)
+
+
+class TestProfiling(TestCase):
+    """ Testing the profiling of requests """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', is_staff=True,
+                                             is_superuser=True)
+        cls.student = User.objects.create_user(username='student')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(PROFILES_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_tokens(self):
+        self.assertEqual(load_token(make_token(self.admin, SAMPLE)), SAMPLE)
+        self.assertIsNone(load_token('forged'))
+        self.assertIsNone(load_token(make_token(self.admin, 'unknown')))
+        with mock.patch('lessons_app.profiling.TOKEN_MAX_AGE', -1):
+            self.assertIsNone(load_token(make_token(self.admin, CPROFILE)))
+
+    def test_token_of_former_staff(self):
+        token = make_token(self.admin, SAMPLE)
+        self.admin.is_staff = False
+        self.admin.save()
+        self.assertIsNone(load_token(token))
+        self.admin.is_staff = True
+        self.admin.is_active = False
+        self.admin.save()
+        self.assertIsNone(load_token(token))
+        self.assertIsNone(load_token(make_token(self.student, SAMPLE)))
+
+    def test_cprofile(self):
+        token = make_token(self.admin, CPROFILE)
+        response = self.client.get('/api/get-relevant-lessons',
+                                   {'profile': token})
+        self.assertEqual(response.status_code, 200)
+        name = response['X-Profile']
+        self.assertRegex(name, r'_GET_api\+get-relevant-lessons\.prof$')
+        [profile] = list_profiles()
+        self.assertEqual(profile.name, name)
+        self.assertEqual(profile.path, '/api/get-relevant-lessons')
+        self.assertEqual(profile.mode, CPROFILE)
+
+    def test_sampling_header(self):
+        token = make_token(self.admin, SAMPLE)
+        response = self.client.get('/', HTTP_X_PROFILE=token)
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['X-Profile'], r'_GET_index\.collapsed$')
+        self.assertEqual(list_profiles()[0].mode, SAMPLE)
+
+    async def test_async_requests(self):
+        token = await sync_to_async(make_token)(self.admin, CPROFILE)
+        response = await self.async_client.get('/api/get-relevant-lessons')
+        self.assertFalse(response.has_header('X-Profile'))
+        response = await self.async_client.get('/api/get-relevant-lessons',
+                                               {'profile': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['X-Profile'], r'\.prof$')
+        profile = pstats.Stats(str(Path(self.directory,
+                                        response['X-Profile'])))
+        # the queries run in the profiled thread
+        self.assertTrue(any(name == 'execute'
+                            for _, _, name in profile.stats))
+
+    def test_forged_token(self):
+        response = self.client.get('/', {'profile': 'forged'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('X-Profile'))
+        self.assertEqual(list_profiles(), [])
+
+    def test_admin_panel(self):
+        token = make_token(self.admin, CPROFILE)
+        name = self.client.get('/info', {'profile': token})['X-Profile']
+
+        self.client.force_login(self.admin)
+        response = self.client.get('/admin-panel/profiles')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['profiles'][0].name, name)
+
+        response = self.client.post('/admin-panel/profiles',
+                                    {'path': '/info', 'mode': SAMPLE})
+        link = response.context['link']
+        self.assertIn('/info?profile=', link)
+        self.assertEqual(load_token(response.context['token']), SAMPLE)
+
+        response = self.client.get(f'/admin-panel/profiles/{name}')
+        self.assertEqual(response['Content-Type'],
+                         'text/plain; charset=utf-8')
+        self.assertIn('cumulative', response.content.decode())
+        response = self.client.get(f'/admin-panel/profiles/{name}',
+                                   {'download': 1})
+        self.assertIn('attachment', response['Content-Disposition'])
+        response = self.client.get('/admin-panel/profiles/unknown.prof')
+        self.assertEqual(response.status_code, 404)
+
+    def test_students_have_no_access(self):
+        self.client.force_login(self.student)
+        response = self.client.get('/admin-panel/profiles')
+        self.assertNotEqual(response.status_code, 200)
@@ -0,0 +1,90 @@
+from datetime import date, datetime, time, timedelta
+
+from django.test import SimpleTestCase
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from rest_framework.test import APIClient
+
+from lessons_app.availability import DaySchedule
+from lessons_app.models import Lesson, TimeBlock, UserDetail
+from lessons_app.rules import booking_errors, lesson_errors, timeblock_errors
+from CalendarApi.constraints import C_salary_common
+
+
+class TestRules(SimpleTestCase):
+    """ Testing every broken rule is reported """
+
+    now = datetime(2022, 3, 1, 12)
+    day = DaySchedule(date(2022, 3, 2), [time(12)], [(time(15), time(18))])
+
+    def test_booking(self):
+        self.assertEqual(booking_errors(date(2022, 3, 2), time(12), self.now),
+                         [])
+        self.assertEqual(
+            len(booking_errors(date(2022, 2, 28), time(7), self.now)), 2
+        )
+        self.assertEqual(
+            len(booking_errors(date(2022, 3, 1), time(14), self.now)), 1
+        )
+        self.assertEqual(
+            len(booking_errors(date(2022, 3, 20), time(23, 30), self.now)), 2
+        )
+
+    def test_lesson(self):
+        self.assertEqual(lesson_errors(self.day, time(13)), [])
+        self.assertEqual(len(lesson_errors(self.day, time(12))), 1)
+        self.assertEqual(len(lesson_errors(self.day, time(16))), 1)
+
+    def test_timeblock(self):
+        today = date(2022, 3, 1)
+        self.assertEqual(
+            timeblock_errors(self.day, time(8), time(10), today), []
+        )
+        self.assertEqual(
+            len(timeblock_errors(self.day, time(10), time(8), today)), 1
+        )
+        # overlaps both the block and the lesson
+        self.assertEqual(
+            len(timeblock_errors(self.day, time(11), time(16), today)), 2
+        )
+        self.assertEqual(
+            len(timeblock_errors(self.day, time(8), time(10),
+                                 date(2022, 3, 5))), 1
+        )
+
+
+class TestValidationErrors(TestCase):
+    """ Testing the API returns the list of all broken rules """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username='student')
+        UserDetail.objects.create(user=cls.student)
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.date = date.today() + timedelta(days=2)
+        for hour in (12, 23):
+            Lesson.objects.create(student=cls.student, date=cls.date,
+                                  time=time(hour), salary=C_salary_common)
+        TimeBlock.objects.create(date=cls.date, start_time=time(22),
+                                 end_time=time(23))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_lesson_errors(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.post('/api/set-my-lessons/', {
+            'date': self.date, 'time': '23:30'
+        })
+        self.assertEqual(response.status_code, 400)
+        # too late and taken by the lesson at 23:00
+        self.assertEqual(len(response.data['non_field_errors']), 2)
+
+    def test_timeblock_errors(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/admin/admin-panel/timeblock/', {
+            'date': self.date, 'start_time': '11:00', 'end_time': '23:00'
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['non_field_errors']), 2)
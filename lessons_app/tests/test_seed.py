@@ -0,0 +1,105 @@
+from collections import Counter
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from lessons_app.availability import get_days
+from lessons_app.models import Lesson, TimeBlock
+from lessons_app.pricing import is_high_time
+from lessons_app.versioning import get_schedule_version
+from CalendarApi.constraints import C_salary_common, C_salary_high
+
+
+class TestSeedCalendar(TestCase):
+    """ Testing the synthetic schedule """
+
+    def seed(self, *args):
+        call_command('seed_calendar', '--seed', '1', '--students', '20',
+                     *args, stdout=StringIO())
+
+    def test_valid_schedule(self):
+        version = get_schedule_version()
+        self.seed('--lessons', '500', '--blocked-days', '0.3')
+        self.assertEqual(User.objects.filter(
+            username__startswith='seed_', details__isnull=False).count(), 20)
+        self.assertEqual(Lesson.objects.count(), 500)
+        self.assertGreater(TimeBlock.objects.count(), 0)
+        self.assertNotEqual(get_schedule_version(), version)
+
+        lessons = Lesson.objects.order_by('date', 'time')
+        days = get_days(lessons.first().date, lessons.last().date)
+        rates = (C_salary_common, C_salary_high)
+        booked = Counter()
+        for lesson in lessons:
+            day = days[lesson.date]
+            # every lesson of the day is on a whole hour
+            self.assertEqual(
+                Counter(day.lessons)[lesson.time.hour * 60], 1)
+            self.assertFalse(day.is_blocked(lesson.time))
+            self.assertLessEqual(lesson.created_at.date(), lesson.date)
+            if is_high_time(lesson.time):
+                self.assertEqual(lesson.salary, C_salary_high)
+            else:
+                self.assertIn(lesson.salary, rates)
+            booked[lesson.date] += 1
+        self.assertLessEqual(max(booked.values()), 16)
+
+    def test_same_seed_same_data(self):
+        self.seed('--lessons', '100', '--prefix', 'a_')
+        first = list(Lesson.objects.values_list('date', 'time', 'salary'))
+        call_command('seed_calendar', '--seed', '1', '--students', '20',
+                     '--lessons', '100', '--prefix', 'a_', '--clear',
+                     stdout=StringIO())
+        self.assertEqual(
+            list(Lesson.objects.values_list('date', 'time', 'salary')),
+            first)
+        self.assertEqual(User.objects.filter(
+            username__startswith='a_').count(), 20)
+
+    def test_history_is_extended(self):
+        self.seed('--lessons', '100')
+        oldest = Lesson.objects.order_by('date').first().date
+        self.seed('--lessons', '100', '--no-copy')
+        self.assertEqual(Lesson.objects.count(), 200)
+        self.assertEqual(User.objects.filter(
+            username__startswith='seed_').count(), 40)
+        # the days of the first run are skipped
+        self.assertFalse(Lesson.objects.filter(
+            date__gte=oldest, student__username__in=[
+                f'seed_{i}' for i in range(21, 41)]).exists())
+
+    def test_bulk_create_keeps_history(self):
+        bulk_create = Lesson.objects.bulk_create
+
+        def without_ids(*args, **kwargs):
+            # as on SQLite
+            with mock.patch.object(connection.features,
+                                   'can_return_rows_from_bulk_insert',
+                                   False):
+                return bulk_create(*args, **kwargs)
+
+        for returns_ids in (True, False):
+            with self.subTest(returns_ids=returns_ids), mock.patch.object(
+                    Lesson.objects, 'bulk_create',
+                    bulk_create if returns_ids else without_ids):
+                Lesson.objects.all().delete()
+                self.seed('--lessons', '100', '--no-copy', '--batch-size',
+                          '30')
+                lessons = Lesson.objects.all()
+                self.assertEqual(len(lessons), 100)
+                for lesson in lessons:
+                    self.assertLessEqual(lesson.created_at.date(),
+                                         lesson.date)
+                self.assertGreater(
+                    len({lesson.created_at for lesson in lessons}), 1)
+
+    def test_invalid_options(self):
+        for args in (['--per-day', '17'], ['--students', '0'],
+                     ['--full-days', '0.6', '--blocked-days', '0.6']):
+            with self.subTest(args=args), self.assertRaises(CommandError):
+                self.seed(*args)
@@ -0,0 +1,61 @@
+from datetime import date, time, timedelta
+from importlib import import_module
+
+from django.apps import apps
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from rest_framework.test import APIClient
+
+from lessons_app.booking import coalesce_blocks
+from lessons_app.models import TimeBlock
+
+
+class TestCoalesceBlocks(TestCase):
+    """ Testing blocks of a day are kept as the minimal intervals """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.date = date.today() + timedelta(days=2)
+
+    def create_blocks(self, *intervals, date=None):
+        TimeBlock.objects.bulk_create([
+            TimeBlock(date=date or self.date, start_time=time(start),
+                      end_time=time(end))
+            for start, end in intervals
+        ])
+
+    def blocks(self, date=None):
+        return list(TimeBlock.objects.filter(
+            date=date or self.date
+        ).values_list('start_time', 'end_time'))
+
+    def test_coalesce(self):
+        self.create_blocks((8, 12), (12, 16), (15, 17), (18, 19))
+        self.create_blocks((8, 9), (9, 10), date=self.date + timedelta(1))
+        coalesce_blocks([self.date])
+        self.assertEqual(self.blocks(),
+                         [(time(8), time(17)), (time(18), time(19))])
+        # other days are untouched
+        self.assertEqual(len(self.blocks(self.date + timedelta(1))), 2)
+
+    def test_api(self):
+        self.create_blocks((8, 12), (14, 16))
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post('/api/admin/admin-panel/timeblock/', {
+            'date': self.date, 'start_time': '12:00', 'end_time': '14:00'
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['start_time'],
+                          response.data['end_time']), ('08:00:00', '16:00:00'))
+        self.assertEqual(self.blocks(), [(time(8), time(16))])
+
+    def test_migration(self):
+        self.create_blocks((8, 12), (12, 16), (10, 11), (20, 21))
+        migration = import_module(
+            'lessons_app.migrations.0014_coalesce_timeblocks')
+        migration.coalesce_timeblocks(apps, None)
+        self.assertEqual(self.blocks(),
+                         [(time(8), time(16)), (time(20), time(21))])
@@ -1,11 +1,11 @@
 from datetime import date, time, timedelta
 
-from django.test.testcases import TestCase
+from django.test.testcases import TestCase, TransactionTestCase
 from django.test.client import Client
 from django.contrib.auth.models import User
 
 from lessons_app.models import Lesson, UserDetail, TimeBlock
-from CalendarApi.constraints import C_salary_common
+from CalendarApi.constraints import C_salary_common, C_datedelta
 
 
 class TestAnonymousAbilities(TestCase):
@@ -58,6 +58,85 @@ class TestAnonymousAbilities(TestCase):
         self.assertTrue(objects)
 
 
+class TestHomepageSchedule(TestCase):
+    """ Testing the schedule of the homepage with a long list of future
+    lessons """
+
+    future_lessons_amount = 10_000
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='user1', password='pass1')
+        UserDetail.objects.create(user=user)
+        cls.day = date.today() + timedelta(days=1)
+        Lesson.objects.bulk_create([
+            Lesson(student=user, date=cls.day, time=time(hour=hour),
+                   salary=C_salary_common)
+            for hour in (9, 12, 18)
+        ])
+        TimeBlock.objects.create(date=cls.day, start_time=time(12),
+                                 end_time=time(15))
+        # lessons after the visible window
+        first_day = date.today() + C_datedelta + timedelta(days=1)
+        Lesson.objects.bulk_create([
+            Lesson(student=user, date=first_day + timedelta(days=i // 16),
+                   time=time(hour=8 + i % 16), salary=C_salary_common)
+            for i in range(cls.future_lessons_amount)
+        ])
+
+    def test_only_visible_window_is_loaded(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/')
+        schedule = response.context['lessons']
+        self.assertEqual(len(schedule), C_datedelta.days + 1)
+        self.assertEqual(sum(len(items) for items in schedule.values()), 4)
+
+    def test_lessons_and_blocks_are_merged_in_order(self):
+        response = self.client.get('/')
+        items = response.context['lessons'][self.day]
+        self.assertEqual(
+            [(type(item), getattr(item, 'time', None)) for item in items],
+            [(Lesson, time(9)), (TimeBlock, None), (Lesson, time(12)),
+             (Lesson, time(18))]
+        )
+
+
+class TestHomepageSnapshot(TransactionTestCase):
+    """ Testing the cached schedule of the homepage """
+
+    user_credentials = {
+        'username': 'user1',
+        'password': 'pass1'
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(**self.user_credentials)
+        UserDetail.objects.create(user=self.user)
+        self.lesson = Lesson.objects.create(
+            student=self.user, date=date.today() + timedelta(days=1),
+            time=time(hour=15), salary=C_salary_common
+        )
+
+    def test_snapshot_is_reused(self):
+        self.client.get('/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/')
+        self.assertContains(response, f'data-student="{self.user.pk}"')
+
+    def test_snapshot_is_rebuilt_after_change(self):
+        self.client.get('/')
+        self.lesson.delete()
+        response = self.client.get('/')
+        self.assertNotContains(response, f'data-student="{self.user.pk}"')
+
+    def test_own_cards_are_highlighted(self):
+        self.client.get('/')
+        self.client.login(**self.user_credentials)
+        response = self.client.get('/')
+        self.assertContains(
+            response, f'.lesson-card[data-student="{self.user.pk}"]')
+
+
 class TestUserAbilities(TestCase):
     """ Testing all user abilities """
 
@@ -0,0 +1,119 @@
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from django.test import SimpleTestCase
+from django.test.testcases import TestCase
+from django.contrib.auth.models import User
+
+from rest_framework.test import APIClient
+
+from lessons_app import window
+from lessons_app.models import Lesson, TimeBlock
+from lessons_app.rules import booking_errors
+from CalendarApi.constraints import C_salary_common, C_datedelta
+
+
+class TestWindow(SimpleTestCase):
+    """ Testing the relevant window and its day boundary """
+
+    def setUp(self):
+        window._expires = None
+        self.addCleanup(setattr, window, '_expires', None)
+
+    def get_window(self, now):
+        with mock.patch.object(window.timezone, 'now', return_value=now):
+            return window.get_window()
+
+    def test_local_date(self):
+        # 22:30 in UTC is the next day in Moscow
+        now = datetime(2022, 3, 1, 22, 30, tzinfo=ZoneInfo('UTC'))
+        self.assertEqual(self.get_window(now),
+                         (date(2022, 3, 2), date(2022, 3, 2) + C_datedelta))
+
+    def test_next_day(self):
+        moscow = ZoneInfo('Europe/Moscow')
+        self.get_window(datetime(2022, 3, 1, 12, tzinfo=moscow))
+        self.assertEqual(
+            self.get_window(datetime(2022, 3, 1, 23, 59, tzinfo=moscow)).start,
+            date(2022, 3, 1)
+        )
+        self.assertEqual(
+            self.get_window(datetime(2022, 3, 2, tzinfo=moscow)).start,
+            date(2022, 3, 2)
+        )
+
+
+class TestRelevantQuerysets(TestCase):
+    """ Testing the querysets are bounded by the window of the request """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        today = date.today()
+        for delta in (-1, 0, C_datedelta.days + 1):
+            day = today + timedelta(days=delta)
+            Lesson.objects.create(student=cls.admin, date=day, time=time(12),
+                                  salary=C_salary_common)
+            TimeBlock.objects.create(date=day, start_time=time(8),
+                                     end_time=time(9))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_lessons(self):
+        for path in ('/api/get-relevant-lessons', '/api/set-my-lessons/',
+                     '/api/all-relevant-lessons/'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(len(response.data), 2)
+
+    def test_timeblocks(self):
+        response = self.client.get('/api/get-timeblocks')
+        self.assertEqual(len(response.data), 1)
+        response = self.client.get('/api/admin/admin-panel/timeblock/')
+        self.assertEqual(len(response.data), 2)
+
+    def test_day_changes(self):
+        tomorrow = datetime.combine(date.today() + timedelta(days=1), time(),
+                                    ZoneInfo('Europe/Moscow'))
+        window._expires = None
+        self.addCleanup(setattr, window, '_expires', None)
+        with mock.patch.object(window.timezone, 'now',
+                               return_value=tomorrow):
+            response = self.client.get('/api/all-relevant-lessons/')
+        self.assertEqual(len(response.data), 1)
+
+
+class TestLocalClock(TestCase):
+    """ Testing the booking rules and the free slots use the local time
+    of TIME_ZONE, not the clock of the server """
+
+    # 22:30 in UTC is 01:30 of the next day in Moscow
+    now = datetime(2022, 3, 1, 22, 30, tzinfo=ZoneInfo('UTC'))
+
+    def setUp(self):
+        window._expires = None
+        self.addCleanup(setattr, window, '_expires', None)
+        patcher = mock.patch.object(window.timezone, 'now',
+                                    return_value=self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_booking_rules(self):
+        self.assertEqual(len(booking_errors(date(2022, 3, 1), time(23))), 1)
+        # 3 hours later is 04:30 in Moscow
+        self.assertEqual(booking_errors(date(2022, 3, 2), time(8)), [])
+        self.assertEqual(
+            booking_errors(date(2022, 3, 2) + C_datedelta, time(8)), [])
+        self.assertEqual(len(booking_errors(
+            date(2022, 3, 3) + C_datedelta, time(8))), 1)
+
+    def test_free_slots(self):
+        response = self.client.get('/api/free-slots')
+        slots = response.json()
+        self.assertEqual(min(slots), '2022-03-02')
+        self.assertEqual(max(slots),
+                         (date(2022, 3, 2) + C_datedelta).isoformat())
+        self.assertEqual(slots['2022-03-02'][0], '08:00')
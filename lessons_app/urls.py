@@ -5,10 +5,13 @@ from .views import (
     CustomRegistrationView, CustomLogOutView, CustomLoginView, AddLessonView,
     DeleteLessonView, LessonView, LessonByUserView,
     InfoView,
-    SettingsAP, AddLessonAP, TimeBlockerAP, StudentsAP, StudentDetailAP,
+    SettingsAP, AddLessonAP, TimeBlockerAP, BulkTimeBlockerAP, StudentsAP,
+    StudentDetailAP, ProfilesAP, ProfileAP,
     UsersAPI, RegistrationAPI, RelevantLessonsAPI, LessonsViewSet,
     LessonsAdminViewSet, RelevantLessonsAdminViewSet, DeleteUserAPI,
-    TimeBlockAPI, TimeBlockAdminAPI, StudentAdminAPI
+    TimeBlockAPI, TimeBlockAdminAPI, StudentAdminAPI, FreeSlotsAPI,
+    LessonsExportAPI, QuoteAPI, CalendarFeed, FeedTokenAPI, ChangesAPI,
+    MetricsView
 )
 
 router = DefaultRouter()
@@ -31,6 +34,9 @@ urlpatterns = [
     path('delete-lesson/<int:pk>/', DeleteLessonView.as_view(),
          name='del_lesson_url'),
     path('info', InfoView.as_view(), name='info_url'),
+    path('calendar/<str:token>.ics', CalendarFeed.as_view(),
+         name='calendar_feed_url'),
+    path('metrics', MetricsView.as_view(), name='metrics_url'),
 
     # Admin panel
     path('admin-panel/settings', SettingsAP.as_view(),
@@ -39,15 +45,26 @@ urlpatterns = [
          name='add_lesson_AP_url'),
     path('admin-panel/block-time', TimeBlockerAP.as_view(),
          name='time_blocker_AP_url'),
+    path('admin-panel/block-days', BulkTimeBlockerAP.as_view(),
+         name='bulk_time_blocker_AP_url'),
     path('admin-panel/students', StudentsAP.as_view(),
          name='students_AP_url'),
     path('admin-panel/students/<int:pk>', StudentDetailAP.as_view(),
          name='student_detail_AP_url'),
+    path('admin-panel/profiles', ProfilesAP.as_view(),
+         name='profiles_AP_url'),
+    path('admin-panel/profiles/<str:name>', ProfileAP.as_view(),
+         name='profile_AP_url'),
 
     # API
     path('api/registration', RegistrationAPI.as_view()),
     path('api/get-users', UsersAPI.as_view()),
     path('api/get-relevant-lessons', RelevantLessonsAPI.as_view()),
+    path('api/free-slots', FreeSlotsAPI.as_view()),
+    path('api/quote', QuoteAPI.as_view()),
+    path('api/calendar-feed', FeedTokenAPI.as_view()),
+    path('api/changes', ChangesAPI.as_view()),
+    path('api/export-lessons', LessonsExportAPI.as_view()),
     path('api/delete-user/<int:pk>/', DeleteUserAPI.as_view()),
 
     # Admin panel API
@@ -0,0 +1,104 @@
+""" Schedule version counter.
+
+The counter lives in the shared cache, so every worker process notices
+a change of Lesson or TimeBlock rows made by any other process. It is
+also the validator of conditional requests of the schedule: responses
+built from the schedule (and the current day) get ETag and Last-Modified
+headers, and a client with an unchanged copy gets 304.
+
+The names, aliases and phones of the students are in the pages of staff
+too, so the users and their details have a version of their own """
+
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.utils import timezone as local_timezone
+
+from .window import get_window
+
+
+SCHEDULE_VERSION_KEY = 'lessons_app:schedule_version'
+SCHEDULE_MODIFIED_KEY = 'lessons_app:schedule_modified'
+DETAILS_VERSION_KEY = 'lessons_app:details_version'
+DETAILS_MODIFIED_KEY = 'lessons_app:details_modified'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # start from a timestamp, so a counter lost by the cache
+        # can't repeat a value some process has already seen
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key, modified_key):
+    cache.set(modified_key, time.time(), timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        get_version(key)
+
+
+def get_modified(key):
+    modified = cache.get(key)
+    if modified is None:
+        # the time of the change is lost, so it is assumed to be now
+        cache.add(key, time.time(), timeout=None)
+        modified = cache.get(key)
+    # HTTP dates have whole seconds
+    return datetime.fromtimestamp(int(modified), timezone.utc)
+
+
+def get_schedule_version():
+    """ Returns the current version of the schedule """
+
+    return get_version(SCHEDULE_VERSION_KEY)
+
+
+def bump_schedule_version():
+    """ Marks every cached view of the schedule as outdated """
+
+    bump_version(SCHEDULE_VERSION_KEY, SCHEDULE_MODIFIED_KEY)
+
+
+def get_schedule_modified():
+    """ Returns the (aware) datetime of the last change of the schedule """
+
+    return get_modified(SCHEDULE_MODIFIED_KEY)
+
+
+def get_details_version():
+    """ Returns the current version of the users and their details, the
+    pages of staff show them with the lessons """
+
+    return get_version(DETAILS_VERSION_KEY)
+
+
+def bump_details_version():
+    bump_version(DETAILS_VERSION_KEY, DETAILS_MODIFIED_KEY)
+
+
+def get_details_modified():
+    """ Returns the (aware) datetime of the last change of the users """
+
+    return get_modified(DETAILS_MODIFIED_KEY)
+
+
+def schedule_etag(request, *args, **kwargs):
+    """ ETag of the responses built from the relevant schedule """
+
+    return '"schedule-{}-{}"'.format(get_schedule_version(),
+                                     get_window().start)
+
+
+def schedule_last_modified(request, *args, **kwargs):
+    """ Last-Modified of the responses built from the relevant schedule.
+    The relevant schedule also changes at midnight """
+
+    midnight = local_timezone.make_aware(
+        datetime.combine(get_window().start, datetime.min.time())
+    )
+    return max(get_schedule_modified(), midnight)
@@ -1,12 +1,26 @@
+import hmac
 from copy import deepcopy
 from datetime import date, timedelta, datetime
-
-from django.urls import reverse_lazy
-from django.http import HttpResponse, HttpResponseRedirect
+from heapq import merge
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse, reverse_lazy
+from django.http import (
+    HttpResponse, HttpResponseRedirect, StreamingHttpResponse, Http404,
+    FileResponse, HttpResponseForbidden
+)
 from django.shortcuts import render, redirect
-from django.utils.translation import gettext as _
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, add_never_cache_headers
+from django.utils.decorators import method_decorator
+from django.utils.translation import gettext as _, get_language
+from django.views.decorators.http import condition
 from django.views.generic import (
-    ListView, CreateView, DeleteView, View, TemplateView, DetailView
+    ListView, CreateView, DeleteView, View, TemplateView, DetailView,
+    FormView
 )
 from django.views.generic.edit import FormMixin
 from django.contrib import messages
@@ -16,24 +30,55 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib.auth.hashers import make_password
 
+from prometheus_client import CONTENT_TYPE_LATEST
 from rest_framework import viewsets, status, mixins
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.generics import (
     ListAPIView, CreateAPIView, DestroyAPIView, get_object_or_404
 )
 from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from rest_framework.response import Response
-
+from rest_framework.exceptions import ValidationError
+
+from .asynchronous import AsyncViewMixin, AsyncAPIViewMixin, async_condition
+from .availability import get_days, LESSON_DURATION
+from .booking import lock_day, revalidate, coalesce_blocks
+from .bulk import book_lessons, block_time, pattern_dates
+from .caching import get_or_build
+from .changes import (
+    MAX_WAIT, last_sequence, is_expired, wait_for_changes
+)
+from .export import FORMATS, export_rows
+from .feeds import (
+    ADMIN_FEED, issue_token, make_token, load_token, render_feed
+)
+from .filters import LessonFilter
+from .metrics import count_bookings, render_metrics
 from .models import Lesson, UserDetail, TimeBlock
+from .pagination import LessonPagination, UserPagination
+from .pricing import get_rates, quote
+from .profiling import (
+    QUERY_PARAM, TOKEN_MAX_AGE, list_profiles, get_profile_path, summarize,
+    make_token as make_profiling_token
+)
 from .forms import (
     RegisterUserForm, AuthUserForm, AddLessonForm, AddLessonAdminForm,
-    TimeBlockerAPForm, StudentUpdateForm
+    TimeBlockerAPForm, BulkTimeBlockerAPForm, StudentUpdateForm,
+    ProfileLinkAPForm
 )
 from .serializers import (
     UserSerializer, LessonSerializer, LessonAdminSerializer,
     RegistrationSerializer, DelUserSerializer,
-    TimeBlockSerializer, TimeBlockAdminSerializer, StudentAdminSerializer
+    TimeBlockSerializer, TimeBlockAdminSerializer, StudentAdminSerializer,
+    BulkLessonSerializer, BulkLessonAdminSerializer, BulkTimeBlockSerializer,
+    ScheduleEventSerializer
 )
+from .versioning import (
+    get_details_modified, get_details_version, get_schedule_version,
+    schedule_etag, schedule_last_modified
+)
+from .window import get_window
 from CalendarApi.constraints import (
     С_morning_time, С_morning_time_markup, C_evening_time_markup,
     C_evening_time, C_salary_common, C_salary_high, C_lesson_threshold,
@@ -52,14 +97,15 @@ def get_weekdays():
         'Saturday': _('Saturday'),
         'Sunday': _('Sunday'),
     }
+    today = get_window().start
     for i in range(C_datedelta.days+1):
         if i == 0:
-            day = date.today() + timedelta(days=i)
+            day = today + timedelta(days=i)
             day_title = (f"{_('Today')}, "
                          f"{datetime.strftime(day, r'%d-%m')}")
             date_choices.append((day, day_title))
             continue
-        day = date.today() + timedelta(days=i)
+        day = today + timedelta(days=i)
         day_title = (f"{weekdays[day.strftime('%A')]}, "
                      f"{datetime.strftime(day, r'%d-%m')}")
         date_choices.append((day, day_title))
@@ -67,47 +113,101 @@ def get_weekdays():
     return date_choices
 
 
-class LessonView(ListView):
+def schedule_key(item):
+    """ Sorting key of lessons and blocks on the homepage """
+
+    if isinstance(item, TimeBlock):
+        return item.date, item.start_time
+    return item.date, item.time
+
+
+def homepage_etag(request, *args, **kwargs):
+    """ The homepage also depends on the user and the language, and the
+    page of staff on the details of the students. A page with messages
+    is always sent """
+
+    if len(messages.get_messages(request)):
+        return None
+    details = get_details_version() if request.user.is_staff else 0
+    return '"home-{}-{}-{}-{}-{}"'.format(
+        get_schedule_version(), details, get_window().start,
+        request.user.pk or 0, get_language()
+    )
+
+
+class LessonView(AsyncViewMixin, ListView):
     """ Get relevant lesson list """
 
     model = Lesson
     template_name = 'lessons_app/index.html'
     context_object_name = 'lessons'
+    snapshot_template_name = 'lessons_app/inc/_schedule.html'
+    snapshot_timeout = 24 * 60 * 60
+
+    @async_condition(etag_func=homepage_etag)
+    async def get(self, request, *args, **kwargs):
+        return await sync_to_async(self.render_page)(request, *args,
+                                                     **kwargs)
+
+    def render_page(self, request, *args, **kwargs):
+        # staff cards contain details of students
+        if request.user.is_staff:
+            return super().get(request, *args, **kwargs)
+        context = self.get_snapshot_context()
+        self.object_list = context.get(self.context_object_name)
+        return self.render_to_response(context)
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        # the browser revalidates the page with its ETag every time
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_snapshot_context(self):
+        """ The schedule fragment is the same for every user who isn't
+        staff (own cards are highlighted by the page style), so it is
+        rendered once for each version of the schedule """
+
+        context = {}
+
+        def build():
+            lessons = self.get_queryset()
+            context[self.context_object_name] = lessons
+            return render_to_string(self.snapshot_template_name,
+                                    {'lessons': lessons})
+
+        # rows read inside a transaction may be rolled back
+        if connection.in_atomic_block:
+            context['schedule_html'] = build()
+            return context
+
+        key = 'lessons_app:schedule_snapshot:{}:{}:{}'.format(
+            get_window().start, get_language(), get_schedule_version()
+        )
+        context['schedule_html'] = get_or_build(key, build,
+                                                self.snapshot_timeout)
+        return context
 
     def get_queryset(self):
-        today = date.today()
+        today, last_day = get_window()
         lessons = self.model.objects.filter(
-            date__gte=today
+            date__gte=today,
+            date__lte=last_day
         ).select_related(
             'student',
             'student__details'
-        )
-        lessons = list(lessons)
+        ).order_by('date', 'time')
         blocked_times = TimeBlock.objects.filter(
             date__gte=today,
-            date__lte=today + C_datedelta
-        )
-        blocked_times = list(blocked_times)
+            date__lte=last_day
+        ).order_by('date', 'start_time')
         query = {today + timedelta(days=i): [] for i in range(
             C_datedelta.days+1
         )}
-        for _ in range(len(lessons) + len(blocked_times)):
-            if lessons and blocked_times:
-                condition_1 = lessons[0].date < blocked_times[0].date
-                condition_2 = (
-                    lessons[0].date == blocked_times[0].date and
-                    lessons[0].time < blocked_times[0].start_time
-                )
-                if condition_1 or condition_2:
-                    day = lessons[0].date
-                    query[day].append(lessons.pop(0))
-                else:
-                    day = blocked_times[0].date
-                    query[day].append(blocked_times.pop(0))
-            else:
-                exists = lessons or blocked_times
-                day = exists[0].date
-                query[day].append(exists.pop(0))
+        # both querysets are sorted, so one pass merges them. Blocks go
+        # first because a block is shown before a lesson of the same time
+        for item in merge(blocked_times, lessons, key=schedule_key):
+            query[item.date].append(item)
         return query
 
 
@@ -126,7 +226,7 @@ class LessonByUserView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         lessons = self.model.objects.filter(
-            date__gte=date.today(),
+            date__gte=get_window().start,
             student_id=self.request.user.id
         )
         return lessons
@@ -265,14 +365,7 @@ class AddLessonView(LoginRequiredMixin, CreateView):
 
     def get_context_data(self, request, **kwargs):
         context = {}
-        # value existence check can be disabled in the future
-        user_detail = UserDetail.objects.get(user_id=request.user.id)
-        if user_detail.usual_cost and user_detail.high_cost:
-            usual_cost = user_detail.usual_cost
-            high_cost = user_detail.high_cost
-        else:
-            usual_cost = C_salary_common
-            high_cost = C_salary_high
+        usual_cost, high_cost = get_rates(request.user.pk)
 
         cost_messages = []
         cost_messages.append(_(
@@ -326,26 +419,17 @@ class AddLessonView(LoginRequiredMixin, CreateView):
         lesson.date = date
         lesson.student_id = request.user.pk
 
-        is_morning = С_morning_time <= time < С_morning_time_markup
-        is_evening = C_evening_time_markup < time <= C_evening_time
-        is_over = len(Lesson.objects.filter(date=date)
-                      ) >= C_lesson_threshold - 1
-        # value existence check can be disabled in the future
-        user_detail = UserDetail.objects.get(user_id=request.user.id)
-        if is_morning or is_evening or is_over:
-            if user_detail.high_cost:
-                lesson.salary = user_detail.high_cost
-            else:
-                lesson.salary = C_salary_high
-        else:
-            if user_detail.usual_cost:
-                lesson.salary = user_detail.usual_cost
-            else:
-                lesson.salary = C_salary_common
+        with lock_day(date):
+            # the time could be taken after the form was validated
+            if not form.is_valid(request, form):
+                return redirect('add_lesson_url')
 
-        lesson.save()
+            price = quote(request.user.pk, date, time)
+            lesson.salary = price.salary
+            lesson.save()
+        count_bookings(1, 'single')
 
-        if lesson.salary == user_detail.high_cost:
+        if price.is_high:
             msg = _(
                 "Lesson successfully created. Date: {0}. "
                 "Time: {1}. Cost: {2} ₽. "
@@ -435,6 +519,70 @@ class InfoView(View):
             return age - 1
 
 
+def get_calendar_feed(request, token):
+    """ load_token() once a request, it is needed by the conditions and
+    the view """
+
+    if not hasattr(request, 'calendar_feed'):
+        request.calendar_feed = load_token(token)
+    return request.calendar_feed
+
+
+def feed_etag(request, token):
+    # an invalid token gets 404 instead of 304
+    data = get_calendar_feed(request, token)
+    if data is None:
+        return None
+    etag = schedule_etag(request)
+    # the admin feed shows the names of the students
+    if data[1] == ADMIN_FEED:
+        etag = '{}-{}"'.format(etag[:-1], get_details_version())
+    return etag
+
+
+def feed_last_modified(request, token):
+    data = get_calendar_feed(request, token)
+    if data is None:
+        return None
+    modified = schedule_last_modified(request)
+    if data[1] == ADMIN_FEED:
+        modified = max(modified, get_details_modified())
+    return modified
+
+
+@method_decorator(condition(feed_etag, feed_last_modified), name='get')
+class CalendarFeed(View):
+    """ ICS feed of own lessons of a student or of the whole schedule for
+    admin (see feeds.py). Unchanged feeds are answered with 304 after the
+    query checking the token """
+
+    def get(self, request, token, *args, **kwargs):
+        data = get_calendar_feed(request, token)
+        if data is None:
+            raise Http404
+        user_id, feed = data
+        response = HttpResponse(
+            render_feed(user_id, feed, request.get_host()),
+            content_type='text/calendar; charset=utf-8'
+        )
+        response['Content-Disposition'] = 'inline; filename="lessons.ics"'
+        return response
+
+
+class MetricsView(View):
+    """ Prometheus metrics (see metrics.py). The scraper sends
+    METRICS_TOKEN as a bearer token, without the setting the endpoint is
+    closed """
+
+    def get(self, request, *args, **kwargs):
+        token = settings.METRICS_TOKEN
+        given = request.META.get('HTTP_AUTHORIZATION', '')
+        if not token or not hmac.compare_digest(given, f'Bearer {token}'):
+            return HttpResponseForbidden()
+        return HttpResponse(render_metrics(),
+                            content_type=CONTENT_TYPE_LATEST)
+
+
 #################################################################
 #                        ADMIN PANEL (AP)                       #
 #################################################################
@@ -556,31 +704,20 @@ class AddLessonAP(AdminAccessMixin, CreateView):
         lesson = self.model()
         lesson.student_id = form.cleaned_data['student']
 
-        is_morning = С_morning_time <= time < С_morning_time_markup
-        is_evening = C_evening_time_markup < time <= C_evening_time
-        is_over = len(Lesson.objects.filter(date=date)
-                      ) >= C_lesson_threshold - 1
-        # value existence check can be disabled in the future
-        user_detail = UserDetail.objects.get(
-            user_id=form.cleaned_data['student']
-        )
-        if is_morning or is_evening or is_over:
-            if user_detail.high_cost:
-                lesson.salary = user_detail.high_cost
-            else:
-                lesson.salary = C_salary_high
-        else:
-            if user_detail.usual_cost:
-                lesson.salary = user_detail.usual_cost
-            else:
-                lesson.salary = C_salary_common
+        with lock_day(date):
+            # the time could be taken after the form was validated
+            if not form.is_valid(request, form):
+                return redirect('add_lesson_url')
 
-        lesson.time = time
-        lesson.date = date
+            price = quote(form.cleaned_data['student'], date, time)
+            lesson.salary = price.salary
+            lesson.time = time
+            lesson.date = date
 
-        lesson.save()
+            lesson.save()
+        count_bookings(1, 'single')
 
-        if lesson.salary == user_detail.high_cost:
+        if price.is_high:
             msg = _(
                 "Lesson successfully created. Date: {0}. "
                 "Time: {1}. Cost: {2} ₽. "
@@ -614,7 +751,7 @@ class TimeBlockerAP(AdminAccessMixin, FormMixin, ListView):
     form_class = TimeBlockerAPForm
 
     def get_queryset(self):
-        return self.model.objects.filter(date__gte=date.today())
+        return self.model.objects.filter(date__gte=get_window().start)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -660,7 +797,13 @@ class TimeBlockerAP(AdminAccessMixin, FormMixin, ListView):
         blocked_time.date = date
         blocked_time.start_time = start_time
         blocked_time.end_time = end_time
-        blocked_time.save()
+
+        with lock_day(date):
+            # a lesson could be created after the form was validated
+            if not form.is_valid(request):
+                return redirect(reverse_lazy('time_blocker_AP_url'))
+            blocked_time.save()
+            coalesce_blocks([date])
 
         messages.success(
             request,
@@ -669,6 +812,51 @@ class TimeBlockerAP(AdminAccessMixin, FormMixin, ListView):
         return redirect(reverse_lazy('time_blocker_AP_url'))
 
 
+class BulkTimeBlockerAP(AdminAccessMixin, FormView):
+    """ Blocks the time of many days in the admin panel, e.g. a vacation """
+
+    title = _('Block days')
+    template_name = 'lessons_app/management/bulk_time_blocker.html'
+    form_class = BulkTimeBlockerAPForm
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['menu'] = admin_panel
+        context['title'] = self.title
+        return context
+
+    def post(self, request, *args, **kwargs):
+        form = self.form_class(request.POST)
+        if form.is_valid(request):
+            return self.form_valid(request, form)
+        else:
+            return redirect(reverse_lazy('bulk_time_blocker_AP_url'))
+
+    def form_valid(self, request, form):
+        dates = pattern_dates(form.cleaned_data['date_from'],
+                              form.cleaned_data['date_to'],
+                              form.cleaned_data['weekdays'])
+        start_time = datetime.strptime(
+            str(form.cleaned_data['start_time']), r"%H").time()
+        end_time = datetime.strptime(
+            str(form.cleaned_data['end_time']), r"%H").time()
+
+        blocks, rejected = block_time(dates, start_time, end_time)
+
+        if blocks:
+            messages.success(
+                request,
+                _("Days blocked: {}").format(len(blocks))
+            )
+        for day in rejected:
+            messages.error(
+                request,
+                '{}: {}'.format(day.date.strftime(r'%d-%m-%Y'),
+                                ' '.join(day.errors))
+            )
+        return redirect(reverse_lazy('bulk_time_blocker_AP_url'))
+
+
 class StudentsAP(AdminAccessMixin, ListView):
     """ Student list in the admin panel """
 
@@ -731,7 +919,7 @@ class StudentDetailAP(AdminAccessMixin, DetailView):
 
         context['student_lessons'] = Lesson.objects.filter(
             student_id=user_pk,
-            date__gte=date.today()
+            date__gte=get_window().start
         )
         context['title'] = StudentsAP.title
         return context
@@ -784,11 +972,54 @@ class StudentDetailAP(AdminAccessMixin, DetailView):
                                      kwargs={'pk': url_pk}))
 
 
+class ProfilesAP(AdminAccessMixin, FormView):
+    """ Profiles of requests in the admin panel (see profiling.py). The
+    form gives a link to a page or an API path that is profiled when
+    opened """
+
+    title = _('Profiles')
+    template_name = 'lessons_app/management/profiles.html'
+    form_class = ProfileLinkAPForm
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['menu'] = admin_panel
+        context['title'] = self.title
+        context['profiles'] = list_profiles()
+        context['max_age'] = TOKEN_MAX_AGE // 60
+        return context
+
+    def form_valid(self, form):
+        path = form.cleaned_data['path']
+        token = make_profiling_token(self.request.user,
+                                     form.cleaned_data['mode'])
+        link = self.request.build_absolute_uri('{}{}{}={}'.format(
+            path, '&' if '?' in path else '?', QUERY_PARAM, token))
+        return self.render_to_response(self.get_context_data(
+            form=form, link=link, token=token))
+
+
+class ProfileAP(AdminAccessMixin, View):
+    """ Report of a profile, or the profile file with ?download=1 """
+
+    def get(self, request, name):
+        path = get_profile_path(name)
+        if path is None:
+            raise Http404(_('The profile does not exist'))
+        if request.GET.get('download'):
+            return FileResponse(open(path, 'rb'), as_attachment=True,
+                                filename=name)
+        return HttpResponse(summarize(path),
+                            content_type='text/plain; charset=utf-8')
+
+
 admin_panel = [
     (SettingsAP.title, 'settingAP_url'),
     (AddLessonAP.title, 'add_lesson_AP_url'),
     (TimeBlockerAP.title, 'time_blocker_AP_url'),
-    (StudentsAP.title, 'students_AP_url')
+    (BulkTimeBlockerAP.title, 'bulk_time_blocker_AP_url'),
+    (StudentsAP.title, 'students_AP_url'),
+    (ProfilesAP.title, 'profiles_AP_url')
 ]
 
 
@@ -797,6 +1028,73 @@ admin_panel = [
 #################################################################
 
 
+class LockedDayMixin:
+    """ Saves lessons (blocks) holding the lock of the day and checks
+    them again under the lock (see booking.py) """
+
+    def perform_create(self, serializer):
+        with lock_day(serializer.validated_data['date']):
+            revalidate(serializer)
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        date = serializer.validated_data.get('date', serializer.instance.date)
+        with lock_day(date):
+            revalidate(serializer)
+            super().perform_update(serializer)
+
+
+class BulkBookingMixin:
+    """ POST <lessons>/bulk/ books many lessons at once (see bulk.py).
+    The lessons are created for free slots, the other slots are reported
+    with the broken rules """
+
+    bulk_serializer_class = BulkLessonSerializer
+    check_booking = True  # apply the rules of booking by students
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, *args, **kwargs):
+        serializer = self.bulk_serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lessons, rejected = book_lessons(
+            self.get_bulk_student(serializer),
+            serializer.validated_data['slots'],
+            self.check_booking
+        )
+        return Response(
+            {
+                'created': self.get_serializer(lessons, many=True).data,
+                'rejected': [
+                    {
+                        'date': slot.date.isoformat(),
+                        'time': slot.time.strftime(r'%H:%M:%S'),
+                        'errors': slot.errors,
+                    }
+                    for slot in rejected
+                ],
+            },
+            status=(status.HTTP_201_CREATED if lessons
+                    else status.HTTP_400_BAD_REQUEST)
+        )
+
+    def get_bulk_student(self, serializer):
+        return self.request.user.pk
+
+
+class RelevantWindowMixin:
+    """ Limits the queryset to the days from today, and to the last day
+    of the booking window if window_bounded is set """
+
+    window_bounded = False
+
+    def get_queryset(self):
+        today, last_day = get_window()
+        queryset = super().get_queryset().filter(date__gte=today)
+        if self.window_bounded:
+            queryset = queryset.filter(date__lte=last_day)
+        return queryset
+
+
 class RegistrationAPI(CreateAPIView):
     """ Registration new users.
     get_serializer(), get_serializer_class(), get_serializer_context()
@@ -852,71 +1150,276 @@ class UsersAPI(ListAPIView):
     queryset = User.objects.all().order_by('pk').select_related('details')
     serializer_class = UserSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = UserPagination
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
 
+class ScheduleConditionMixin(AsyncAPIViewMixin):
+    """ Answers GET with 304 while the schedule the client has got is
+    relevant (see versioning.py). The check needs no thread, the list is
+    built in one (see asynchronous.py) """
 
-class RelevantLessonsAPI(ListAPIView):
+    @async_condition(schedule_etag, schedule_last_modified)
+    async def get(self, request, *args, **kwargs):
+        response = await sync_to_async(super().get)(request, *args,
+                                                    **kwargs)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class RelevantLessonsAPI(ScheduleConditionMixin, RelevantWindowMixin,
+                         ListAPIView):
     """ Gets relevant lesson list """
 
+    queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
     permission_classes = [AllowAny]
+    filter_backends = [LessonFilter]
 
-    def get_queryset(self):
-        queryset = Lesson.objects.filter(
-            date__gte=date.today()
+
+class FreeSlotsAPI(AsyncAPIViewMixin, APIView):
+    """ Gets free start times of lessons for every day of the window.
+    Query parameters: from, to (YYYY-MM-DD), duration (minutes) """
+
+    permission_classes = [AllowAny]
+    max_age = 60  # seconds the clients can cache the response for
+
+    async def get(self, request, *args, **kwargs):
+        today, last = get_window()
+        date_from = max(self.get_date(request, 'from', today), today)
+        date_to = min(self.get_date(request, 'to', last), last)
+        duration = self.get_duration(request)
+
+        # sign up is impossible for next 3 hours
+        earliest = timezone.localtime() + C_timedelta
+
+        slots = {}
+        if date_from <= date_to:
+            days = await sync_to_async(get_days)(date_from, date_to)
+            for day, schedule in days.items():
+                if day < earliest.date():
+                    starts = []
+                elif day == earliest.date():
+                    starts = schedule.free_starts(duration, earliest.time())
+                else:
+                    starts = schedule.free_starts(duration)
+                slots[day.isoformat()] = [
+                    start.strftime(r'%H:%M') for start in starts
+                ]
+
+        response = Response(slots, status=status.HTTP_200_OK)
+        patch_cache_control(response, public=True, max_age=self.max_age)
+        return response
+
+    def get_date(self, request, param, default):
+        value = request.query_params.get(param)
+        if not value:
+            return default
+        try:
+            return datetime.strptime(value, r'%Y-%m-%d').date()
+        except ValueError:
+            raise ValidationError(
+                {param: _("Date must be in 'YYYY-MM-DD' format")}
+            )
+
+    def get_duration(self, request):
+        value = request.query_params.get('duration')
+        if not value:
+            return LESSON_DURATION
+        day_length = ((C_evening_time.hour - С_morning_time.hour) * 60
+                      + LESSON_DURATION)
+        try:
+            duration = int(value)
+        except ValueError:
+            duration = 0
+        if not 0 < duration <= day_length:
+            raise ValidationError(
+                {'duration': _("Duration must be a number of minutes "
+                               "from 1 to {}").format(day_length)}
+            )
+        return duration
+
+
+class QuoteAPI(APIView):
+    """ Gets the cost of a lesson before booking it.
+    Query parameters: date (YYYY-MM-DD), time (HH:MM), student (id, admin
+    only). The cost for anonymous users is the common one """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        date = self.get_value(request, 'date', r'%Y-%m-%d',
+                              'YYYY-MM-DD').date()
+        time = self.get_value(request, 'time', r'%H:%M', 'HH:MM').time()
+        student_id = request.user.pk
+        if request.user.is_staff and request.query_params.get('student'):
+            try:
+                student_id = int(request.query_params['student'])
+            except ValueError:
+                raise ValidationError({'student': _("Must be a number")})
+
+        price = quote(student_id, date, time)
+        return Response(
+            {
+                'date': date.isoformat(),
+                'time': time.strftime(r'%H:%M'),
+                'salary': price.salary,
+                'is_high': price.is_high,
+            },
+            status=status.HTTP_200_OK
         )
-        return queryset
 
+    def get_value(self, request, param, format, hint):
+        try:
+            return datetime.strptime(request.query_params[param], format)
+        except KeyError:
+            raise ValidationError({param: _("This parameter is required")})
+        except ValueError:
+            raise ValidationError(
+                {param: _("Value must be in '{}' format").format(hint)}
+            )
+
+
+class FeedTokenAPI(APIView):
+    """ Gets the url of the ICS feed of the user (null until one is
+    issued), POST issues a new one and revokes the urls issued before """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        token = make_token(request.user)
+        return Response({'url': token and self.get_url(request, token)},
+                        status=status.HTTP_200_OK)
+
+    def post(self, request, *args, **kwargs):
+        token = issue_token(request.user)
+        return Response({'url': self.get_url(request, token)},
+                        status=status.HTTP_200_OK)
+
+    def get_url(self, request, token):
+        return request.build_absolute_uri(
+            reverse('calendar_feed_url', args=[token]))
+
+
+class ChangesAPI(AsyncAPIViewMixin, APIView):
+    """ Change feed of the schedule (long polling, see changes.py).
+    Query parameters: since (number of the last seen change), timeout
+    (seconds to wait for a change). Without since it returns the number
+    to start from """
 
-class LessonsViewSet(viewsets.ModelViewSet):
+    permission_classes = [IsAuthenticated]
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args,
+                                             **kwargs)
+        add_never_cache_headers(response)
+        return response
+
+    async def get(self, request, *args, **kwargs):
+        if 'since' not in request.query_params:
+            return Response({'last': await sync_to_async(last_sequence)(),
+                             'events': []},
+                            status=status.HTTP_200_OK)
+        since = self.get_number(request, 'since', 0, None)
+        timeout = self.get_number(request, 'timeout', 0, MAX_WAIT)
+        if await sync_to_async(is_expired)(since):
+            return Response(
+                {'detail': _("The changes are expired, reload the schedule"),
+                 'last': await sync_to_async(last_sequence)()},
+                status=status.HTTP_410_GONE
+            )
+
+        # in the event loop under ASGI, in its thread under WSGI
+        events = await wait_for_changes(since, timeout)
+        return Response(
+            {
+                'last': events[-1].sequence if events else since,
+                'events': ScheduleEventSerializer(events, many=True).data,
+            },
+            status=status.HTTP_200_OK
+        )
+
+    def get_number(self, request, param, minimum, maximum):
+        value = request.query_params.get(param)
+        if value is None:
+            return maximum
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValidationError({param: _("Must be a number")})
+        if value < minimum:
+            raise ValidationError(
+                {param: _("Must be at least {}").format(minimum)})
+        return value if maximum is None else min(value, maximum)
+
+
+class LessonsViewSet(RelevantWindowMixin, LockedDayMixin, BulkBookingMixin,
+                     viewsets.ModelViewSet):
     """ ViewSet of own relevant lessons for authenticated user.
     Request type: GET, POST, PUT, PATCH, DELETE """
 
-    queryset = Lesson.objects.filter(date__gte=date.today())
+    queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
     permission_classes = [IsAuthenticated]
 
     def perform_create(self, serializer):
         time = serializer.validated_data['time']
         date = serializer.validated_data['date']
-        is_morning = С_morning_time <= time < С_morning_time_markup
-        is_evening = C_evening_time_markup < time <= C_evening_time
-        is_over = len(Lesson.objects.filter(date=date)
-                      ) >= C_lesson_threshold - 1
-        # value existence check can be disabled in the future
-        user_detail = UserDetail.objects.get(user_id=self.request.user.id)
-        if is_morning or is_evening or is_over:
-            if user_detail.high_cost:
-                salary = user_detail.high_cost
-            else:
-                salary = C_salary_high
-        else:
-            if user_detail.usual_cost:
-                salary = user_detail.usual_cost
-            else:
-                salary = C_salary_common
+        with lock_day(date):
+            revalidate(serializer)
 
-        serializer.save(student_id=self.request.user.pk, salary=salary)
+            price = quote(self.request.user.pk, date, time)
+            serializer.save(student_id=self.request.user.pk,
+                            salary=price.salary)
 
 
-class LessonsAdminViewSet(viewsets.ModelViewSet):
+class LessonsAdminViewSet(LockedDayMixin, BulkBookingMixin,
+                          viewsets.ModelViewSet):
     """ ViewSet of all lessons """
 
     queryset = Lesson.objects.all()
     serializer_class = LessonAdminSerializer
     permission_classes = [IsAdminUser]
+    filter_backends = [LessonFilter]
+    pagination_class = LessonPagination
+    bulk_serializer_class = BulkLessonAdminSerializer
+    check_booking = False
+
+    def get_bulk_student(self, serializer):
+        return serializer.validated_data['student'].pk
+
+
+class LessonsExportAPI(APIView):
+    """ Streams all lessons as NDJSON or CSV.
+    Query parameters: output (ndjson, csv), date_from, date_to, student """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in FORMATS:
+            raise ValidationError(
+                {'output': _("Output must be one of: {}").format(
+                    ', '.join(FORMATS))}
+            )
+        queryset = LessonFilter().filter_queryset(
+            request, Lesson.objects.all(), self
+        )
+        render, content_type = FORMATS[output]
+        response = StreamingHttpResponse(render(export_rows(queryset)),
+                                         content_type=content_type)
+        response['Content-Disposition'] = \
+            f'attachment; filename="lessons.{output}"'
+        return response
 
 
-class RelevantLessonsAdminViewSet(viewsets.ModelViewSet):
+class RelevantLessonsAdminViewSet(RelevantWindowMixin, LockedDayMixin,
+                                  viewsets.ModelViewSet):
     """ ViewSet of all relevant lessons """
 
-    queryset = Lesson.objects.filter(date__gte=date.today())
+    queryset = Lesson.objects.all()
     serializer_class = LessonAdminSerializer
     permission_classes = [IsAdminUser]
+    filter_backends = [LessonFilter]
 
 
 #################################################################
@@ -924,24 +1427,66 @@ class RelevantLessonsAdminViewSet(viewsets.ModelViewSet):
 #################################################################
 
 
-class TimeBlockAPI(ListAPIView):
+class TimeBlockAPI(ScheduleConditionMixin, RelevantWindowMixin, ListAPIView):
     """ Getting block list """
 
-    queryset = TimeBlock.objects.filter(
-        date__gte=date.today(),
-        date__lte=date.today() + C_datedelta
-    )
+    queryset = TimeBlock.objects.all()
+    window_bounded = True
     serializer_class = TimeBlockSerializer
     permission_classes = [AllowAny]
 
 
-class TimeBlockAdminAPI(viewsets.ModelViewSet):
+class TimeBlockAdminAPI(RelevantWindowMixin, LockedDayMixin,
+                        viewsets.ModelViewSet):
     """ ViewSet of all future Timeblocks for admin """
 
-    queryset = TimeBlock.objects.filter(date__gte=date.today())
+    queryset = TimeBlock.objects.all()
     serializer_class = TimeBlockAdminSerializer
     permission_classes = [IsAdminUser]
 
+    def perform_create(self, serializer):
+        with lock_day(serializer.validated_data['date']):
+            super().perform_create(serializer)
+            self.coalesce(serializer)
+
+    def perform_update(self, serializer):
+        date = serializer.validated_data.get('date', serializer.instance.date)
+        with lock_day(date):
+            super().perform_update(serializer)
+            self.coalesce(serializer)
+
+    def coalesce(self, serializer):
+        """ Merges the saved block with the adjacent ones. The response
+        shows the block it is merged into """
+
+        block = serializer.instance
+        coalesce_blocks([block.date])
+        serializer.instance = TimeBlock.objects.get(
+            date=block.date, start_time__lte=block.start_time,
+            end_time__gte=block.end_time
+        )
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, *args, **kwargs):
+        """ Blocks the time of many days at once (see bulk.py) """
+
+        serializer = BulkTimeBlockSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        blocks, rejected = block_time(data['dates'], data['start_time'],
+                                      data['end_time'])
+        return Response(
+            {
+                'created': self.get_serializer(blocks, many=True).data,
+                'rejected': [
+                    {'date': day.date.isoformat(), 'errors': day.errors}
+                    for day in rejected
+                ],
+            },
+            status=(status.HTTP_201_CREATED if blocks
+                    else status.HTTP_400_BAD_REQUEST)
+        )
+
 
 class StudentAdminAPI(mixins.RetrieveModelMixin,
                       mixins.UpdateModelMixin,
@@ -0,0 +1,36 @@
+""" Relevant date window.
+
+The window is resolved when a request is handled instead of when a module
+is imported, so a long-lived worker doesn't serve more and more past
+lessons. The bounds are local dates of TIME_ZONE, computed once a day """
+
+import datetime
+import threading
+from collections import namedtuple
+
+from django.utils import timezone
+
+from CalendarApi.constraints import C_datedelta
+
+
+Window = namedtuple('Window', ('start', 'end'))
+
+_lock = threading.Lock()
+_window = None
+_expires = None  # the midnight the window is computed again after
+
+
+def get_window():
+    """ Returns Window(today, the last day lessons can be booked for) """
+
+    global _window, _expires
+
+    now = timezone.now()
+    with _lock:
+        if _expires is None or now >= _expires:
+            today = timezone.localdate(now)
+            _window = Window(today, today + C_datedelta)
+            _expires = timezone.make_aware(datetime.datetime.combine(
+                today + datetime.timedelta(days=1), datetime.time()
+            ))
+        return _window